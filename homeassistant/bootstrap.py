@@ -8,19 +8,30 @@ import os
 import sys
 import threading
 from time import monotonic
-from typing import TYPE_CHECKING, Any, Dict, Optional, Set
+from typing import TYPE_CHECKING, Any, Callable, Collection, Dict, List, Optional, Set
 
 import voluptuous as vol
 import yarl
 
-from homeassistant import config as conf_util, config_entries, core, loader
+from homeassistant import (
+    config as conf_util,
+    config_entries,
+    core,
+    loader,
+    requirements,
+)
 from homeassistant.components import http
 from homeassistant.const import REQUIRED_NEXT_PYTHON_DATE, REQUIRED_NEXT_PYTHON_VER
 from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import config_per_platform
 from homeassistant.helpers.typing import ConfigType
 from homeassistant.setup import (
     DATA_SETUP,
     DATA_SETUP_STARTED,
+    PHASE_IMPORT,
+    PHASE_REQUIREMENTS,
+    PHASE_WAIT_DEPENDENCIES,
+    async_record_setup_phase,
     async_set_domains_to_be_loaded,
     async_setup_component,
 )
@@ -41,8 +52,7 @@ DATA_LOGGING = "logging"
 
 LOG_SLOW_STARTUP_INTERVAL = 60
 
-STAGE_1_TIMEOUT = 120
-STAGE_2_TIMEOUT = 300
+SETUP_TIMEOUT = 300
 WRAP_UP_TIMEOUT = 300
 COOLDOWN_TIME = 60
 
@@ -383,7 +393,7 @@ def _get_domains(hass: core.HomeAssistant, config: Dict[str, Any]) -> Set[str]:
 
 
 async def _async_log_pending_setups(
-    domains: Set[str], setup_started: Dict[str, datetime]
+    domains: Collection[str], setup_started: Dict[str, datetime]
 ) -> None:
     """Periodic log of setups that are pending for longer than LOG_SLOW_STARTUP_INTERVAL."""
     while True:
@@ -397,17 +407,173 @@ async def _async_log_pending_setups(
             )
 
 
-async def async_setup_multi_components(
+def _import_modules(
+    integration: loader.Integration, platforms: List[loader.Integration]
+) -> None:
+    """Import an integration and the platforms configured for it."""
+    integration.get_component()
+    for platform in platforms:
+        platform.get_platform(integration.domain)
+
+
+async def _async_prepare_setup(
+    hass: core.HomeAssistant, domain: str, config: Dict[str, Any]
+) -> None:
+    """Process the requirements and import the modules of an integration.
+
+    Runs while the integration waits for the integrations it sets up
+    after, failures are reported when the integration is set up.
+    """
+    try:
+        integration = await loader.async_get_integration(hass, domain)
+        if integration.disabled:
+            return
+
+        platforms = []
+        for platform_name, _ in config_per_platform(config, domain):
+            if platform_name is not None:
+                platforms.append(
+                    await loader.async_get_integration(hass, platform_name)
+                )
+
+        # Installing requirements does not count against the setup timeout
+        async with hass.timeout.async_freeze(domain):
+            if not hass.config.skip_pip:
+                with async_record_setup_phase(hass, domain, PHASE_REQUIREMENTS):
+                    for itg in (integration, *platforms):
+                        await requirements.async_get_integration_with_requirements(
+                            hass, itg.domain
+                        )
+
+            cache = hass.data.get(loader.DATA_COMPONENTS, {})
+            if domain in cache and all(
+                f"{platform.domain}.{domain}" in cache for platform in platforms
+            ):
+                return
+
+            with async_record_setup_phase(hass, domain, PHASE_IMPORT):
+                await hass.async_add_executor_job(
+                    _import_modules, integration, platforms
+                )
+    except Exception:  # pylint: disable=broad-except
+        _LOGGER.debug("Unable to prepare the setup of %s", domain, exc_info=True)
+
+
+async def _async_setup_when_ready(
     hass: core.HomeAssistant,
+    domain: str,
+    config: Dict[str, Any],
+    futures: Dict[str, "asyncio.Future[bool]"],
+    wait_for: Set[str],
+    setup_done: Optional[Callable[[str], None]],
+) -> bool:
+    """Set up a domain once the domains it waits for are done."""
+    try:
+        prepare = _async_prepare_setup(hass, domain, config)
+        if wait_for:
+            with async_record_setup_phase(hass, domain, PHASE_WAIT_DEPENDENCIES):
+                await asyncio.gather(
+                    prepare, asyncio.wait([futures[dep] for dep in wait_for])
+                )
+        else:
+            await prepare
+
+        return await async_setup_component(hass, domain, config)
+    finally:
+        if setup_done is not None:
+            setup_done(domain)
+
+
+def _setup_prerequisites(
     domains: Set[str],
+    stage_1_domains: Set[str],
+    integration_cache: Dict[str, loader.Integration],
+) -> Dict[str, Set[str]]:
+    """Return the domains each domain has to wait for before it is set up.
+
+    Stage 1 domains wait for their dependencies. Other domains wait for
+    all of stage 1, their dependencies and their after dependencies.
+    After dependencies that form a cycle are dropped. Domains whose
+    dependencies form a cycle are left out, they can't be set up.
+    """
+    prerequisites: Dict[str, Set[str]] = {}
+    for domain in domains:
+        integration = integration_cache.get(domain)
+        wait_for = set()
+        if domain not in stage_1_domains:
+            wait_for.update(stage_1_domains)
+        if integration is not None:
+            wait_for.update(integration.dependencies)
+            if domain not in stage_1_domains:
+                wait_for.update(integration.after_dependencies)
+        wait_for.discard(domain)
+        prerequisites[domain] = wait_for & domains
+
+    remaining = {domain: set(wait_for) for domain, wait_for in prerequisites.items()}
+    while remaining:
+        ready = [domain for domain, wait_for in remaining.items() if not wait_for]
+        if ready:
+            for domain in ready:
+                del remaining[domain]
+            for wait_for in remaining.values():
+                wait_for.difference_update(ready)
+            continue
+
+        ignored = set()
+        for domain, wait_for in remaining.items():
+            integration = integration_cache.get(domain)
+            required = set(integration.dependencies) if integration else set()
+            if domain not in stage_1_domains:
+                required.update(stage_1_domains)
+            if wait_for - required:
+                ignored.add(domain)
+                prerequisites[domain] &= required
+                wait_for &= required
+
+        if ignored:
+            _LOGGER.warning(
+                "Ignoring after dependencies of %s, they depend on each other",
+                ", ".join(sorted(ignored)),
+            )
+            continue
+
+        _LOGGER.error(
+            "Unable to set up %s, their dependencies depend on each other",
+            ", ".join(sorted(remaining)),
+        )
+        for domain in remaining:
+            del prerequisites[domain]
+        break
+
+    return prerequisites
+
+
+async def async_setup_multi_components(
+    hass: core.HomeAssistant,
+    domains: Collection[str],
     config: Dict[str, Any],
     setup_started: Dict[str, datetime],
+    prerequisites: Optional[Dict[str, Set[str]]] = None,
+    setup_done: Optional[Callable[[str], None]] = None,
 ) -> None:
-    """Set up multiple domains. Log on failure."""
-    futures = {
-        domain: hass.async_create_task(async_setup_component(hass, domain, config))
-        for domain in domains
-    }
+    """Set up multiple domains. Log on failure.
+
+    Every domain is set up as soon as the domains it has prerequisites
+    on are done, its requirements and modules are prepared meanwhile.
+    Domains are started in the order they are given.
+    """
+    futures: Dict[str, "asyncio.Future[bool]"] = {}
+    for domain in domains:
+        futures[domain] = hass.async_create_task(
+            _async_setup_when_ready(
+                hass,
+                domain,
+                config,
+                futures,
+                prerequisites.get(domain, set()) if prerequisites else set(),
+                setup_done,
+            )
+        )
     log_task = asyncio.create_task(_async_log_pending_setups(domains, setup_started))
     await asyncio.wait(futures.values())
     log_task.cancel()
@@ -461,6 +627,10 @@ async def _async_set_up_integrations(
         for itg in integrations_to_process:
             integration_cache[itg.domain] = itg
 
+            # Already resolved, the loader logged why it failed
+            if not await itg.resolve_dependencies():
+                continue
+
             for dep in itg.all_dependencies:
                 if dep in domains_to_setup:
                     continue
@@ -514,33 +684,58 @@ async def _async_set_up_integrations(
     asyncio.create_task(hass.helpers.entity_registry.async_get_registry())
     asyncio.create_task(hass.helpers.area_registry.async_get_registry())
 
-    # Start setup
-    if stage_1_domains:
-        _LOGGER.info("Setting up stage 1: %s", stage_1_domains)
-        try:
-            async with hass.timeout.async_timeout(
-                STAGE_1_TIMEOUT, cool_down=COOLDOWN_TIME
-            ):
-                await async_setup_multi_components(
-                    hass, stage_1_domains, config, setup_started
-                )
-        except asyncio.TimeoutError:
-            _LOGGER.warning("Setup timed out for stage 1 - moving forward")
-
-    # Enables after dependencies
-    async_set_domains_to_be_loaded(hass, stage_1_domains | stage_2_domains)
+    # Restore the compiled templates before the integrations validate their config
+    await hass.helpers.template.async_load_bytecode_cache()
 
-    if stage_2_domains:
-        _LOGGER.info("Setting up stage 2: %s", stage_2_domains)
+    # Start setup, stage 2 integrations wait for stage 1 to be done and for
+    # the integrations they depend on, but not for the rest of stage 2
+    setup_domains = stage_1_domains | stage_2_domains
+    prerequisites = _setup_prerequisites(
+        setup_domains, stage_1_domains, integration_cache
+    )
+    stage_1_domains.intersection_update(prerequisites)
+    stage_2_domains.intersection_update(prerequisites)
+    finished: Set[str] = set()
+    stage_1_pending = set(stage_1_domains)
+
+    @core.callback
+    def _async_enable_after_dependencies() -> None:
+        """Enable after dependencies for integrations set up via platforms."""
+        async_set_domains_to_be_loaded(hass, stage_2_domains - finished)
+
+    @core.callback
+    def _async_setup_done(domain: str) -> None:
+        """Track the stage 1 integrations that are still being set up."""
+        finished.add(domain)
+        if domain in stage_1_pending:
+            stage_1_pending.remove(domain)
+            # Stage 1 integrations do not wait for their after dependencies
+            if not stage_1_pending:
+                _async_enable_after_dependencies()
+
+    if not stage_1_domains:
+        _async_enable_after_dependencies()
+
+    if setup_domains:
+        if stage_1_domains:
+            _LOGGER.info("Setting up stage 1: %s", stage_1_domains)
+        if stage_2_domains:
+            _LOGGER.info("Setting up stage 2: %s", stage_2_domains)
         try:
             async with hass.timeout.async_timeout(
-                STAGE_2_TIMEOUT, cool_down=COOLDOWN_TIME
+                SETUP_TIMEOUT, cool_down=COOLDOWN_TIME
             ):
                 await async_setup_multi_components(
-                    hass, stage_2_domains, config, setup_started
+                    hass,
+                    # Start stage 1 first so it is set up as soon as possible
+                    [*stage_1_domains, *stage_2_domains],
+                    config,
+                    setup_started,
+                    prerequisites,
+                    _async_setup_done,
                 )
         except asyncio.TimeoutError:
-            _LOGGER.warning("Setup timed out for stage 2 - moving forward")
+            _LOGGER.warning("Setup timed out for stage 1 and 2 - moving forward")
 
     # Wrap up startup
     _LOGGER.debug("Waiting for startup to wrap up")
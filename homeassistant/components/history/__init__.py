@@ -1,38 +1,56 @@
 """Provide pre-made queries on top of the recorder component."""
+import asyncio
 from collections import defaultdict
 from datetime import datetime as dt, timedelta
-from itertools import groupby
+from itertools import chain, groupby
 import json
 import logging
+import threading
 import time
-from typing import Iterable, Optional, cast
+from typing import Callable, Iterable, List, Optional, cast
 
 from aiohttp import web
+from aiohttp.hdrs import CONTENT_TYPE
 from sqlalchemy import and_, bindparam, func, not_, or_
 from sqlalchemy.ext import baked
 import voluptuous as vol
 
-from homeassistant.components import recorder
+from homeassistant.components import recorder, websocket_api
 from homeassistant.components.http import HomeAssistantView
 from homeassistant.components.recorder.models import (
+    SHARED_ATTRIBUTES,
+    STATE_ATTRIBUTES_JOIN,
+    StateAttributes,
     States,
+    StateSnapshots,
     process_timestamp,
     process_timestamp_to_utc_isoformat,
 )
+from homeassistant.components.recorder.statistics import (
+    STATISTICS_TABLES,
+    statistics_during_period,
+)
 from homeassistant.components.recorder.util import execute, session_scope
+from homeassistant.components.websocket_api.messages import message_to_json
 from homeassistant.const import (
     CONF_DOMAINS,
     CONF_ENTITIES,
     CONF_EXCLUDE,
     CONF_INCLUDE,
+    CONTENT_TYPE_JSON,
     HTTP_BAD_REQUEST,
 )
-from homeassistant.core import Context, State, split_entity_id
+from homeassistant.core import Context, State, callback, split_entity_id
 import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers.entityfilter import (
     CONF_ENTITY_GLOBS,
     INCLUDE_EXCLUDE_BASE_FILTER_SCHEMA,
 )
+from homeassistant.helpers.event import (
+    async_track_point_in_utc_time,
+    async_track_state_change_event,
+)
+from homeassistant.helpers.json import JSONEncoder
 from homeassistant.helpers.typing import HomeAssistantType
 import homeassistant.util.dt as dt_util
 
@@ -79,13 +97,20 @@ QUERY_STATES = [
     States.domain,
     States.entity_id,
     States.state,
-    States.attributes,
+    SHARED_ATTRIBUTES.label("attributes"),
     States.last_changed,
     States.last_updated,
 ]
 
 HISTORY_BAKERY = "history_bakery"
 
+# Number of rows fetched from the database cursor at once
+STREAM_BATCH_SIZE = 1000
+# Number of characters written to a streamed response at once
+STREAM_CHUNK_SIZE = 65536
+# Number of written chunks that may wait for a slow client
+STREAM_MAX_PENDING_CHUNKS = 4
+
 
 def get_significant_states(hass, *args, **kwargs):
     """Wrap _get_significant_states with a sql session."""
@@ -113,8 +138,48 @@ def _get_significant_states(
     """
     timer_start = time.perf_counter()
 
+    states = execute(
+        _significant_states_query(
+            hass,
+            session,
+            start_time,
+            end_time,
+            entity_ids,
+            filters,
+            significant_changes_only,
+        )
+    )
+
+    if _LOGGER.isEnabledFor(logging.DEBUG):
+        elapsed = time.perf_counter() - timer_start
+        _LOGGER.debug("get_significant_states took %fs", elapsed)
+
+    return _sorted_states_to_json(
+        hass,
+        session,
+        states,
+        start_time,
+        entity_ids,
+        filters,
+        include_start_time_state,
+        minimal_response,
+    )
+
+
+def _significant_states_query(
+    hass,
+    session,
+    start_time,
+    end_time,
+    entity_ids,
+    filters,
+    significant_changes_only,
+):
+    """Return the query for the significant states sorted by entity."""
     baked_query = hass.data[HISTORY_BAKERY](
-        lambda session: session.query(*QUERY_STATES)
+        lambda session: session.query(*QUERY_STATES).outerjoin(
+            StateAttributes, STATE_ATTRIBUTES_JOIN
+        )
     )
 
     if significant_changes_only:
@@ -142,25 +207,8 @@ def _get_significant_states(
 
     baked_query += lambda q: q.order_by(States.entity_id, States.last_updated)
 
-    states = execute(
-        baked_query(session).params(
-            start_time=start_time, end_time=end_time, entity_ids=entity_ids
-        )
-    )
-
-    if _LOGGER.isEnabledFor(logging.DEBUG):
-        elapsed = time.perf_counter() - timer_start
-        _LOGGER.debug("get_significant_states took %fs", elapsed)
-
-    return _sorted_states_to_json(
-        hass,
-        session,
-        states,
-        start_time,
-        entity_ids,
-        filters,
-        include_start_time_state,
-        minimal_response,
+    return baked_query(session).params(
+        start_time=start_time, end_time=end_time, entity_ids=entity_ids
     )
 
 
@@ -168,7 +216,9 @@ def state_changes_during_period(hass, start_time, end_time=None, entity_id=None)
     """Return states changes during UTC period start_time - end_time."""
     with session_scope(hass=hass) as session:
         baked_query = hass.data[HISTORY_BAKERY](
-            lambda session: session.query(*QUERY_STATES)
+            lambda session: session.query(*QUERY_STATES).outerjoin(
+                StateAttributes, STATE_ATTRIBUTES_JOIN
+            )
         )
 
         baked_query += lambda q: q.filter(
@@ -182,7 +232,9 @@ def state_changes_during_period(hass, start_time, end_time=None, entity_id=None)
             )
 
         if entity_id is not None:
-            baked_query += lambda q: q.filter_by(entity_id=bindparam("entity_id"))
+            baked_query += lambda q: q.filter(
+                States.entity_id == bindparam("entity_id")
+            )
             entity_id = entity_id.lower()
 
         baked_query += lambda q: q.order_by(States.entity_id, States.last_updated)
@@ -204,12 +256,16 @@ def get_last_state_changes(hass, number_of_states, entity_id):
 
     with session_scope(hass=hass) as session:
         baked_query = hass.data[HISTORY_BAKERY](
-            lambda session: session.query(*QUERY_STATES)
+            lambda session: session.query(*QUERY_STATES).outerjoin(
+                StateAttributes, STATE_ATTRIBUTES_JOIN
+            )
         )
         baked_query += lambda q: q.filter(States.last_changed == States.last_updated)
 
         if entity_id is not None:
-            baked_query += lambda q: q.filter_by(entity_id=bindparam("entity_id"))
+            baked_query += lambda q: q.filter(
+                States.entity_id == bindparam("entity_id")
+            )
             entity_id = entity_id.lower()
 
         baked_query += lambda q: q.order_by(
@@ -269,14 +325,27 @@ def _get_states_with_session(
 
     # We have more than one entity to look at (most commonly we want
     # all entities,) so we need to do a search on all states since the
-    # last recorder run started.
-    query = session.query(*QUERY_STATES)
+    # nearest snapshot of the latest states or, if there is none, since
+    # the last recorder run started.
+    checkpoint = (
+        session.query(func.max(StateSnapshots.checkpoint))
+        .filter(
+            (StateSnapshots.checkpoint >= run.start)
+            & (StateSnapshots.checkpoint < utc_point_in_time)
+        )
+        .scalar()
+    )
+
+    query = session.query(*QUERY_STATES).outerjoin(
+        StateAttributes, STATE_ATTRIBUTES_JOIN
+    )
 
     most_recent_states_by_date = session.query(
         States.entity_id.label("max_entity_id"),
         func.max(States.last_updated).label("max_last_updated"),
     ).filter(
-        (States.last_updated >= run.start) & (States.last_updated < utc_point_in_time)
+        (States.last_updated >= (checkpoint or run.start))
+        & (States.last_updated < utc_point_in_time)
     )
 
     if entity_ids:
@@ -305,21 +374,43 @@ def _get_states_with_session(
         States.state_id == most_recent_state_ids.c.max_state_id,
     )
 
+    query = _filter_states_query(query, entity_ids, filters)
+
+    if checkpoint is None:
+        return [LazyState(row) for row in execute(query)]
+
+    # The states recorded since the checkpoint supersede the snapshot
+    snapshot_query = (
+        session.query(*QUERY_STATES)
+        .outerjoin(StateAttributes, STATE_ATTRIBUTES_JOIN)
+        .join(StateSnapshots, StateSnapshots.state_id == States.state_id)
+        .filter(StateSnapshots.checkpoint == checkpoint)
+    )
+    snapshot_query = _filter_states_query(snapshot_query, entity_ids, filters)
+
+    states = {row.entity_id: row for row in execute(snapshot_query)}
+    states.update((row.entity_id, row) for row in execute(query))
+    return [LazyState(row) for row in states.values()]
+
+
+def _filter_states_query(query, entity_ids, filters):
+    """Limit a states query to the requested entities."""
     if entity_ids is not None:
-        query = query.filter(States.entity_id.in_(entity_ids))
-    else:
-        query = query.filter(~States.domain.in_(IGNORE_DOMAINS))
-        if filters:
-            query = filters.apply(query)
+        return query.filter(States.entity_id.in_(entity_ids))
 
-    return [LazyState(row) for row in execute(query)]
+    query = query.filter(~States.domain.in_(IGNORE_DOMAINS))
+    if filters:
+        query = filters.apply(query)
+    return query
 
 
 def _get_single_entity_states_with_session(hass, session, utc_point_in_time, entity_id):
     # Use an entirely different (and extremely fast) query if we only
     # have a single entity id
     baked_query = hass.data[HISTORY_BAKERY](
-        lambda session: session.query(*QUERY_STATES)
+        lambda session: session.query(*QUERY_STATES).outerjoin(
+            StateAttributes, STATE_ATTRIBUTES_JOIN
+        )
     )
     baked_query += lambda q: q.filter(
         States.last_updated < bindparam("utc_point_in_time"),
@@ -363,65 +454,95 @@ def _sorted_states_to_json(
             result[ent_id] = []
 
     # Get the states at the start time
-    timer_start = time.perf_counter()
     if include_start_time_state:
-        run = recorder.run_information_from_instance(hass, start_time)
-        for state in _get_states_with_session(
-            hass, session, start_time, entity_ids, run=run, filters=filters
+        for state in _get_start_time_states(
+            hass, session, start_time, entity_ids, filters
         ):
-            state.last_changed = start_time
-            state.last_updated = start_time
             result[state.entity_id].append(state)
 
+    # Append all changes to it
+    for ent_id, group in groupby(states, lambda state: state.entity_id):
+        ent_results = result[ent_id]
+        start_state = ent_results.pop() if ent_results else None
+        ent_results.extend(
+            _entity_states_to_json(ent_id, group, start_state, minimal_response)
+        )
+
+    # Entities that were not asked for explicitly are sorted by entity_id
+    items = result.items() if entity_ids is not None else sorted(result.items())
+
+    # Filter out the empty lists if some states had 0 results.
+    return {key: val for key, val in items if val}
+
+
+def _get_start_time_states(hass, session, start_time, entity_ids, filters):
+    """Return the states at the start time as synthetic data points."""
+    timer_start = time.perf_counter()
+    run = recorder.run_information_from_instance(hass, start_time)
+    states = _get_states_with_session(
+        hass, session, start_time, entity_ids, run=run, filters=filters
+    )
+    for state in states:
+        state.last_changed = start_time
+        state.last_updated = start_time
+
     if _LOGGER.isEnabledFor(logging.DEBUG):
         elapsed = time.perf_counter() - timer_start
-        _LOGGER.debug("getting %d first datapoints took %fs", len(result), elapsed)
+        _LOGGER.debug("getting %d first datapoints took %fs", len(states), elapsed)
+
+    return states
+
+
+def _entity_states_to_json(entity_id, db_states, start_state, minimal_response):
+    """Yield the JSON friendly states of a single entity.
+
+    db_states must be sorted by last_updated. They are consumed one by
+    one so the states of an entity do not need to be held in memory.
+    """
+    if start_state is not None:
+        yield start_state
+
+    if not minimal_response or split_entity_id(entity_id)[0] in NEED_ATTRIBUTE_DOMAINS:
+        for db_state in db_states:
+            yield LazyState(db_state)
+        return
+
+    # With minimal response we only provide a native
+    # State for the first and last response. All the states
+    # in-between only provide the "state" and the
+    # "last_changed".
+    prev_state = start_state
+    if prev_state is None:
+        db_state = next(db_states, None)
+        if db_state is None:
+            return
+        prev_state = LazyState(db_state)
+        yield prev_state
 
     # Called in a tight loop so cache the function
     # here
     _process_timestamp_to_utc_isoformat = process_timestamp_to_utc_isoformat
 
-    # Append all changes to it
-    for ent_id, group in groupby(states, lambda state: state.entity_id):
-        domain = split_entity_id(ent_id)[0]
-        ent_results = result[ent_id]
-        if not minimal_response or domain in NEED_ATTRIBUTE_DOMAINS:
-            ent_results.extend(LazyState(db_state) for db_state in group)
-
-        # With minimal response we only provide a native
-        # State for the first and last response. All the states
-        # in-between only provide the "state" and the
-        # "last_changed".
-        if not ent_results:
-            ent_results.append(LazyState(next(group)))
-
-        prev_state = ent_results[-1]
-        initial_state_count = len(ent_results)
-
-        for db_state in group:
-            # With minimal response we do not care about attribute
-            # changes so we can filter out duplicate states
-            if db_state.state == prev_state.state:
-                continue
-
-            ent_results.append(
-                {
-                    STATE_KEY: db_state.state,
-                    LAST_CHANGED_KEY: _process_timestamp_to_utc_isoformat(
-                        db_state.last_changed
-                    ),
-                }
-            )
-            prev_state = db_state
+    pending_state = None
+    for db_state in db_states:
+        # With minimal response we do not care about attribute
+        # changes so we can filter out duplicate states
+        if db_state.state == prev_state.state:
+            continue
 
-        if prev_state and len(ent_results) != initial_state_count:
-            # There was at least one state change
-            # replace the last minimal state with
-            # a full state
-            ent_results[-1] = LazyState(prev_state)
+        if pending_state is not None:
+            yield {
+                STATE_KEY: pending_state.state,
+                LAST_CHANGED_KEY: _process_timestamp_to_utc_isoformat(
+                    pending_state.last_changed
+                ),
+            }
+        pending_state = prev_state = db_state
 
-    # Filter out the empty lists if some states had 0 results.
-    return {key: val for key, val in result.items() if val}
+    if pending_state is not None:
+        # There was at least one state change
+        # the last state is always a full state
+        yield LazyState(pending_state)
 
 
 def get_state(hass, utc_point_in_time, entity_id, run=None):
@@ -441,6 +562,7 @@ async def async_setup(hass, config):
     use_include_order = conf.get(CONF_ORDER)
 
     hass.http.register_view(HistoryPeriodView(filters, use_include_order))
+    hass.components.websocket_api.async_register_command(ws_stream)
     hass.components.frontend.async_register_built_in_panel(
         "history", "history", "hass:poll-box"
     )
@@ -448,6 +570,140 @@ async def async_setup(hass, config):
     return True
 
 
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): "history/stream",
+        vol.Required("start_time"): str,
+        vol.Optional("end_time"): str,
+        vol.Required("entity_ids"): cv.entity_ids,
+        vol.Optional("include_start_time_state", default=True): bool,
+        vol.Optional("significant_changes_only", default=True): bool,
+        vol.Optional("minimal_response", default=False): bool,
+    }
+)
+@websocket_api.async_response
+async def ws_stream(hass, connection, msg):
+    """Handle history stream websocket command.
+
+    Sends the history of the entities since start_time and then keeps
+    sending their state changes as they happen.
+    """
+    start_time = dt_util.parse_datetime(msg["start_time"])
+    if start_time is None:
+        connection.send_error(msg["id"], "invalid_start_time", "Invalid start_time")
+        return
+    start_time = dt_util.as_utc(start_time)
+
+    end_time = None
+    if "end_time" in msg:
+        end_time = dt_util.parse_datetime(msg["end_time"])
+        if end_time is None:
+            connection.send_error(msg["id"], "invalid_end_time", "Invalid end_time")
+            return
+        end_time = dt_util.as_utc(end_time)
+
+    entity_ids = msg["entity_ids"]
+    significant_changes_only = msg["significant_changes_only"]
+    minimal_response = msg["minimal_response"]
+    utc_now = dt_util.utcnow()
+    pending_states = []
+
+    @callback
+    def send_states(states):
+        connection.send_message(
+            websocket_api.event_message(msg["id"], {"states": states})
+        )
+
+    @callback
+    def forward_state_change(event):
+        """Forward a significant state change to websocket."""
+        new_state = event.data["new_state"]
+        if new_state is None:
+            return
+        old_state = event.data["old_state"]
+        need_attributes = (
+            not minimal_response or new_state.domain in NEED_ATTRIBUTE_DOMAINS
+        )
+
+        if (
+            significant_changes_only
+            and new_state.domain not in SIGNIFICANT_DOMAINS
+            and new_state.last_changed != new_state.last_updated
+        ):
+            return
+        if (
+            not need_attributes
+            and old_state is not None
+            and old_state.state == new_state.state
+        ):
+            return
+
+        if need_attributes:
+            state = new_state
+        else:
+            state = {
+                STATE_KEY: new_state.state,
+                LAST_CHANGED_KEY: new_state.last_changed.isoformat(),
+            }
+
+        if pending_states is None:
+            send_states({new_state.entity_id: [state]})
+        else:
+            pending_states.append((new_state.entity_id, state))
+
+    if end_time is None or end_time > utc_now:
+        unsubs = [
+            async_track_state_change_event(hass, entity_ids, forward_state_change)
+        ]
+
+        @callback
+        def unsubscribe():
+            while unsubs:
+                unsubs.pop()()
+
+        @callback
+        def end_stream(_):
+            unsubscribe()
+            connection.subscriptions.pop(msg["id"], None)
+
+        if end_time is not None:
+            unsubs.append(async_track_point_in_utc_time(hass, end_stream, end_time))
+        connection.subscriptions[msg["id"]] = unsubscribe
+
+    connection.send_result(msg["id"])
+
+    # The recorder may still have state changes queued that
+    # happened before the subscription started
+    instance = hass.data[recorder.DATA_INSTANCE]
+    if instance.is_alive():
+        await hass.async_add_executor_job(instance.block_till_committed)
+
+    def history_message():
+        """Fetch the history and encode the message in the executor."""
+        states = get_significant_states(
+            hass,
+            start_time,
+            utc_now if end_time is None else min(end_time, utc_now),
+            entity_ids,
+            include_start_time_state=msg["include_start_time_state"],
+            significant_changes_only=significant_changes_only,
+            minimal_response=minimal_response,
+        )
+        return message_to_json(
+            websocket_api.event_message(msg["id"], {"states": states})
+        )
+
+    connection.send_message(await hass.async_add_executor_job(history_message))
+
+    # State changes that happened while the history was fetched
+    buffered_states = defaultdict(list)
+    for entity_id, state in pending_states:
+        buffered_states[entity_id].append(state)
+    pending_states = None
+    if buffered_states:
+        send_states(buffered_states)
+
+
 class HistoryPeriodView(HomeAssistantView):
     """Handle history period requests."""
 
@@ -462,7 +718,7 @@ class HistoryPeriodView(HomeAssistantView):
 
     async def get(
         self, request: web.Request, datetime: Optional[str] = None
-    ) -> web.Response:
+    ) -> web.StreamResponse:
         """Return history over a period of time."""
         datetime_ = None
         if datetime:
@@ -495,14 +751,32 @@ class HistoryPeriodView(HomeAssistantView):
         entity_ids = None
         if entity_ids_str:
             entity_ids = entity_ids_str.lower().split(",")
+
+        hass = request.app["hass"]
+
+        resolution = request.query.get("resolution")
+        if resolution is not None:
+            if resolution not in STATISTICS_TABLES:
+                return self.json_message("Invalid resolution", HTTP_BAD_REQUEST)
+            return cast(
+                web.Response,
+                await hass.async_add_executor_job(
+                    self._statistics_json,
+                    hass,
+                    start_time,
+                    end_time,
+                    entity_ids,
+                    resolution,
+                ),
+            )
+
         include_start_time_state = "skip_initial_state" not in request.query
         significant_changes_only = (
             request.query.get("significant_changes_only", "1") != "0"
         )
 
         minimal_response = "minimal_response" in request.query
-
-        hass = request.app["hass"]
+        stream = "stream" in request.query
 
         if (
             not include_start_time_state
@@ -511,6 +785,17 @@ class HistoryPeriodView(HomeAssistantView):
         ):
             return self.json([])
 
+        if stream:
+            return await self._stream_significant_states_json(
+                request,
+                start_time,
+                end_time,
+                entity_ids,
+                include_start_time_state,
+                significant_changes_only,
+                minimal_response,
+            )
+
         return cast(
             web.Response,
             await hass.async_add_executor_job(
@@ -525,6 +810,169 @@ class HistoryPeriodView(HomeAssistantView):
             ),
         )
 
+    def _statistics_json(self, hass, start_time, end_time, entity_ids, resolution):
+        """Fetch downsampled statistics from the database as json."""
+        timer_start = time.perf_counter()
+
+        with session_scope(hass=hass) as session:
+            result = [
+                [statistic.as_dict() for statistic in group]
+                for _, group in groupby(
+                    statistics_during_period(
+                        session, start_time, end_time, entity_ids, resolution
+                    ),
+                    lambda statistic: statistic.entity_id,
+                )
+            ]
+
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            elapsed = time.perf_counter() - timer_start
+            _LOGGER.debug(
+                "Extracted %d statistics in %fs", sum(map(len, result)), elapsed
+            )
+
+        return self.json(result)
+
+    async def _stream_significant_states_json(
+        self,
+        request: web.Request,
+        start_time: dt,
+        end_time: dt,
+        entity_ids: Optional[List[str]],
+        include_start_time_state: bool,
+        significant_changes_only: bool,
+        minimal_response: bool,
+    ) -> web.StreamResponse:
+        """Stream significant states from the database as json.
+
+        The entities are returned in the same order as when the states
+        are not streamed.
+        """
+        hass = request.app["hass"]
+
+        def write_json(write):
+            self._write_significant_states_json(
+                hass,
+                write,
+                start_time,
+                end_time,
+                entity_ids,
+                include_start_time_state,
+                significant_changes_only,
+                minimal_response,
+            )
+
+        return await async_stream_json(hass, request, write_json)
+
+    def _ordered_entity_ids(self, entity_ids):
+        """Return the entities that come first in the order they come in.
+
+        These are the entities asked for or, with use_include_order, the
+        included entities. Other entities follow sorted by entity_id.
+        """
+        ordered = list(dict.fromkeys(entity_ids or []))
+        if self.filters and self.use_include_order:
+            included = [
+                entity_id
+                for entity_id in self.filters.included_entities
+                if entity_ids is None or entity_id in entity_ids
+            ]
+            ordered = included + [
+                entity_id for entity_id in ordered if entity_id not in included
+            ]
+        return ordered
+
+    def _write_significant_states_json(
+        self,
+        hass,
+        write,
+        start_time,
+        end_time,
+        entity_ids,
+        include_start_time_state,
+        significant_changes_only,
+        minimal_response,
+    ):
+        """Write significant states from the database cursor as json.
+
+        The states of an entity are read by their own query when the
+        entity comes first in the order, so the rows of the other
+        entities do not have to be held until it is written.
+        """
+        timer_start = time.perf_counter()
+        encoder = JSONEncoder(allow_nan=False)
+        count = 0
+
+        with session_scope(hass=hass) as session:
+            start_states = {}
+            if include_start_time_state:
+                start_states = {
+                    state.entity_id: state
+                    for state in _get_start_time_states(
+                        hass, session, start_time, entity_ids, self.filters
+                    )
+                }
+
+            def entity_groups(query_entity_ids, skip):
+                """Yield the states of the entities sorted by entity_id."""
+                query = _significant_states_query(
+                    hass,
+                    session,
+                    start_time,
+                    end_time,
+                    query_entity_ids,
+                    self.filters,
+                    significant_changes_only,
+                ).with_post_criteria(lambda q: q.yield_per(STREAM_BATCH_SIZE))
+                # Entities that only have a state at the start time
+                start_only = sorted(
+                    ent_id
+                    for ent_id in start_states
+                    if query_entity_ids is None or ent_id in query_entity_ids
+                )
+                start_only_index = 0
+
+                for ent_id, group in groupby(query, lambda state: state.entity_id):
+                    if ent_id in skip:
+                        continue
+                    while (
+                        start_only_index < len(start_only)
+                        and start_only[start_only_index] < ent_id
+                    ):
+                        other_id = start_only[start_only_index]
+                        start_only_index += 1
+                        if other_id in start_states:
+                            yield iter((start_states.pop(other_id),))
+                    yield _entity_states_to_json(
+                        ent_id, group, start_states.pop(ent_id, None), minimal_response
+                    )
+
+                for other_id in start_only[start_only_index:]:
+                    if other_id in start_states:
+                        yield iter((start_states.pop(other_id),))
+
+            ordered = self._ordered_entity_ids(entity_ids)
+            groups = chain.from_iterable(
+                entity_groups([ent_id], ()) for ent_id in ordered
+            )
+            if entity_ids is None:
+                groups = chain(groups, entity_groups(None, set(ordered)))
+
+            write("[")
+            for entity_index, ent_states in enumerate(groups):
+                write(",[" if entity_index else "[")
+                for state_index, state in enumerate(ent_states):
+                    if state_index:
+                        write(",")
+                    write(encoder.encode(state))
+                    count += 1
+                write("]")
+            write("]")
+
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            elapsed = time.perf_counter() - timer_start
+            _LOGGER.debug("Streamed %d states in %fs", count, elapsed)
+
     def _sorted_significant_states_json(
         self,
         hass,
@@ -572,6 +1020,90 @@ class HistoryPeriodView(HomeAssistantView):
         return self.json(result)
 
 
+class _StreamCancelled(Exception):
+    """The client of a streamed response went away."""
+
+
+async def async_stream_json(
+    hass: HomeAssistantType,
+    request: web.Request,
+    write_json: Callable[[Callable[[str], None]], None],
+) -> web.StreamResponse:
+    """Stream the json written by write_json in the executor.
+
+    write_json is called in the executor with a function that writes a
+    piece of the json. The pieces are sent in chunks of about
+    STREAM_CHUNK_SIZE characters. A bounded queue hands the chunks to the
+    event loop, so a slow client applies back pressure instead of
+    letting the response pile up in memory. When write_json fails the
+    connection is closed before the response is complete, so the client
+    does not take the json written so far for the whole response.
+    """
+    chunks: asyncio.Queue = asyncio.Queue(STREAM_MAX_PENDING_CHUNKS)
+    cancel = threading.Event()
+    failed = False
+
+    def put_chunk(chunk):
+        """Hand a chunk to the event loop, waiting while the queue is full."""
+        asyncio.run_coroutine_threadsafe(chunks.put(chunk), hass.loop).result()
+
+    def produce():
+        nonlocal failed
+        parts = []
+        size = 0
+
+        def write(text):
+            nonlocal size
+            parts.append(text)
+            size += len(text)
+            if size < STREAM_CHUNK_SIZE:
+                return
+            if cancel.is_set():
+                raise _StreamCancelled
+            put_chunk("".join(parts).encode("UTF-8"))
+            parts.clear()
+            size = 0
+
+        try:
+            write_json(write)
+            put_chunk("".join(parts).encode("UTF-8"))
+        except _StreamCancelled:
+            pass
+        except Exception:  # pylint: disable=broad-except
+            _LOGGER.exception("Error streaming %s", request.path)
+            failed = True
+        finally:
+            put_chunk(None)
+
+    response = web.StreamResponse(headers={CONTENT_TYPE: CONTENT_TYPE_JSON})
+    response.enable_compression()
+    await response.prepare(request)
+
+    producer = cast(asyncio.Future, hass.async_add_executor_job(produce))
+    try:
+        while True:
+            chunk = await chunks.get()
+            if chunk is None:
+                break
+            await response.write(chunk)
+    finally:
+        # Unblock the producer if the client went away
+        cancel.set()
+        while not producer.done():
+            while not chunks.empty():
+                chunks.get_nowait()
+            await asyncio.wait([producer], timeout=0.1)
+
+    if failed:
+        response.force_close()
+        if request.transport is not None:
+            request.transport.close()
+        return response
+
+    await response.write_eof()
+    return response
+
+
 def sqlalchemy_filter_from_include_exclude_conf(conf):
     """Build a sql filter from config."""
     filters = Filters()
@@ -1,4 +1,5 @@
 """Support for sending data to an Influx database."""
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 import logging
 import math
@@ -35,8 +36,12 @@ from homeassistant.helpers.entityfilter import (
     convert_include_exclude_filter,
 )
 
+from .backlog import BatchSize, SegmentLog
 from .const import (
     API_VERSION_2,
+    BACKLOG_DIRECTORY,
+    BACKLOG_ERROR,
+    BACKLOG_MESSAGE,
     BATCH_BUFFER_SIZE,
     BATCH_TIMEOUT,
     CATCHING_UP_MESSAGE,
@@ -85,6 +90,8 @@ from .const import (
     QUEUE_BACKLOG_SECONDS,
     RE_DECIMAL,
     RE_DIGIT_TAIL,
+    REPLAY_ERROR,
+    REPLAYED_MESSAGE,
     RESUMED_MESSAGE,
     RETRY_DELAY,
     RETRY_INTERVAL,
@@ -93,6 +100,7 @@ from .const import (
     TEST_QUERY_V2,
     TIMEOUT,
     WRITE_ERROR,
+    WRITE_WORKERS,
     WROTE_MESSAGE,
 )
 
@@ -488,7 +496,13 @@ def setup(hass, config):
 
 
 class InfluxThread(threading.Thread):
-    """A threaded event handler class."""
+    """A threaded event handler class.
+
+    Points that cannot be written, or that waited too long in the queue,
+    are spilled to a backlog on disk. A replay thread writes them with
+    several workers in parallel once InfluxDB is available again. The
+    backlog is kept over restarts.
+    """
 
     def __init__(self, hass, influx, event_to_json, max_tries):
         """Initialize the listener."""
@@ -499,6 +513,13 @@ class InfluxThread(threading.Thread):
         self.max_tries = max_tries
         self.write_errors = 0
         self.shutdown = False
+        self.batch_size = BatchSize(BATCH_BUFFER_SIZE)
+        self.backlog = SegmentLog(hass.config.path(BACKLOG_DIRECTORY))
+        self._replay_thread = threading.Thread(
+            name=f"{DOMAIN}_replay", target=self._replay_backlog
+        )
+        self._replay_wakeup = threading.Event()
+        self._replay_stop = threading.Event()
         hass.bus.listen(EVENT_STATE_CHANGED, self._event_listener)
 
     @callback
@@ -519,10 +540,10 @@ class InfluxThread(threading.Thread):
         count = 0
         json = []
 
-        dropped = 0
+        old_json = []
 
         try:
-            while len(json) < BATCH_BUFFER_SIZE and not self.shutdown:
+            while len(json) < self.batch_size.size and not self.shutdown:
                 timeout = None if count == 0 else self.batch_timeout()
                 item = self.queue.get(timeout=timeout)
                 count += 1
@@ -533,18 +554,20 @@ class InfluxThread(threading.Thread):
                     timestamp, event = item
                     age = time.monotonic() - timestamp
 
+                    event_json = self.event_to_json(event)
+                    if not event_json:
+                        continue
                     if age < queue_seconds:
-                        event_json = self.event_to_json(event)
-                        if event_json:
-                            json.append(event_json)
+                        json.append(event_json)
                     else:
-                        dropped += 1
+                        old_json.append(event_json)
 
         except queue.Empty:
             pass
 
-        if dropped:
-            _LOGGER.warning(CATCHING_UP_MESSAGE, dropped)
+        if old_json:
+            _LOGGER.warning(CATCHING_UP_MESSAGE, len(old_json))
+            self.write_to_backlog(old_json)
 
         return count, json
 
@@ -552,7 +575,9 @@ class InfluxThread(threading.Thread):
         """Write preprocessed events to influxdb, with retry."""
         for retry in range(self.max_tries + 1):
             try:
+                start = time.monotonic()
                 self.influx.write(json)
+                self.batch_size.add_write(len(json), time.monotonic() - start)
 
                 if self.write_errors:
                     _LOGGER.error(RESUMED_MESSAGE, self.write_errors)
@@ -567,19 +592,89 @@ class InfluxThread(threading.Thread):
                 if retry < self.max_tries:
                     time.sleep(RETRY_DELAY)
                 else:
-                    if not self.write_errors:
-                        _LOGGER.error(err)
-                    self.write_errors += len(json)
+                    _LOGGER.error(BACKLOG_MESSAGE, err)
+                    self.write_to_backlog(json)
+
+    def write_to_backlog(self, json):
+        """Spill preprocessed events to the backlog on disk."""
+        try:
+            self.backlog.append(json)
+        except (OSError, ValueError) as err:
+            if not self.write_errors:
+                _LOGGER.error(BACKLOG_ERROR, len(json), err)
+            self.write_errors += len(json)
+            return
+        self._replay_wakeup.set()
+
+    def _write_batch(self, json):
+        """Write a batch of the backlog, return False if influxdb is unavailable."""
+        try:
+            start = time.monotonic()
+            self.influx.write(json)
+        except ValueError as err:
+            _LOGGER.error(err)
+        except ConnectionError:
+            return False
+        except Exception:  # pylint: disable=broad-except
+            _LOGGER.exception("Error writing a batch of the backlog")
+            return False
+        else:
+            self.batch_size.add_write(len(json), time.monotonic() - start)
+        return True
+
+    def _replay_backlog(self):
+        """Write the backlog to influxdb once it is available."""
+        replayed = 0
+        with ThreadPoolExecutor(
+            max_workers=WRITE_WORKERS, thread_name_prefix=f"{DOMAIN}_writer"
+        ) as executor:
+            while not self._replay_stop.is_set():
+                try:
+                    replayed = self._replay_batches(executor, replayed)
+                except Exception:  # pylint: disable=broad-except
+                    # Must catch the exception to keep replaying
+                    _LOGGER.exception(REPLAY_ERROR)
+                    self._replay_stop.wait(RETRY_DELAY)
+
+    def _replay_batches(self, executor, replayed):
+        """Write the oldest batches of the backlog, return the events replayed."""
+        batches, position = self.backlog.peek(self.batch_size.size, WRITE_WORKERS)
+        if position is None:
+            if replayed:
+                _LOGGER.info(REPLAYED_MESSAGE, replayed)
+            self._replay_wakeup.wait()
+            self._replay_wakeup.clear()
+            return 0
+
+        done = list(executor.map(self._write_batch, batches))
+        if not all(done):
+            self._replay_stop.wait(RETRY_DELAY)
+            return replayed
+
+        # Points written twice after a partial failure replace
+        # themselves, they have the same series and time
+        self.backlog.ack(position)
+        return replayed + sum(len(batch) for batch in batches)
 
     def run(self):
         """Process incoming events."""
+        self._replay_thread.start()
         while not self.shutdown:
             count, json = self.get_events_json()
             if json:
-                self.write_to_influxdb(json)
+                if self.backlog.pending:
+                    # Keep the order, and do not wait on an unavailable server
+                    self.write_to_backlog(json)
+                else:
+                    self.write_to_influxdb(json)
             for _ in range(count):
                 self.queue.task_done()
 
+        self._replay_stop.set()
+        self._replay_wakeup.set()
+        self._replay_thread.join()
+        self.backlog.close()
+
     def block_till_done(self):
         """Block till all events processed."""
         self.queue.join()
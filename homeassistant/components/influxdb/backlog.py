@@ -0,0 +1,244 @@
+"""Disk backed backlog of the points that could not be written to InfluxDB."""
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from homeassistant.helpers.json import JSONEncoder
+
+from .const import (
+    BACKLOG_FULL_MESSAGE,
+    BACKLOG_MAX_SIZE,
+    MAX_BATCH_SIZE,
+    MIN_BATCH_SIZE,
+    SEGMENT_SIZE,
+    TARGET_WRITE_TIME,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+SEGMENT_SUFFIX = ".seg"
+
+# A segment starts with the offset of its first unread record
+_HEADER = struct.Struct("<I")
+# Every record is the length of its data followed by the data
+_LENGTH = struct.Struct("<I")
+
+
+class _Segment:
+    """Memory-mapped file holding records of points."""
+
+    __slots__ = ("path", "file", "map", "read_offset", "write_offset")
+
+    def __init__(self, path: str, size: Optional[int] = None) -> None:
+        """Open the segment, or create it with a size."""
+        self.path = path
+        if size is None:
+            self.file = open(path, "r+b")
+        else:
+            self.file = open(path, "w+b")
+            self.file.truncate(size)
+        self.map = mmap.mmap(self.file.fileno(), 0)
+
+        if size is None:
+            (self.read_offset,) = _HEADER.unpack_from(self.map, 0)
+            self.read_offset = max(self.read_offset, _HEADER.size)
+        else:
+            self.read_offset = _HEADER.size
+            _HEADER.pack_into(self.map, 0, self.read_offset)
+
+        # Unwritten space is zero, the records end with the first zero length
+        offset = self.read_offset
+        while offset + _LENGTH.size <= len(self.map):
+            (length,) = _LENGTH.unpack_from(self.map, offset)
+            if not length or offset + _LENGTH.size + length > len(self.map):
+                break
+            offset += _LENGTH.size + length
+        self.write_offset = offset
+
+    @property
+    def pending(self) -> bool:
+        """Return if the segment has unread records."""
+        return self.read_offset < self.write_offset
+
+    def fits(self, length: int) -> bool:
+        """Return if a record of a length fits in the segment."""
+        return self.write_offset + _LENGTH.size + length <= len(self.map)
+
+    def append(self, data: bytes) -> None:
+        """Append a record."""
+        start = self.write_offset + _LENGTH.size
+        self.map[start : start + len(data)] = data
+        # Written last, so a record that was cut short is never read
+        _LENGTH.pack_into(self.map, self.write_offset, len(data))
+        self.write_offset = start + len(data)
+
+    def read(self, offset: int) -> Tuple[bytes, int]:
+        """Return the data of the record at an offset and the next offset."""
+        (length,) = _LENGTH.unpack_from(self.map, offset)
+        start = offset + _LENGTH.size
+        return self.map[start : start + length], start + length
+
+    def set_read_offset(self, offset: int) -> None:
+        """Mark the records before an offset as read."""
+        self.read_offset = offset
+        _HEADER.pack_into(self.map, 0, offset)
+
+    def close(self) -> None:
+        """Write the segment to disk and close it."""
+        self.map.flush()
+        self.map.close()
+        self.file.close()
+
+    def remove(self) -> None:
+        """Close and delete the segment."""
+        self.map.close()
+        self.file.close()
+        os.remove(self.path)
+
+
+class SegmentLog:
+    """Append-only log of batches of points, split in memory-mapped segments.
+
+    Batches are read in the order they were appended and only dropped from
+    the log once marked as written, so they survive a restart. Segments are
+    deleted once all of their batches have been written. When the segments
+    take more than max_size bytes the oldest ones are dropped.
+    """
+
+    def __init__(self, path: str, max_size: int = BACKLOG_MAX_SIZE) -> None:
+        """Open the segments left in a directory."""
+        self.path = path
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._segments: List[_Segment] = []
+        self._next_sequence = 0
+
+        if not os.path.isdir(path):
+            return
+
+        for name in sorted(os.listdir(path)):
+            if not name.endswith(SEGMENT_SUFFIX):
+                continue
+            try:
+                segment = _Segment(os.path.join(path, name))
+                self._next_sequence = int(name[: -len(SEGMENT_SUFFIX)]) + 1
+            except (OSError, ValueError, struct.error) as err:
+                _LOGGER.error("Ignoring invalid backlog segment %s: %s", name, err)
+                continue
+            if segment.pending:
+                self._segments.append(segment)
+            else:
+                segment.remove()
+
+    @property
+    def pending(self) -> bool:
+        """Return if there are batches that have not been written."""
+        with self._lock:
+            return any(segment.pending for segment in self._segments)
+
+    def append(self, points: List[Dict[str, Any]]) -> None:
+        """Append a batch of points."""
+        data = json.dumps(points, cls=JSONEncoder).encode()
+        with self._lock:
+            if not self._segments or not self._segments[-1].fits(len(data)):
+                self._segments.append(self._new_segment(len(data)))
+                self._drop_oldest()
+            self._segments[-1].append(data)
+
+    def _drop_oldest(self) -> None:
+        """Drop the oldest segments while the log is larger than max_size."""
+        size = sum(len(segment.map) for segment in self._segments)
+        while size > self.max_size and len(self._segments) > 1:
+            segment = self._segments.pop(0)
+            size -= len(segment.map)
+            _LOGGER.warning(
+                BACKLOG_FULL_MESSAGE, self.max_size, os.path.basename(segment.path)
+            )
+            segment.remove()
+
+    def _new_segment(self, length: int) -> _Segment:
+        """Create a segment to hold at least a record of a length."""
+        os.makedirs(self.path, exist_ok=True)
+        name = f"{self._next_sequence:012d}{SEGMENT_SUFFIX}"
+        self._next_sequence += 1
+        size = max(SEGMENT_SIZE, _HEADER.size + _LENGTH.size + length)
+        return _Segment(os.path.join(self.path, name), size)
+
+    def peek(
+        self, batch_size: int, batches: int
+    ) -> Tuple[List[List[Dict[str, Any]]], Optional[Tuple[_Segment, int]]]:
+        """Return the oldest points as batches, and the position after them.
+
+        Points are joined into batches of at least batch_size points, the
+        last batch may be smaller.
+        """
+        result: List[List[Dict[str, Any]]] = []
+        current: List[Dict[str, Any]] = []
+        position = None
+
+        with self._lock:
+            for segment in self._segments:
+                offset = segment.read_offset
+                while offset < segment.write_offset:
+                    if len(result) == batches:
+                        return result, position
+                    data, offset = segment.read(offset)
+                    position = (segment, offset)
+                    try:
+                        points = json.loads(data)
+                        if not isinstance(points, list):
+                            raise ValueError("not a list of points")
+                    except ValueError as err:
+                        _LOGGER.error("Skipping invalid backlog record: %s", err)
+                        continue
+                    current.extend(points)
+                    if len(current) >= batch_size:
+                        result.append(current)
+                        current = []
+
+        if current:
+            result.append(current)
+        return result, position
+
+    def ack(self, position: Tuple[_Segment, int]) -> None:
+        """Drop the points before a position returned by peek."""
+        segment, offset = position
+        with self._lock:
+            if segment not in self._segments:
+                # Dropped while the batches were written
+                return
+            while self._segments[0] is not segment:
+                self._segments.pop(0).remove()
+            segment.set_read_offset(offset)
+            if not segment.pending:
+                self._segments.pop(0).remove()
+
+    def close(self) -> None:
+        """Write the segments to disk and close them."""
+        with self._lock:
+            for segment in self._segments:
+                segment.close()
+            self._segments = []
+
+
+class BatchSize:
+    """Number of points written at once, adapted to the write latency.
+
+    The size doubles while full batches are written well within the target
+    time and is halved once a write takes longer.
+    """
+
+    def __init__(self, size: int) -> None:
+        """Initialize the batch size."""
+        self.size = size
+
+    def add_write(self, points: int, seconds: float) -> None:
+        """Adapt the size to the time a write took."""
+        if seconds > TARGET_WRITE_TIME:
+            self.size = max(MIN_BATCH_SIZE, self.size // 2)
+        elif points >= self.size and seconds < TARGET_WRITE_TIME / 2:
+            self.size = min(MAX_BATCH_SIZE, self.size * 2)
@@ -77,6 +77,13 @@ QUEUE_BACKLOG_SECONDS = 30
 RETRY_INTERVAL = 60  # seconds
 BATCH_TIMEOUT = 1
 BATCH_BUFFER_SIZE = 100
+MIN_BATCH_SIZE = 10
+MAX_BATCH_SIZE = 5000
+TARGET_WRITE_TIME = 1  # seconds
+WRITE_WORKERS = 4
+BACKLOG_DIRECTORY = "influxdb_backlog"
+SEGMENT_SIZE = 4 * 1024 * 1024
+BACKLOG_MAX_SIZE = 64 * SEGMENT_SIZE
 LANGUAGE_INFLUXQL = "influxQL"
 LANGUAGE_FLUX = "flux"
 TEST_QUERY_V1 = "SHOW DATABASES;"
@@ -116,8 +123,15 @@ QUERY_ERROR = (
     "Could not execute query '%s' due to '%s'. Check the syntax of your query."
 )
 RETRY_MESSAGE = f"%s Retrying in {RETRY_INTERVAL} seconds."
-CATCHING_UP_MESSAGE = "Catching up, dropped %d old events."
+CATCHING_UP_MESSAGE = "Catching up, moved %d old events to the backlog."
 RESUMED_MESSAGE = "Resumed, lost %d events."
+BACKLOG_MESSAGE = "Writing to the backlog until InfluxDB is available again: %s"
+BACKLOG_ERROR = "Could not write to the backlog, lost %d events: %s"
+REPLAYED_MESSAGE = "Replayed %d events from the backlog."
+REPLAY_ERROR = f"Error replaying the backlog. Retrying in {RETRY_DELAY} seconds."
+BACKLOG_FULL_MESSAGE = (
+    "The backlog is larger than %d bytes, dropped its oldest events in %s."
+)
 WROTE_MESSAGE = "Wrote %d events."
 RUNNING_QUERY_MESSAGE = "Running query: %s."
 QUERY_NO_RESULTS_MESSAGE = "Query returned no results, sensor state set to UNKNOWN: %s."
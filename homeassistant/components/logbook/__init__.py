@@ -1,6 +1,7 @@
 """Event parser and human readable log generator."""
+from collections import namedtuple
 from datetime import timedelta
-from itertools import groupby
+from itertools import groupby, islice
 import json
 import re
 
@@ -9,11 +10,18 @@ from sqlalchemy.orm import aliased
 from sqlalchemy.sql.expression import literal
 import voluptuous as vol
 
+from homeassistant.components import recorder, websocket_api
 from homeassistant.components.automation import EVENT_AUTOMATION_TRIGGERED
-from homeassistant.components.history import sqlalchemy_filter_from_include_exclude_conf
+from homeassistant.components.history import (
+    async_stream_json,
+    sqlalchemy_filter_from_include_exclude_conf,
+)
 from homeassistant.components.http import HomeAssistantView
 from homeassistant.components.recorder.models import (
+    SHARED_ATTRIBUTES,
+    STATE_ATTRIBUTES_JOIN,
     Events,
+    StateAttributes,
     States,
     process_timestamp_to_utc_isoformat,
 )
@@ -26,12 +34,14 @@ from homeassistant.const import (
     ATTR_ICON,
     ATTR_NAME,
     ATTR_SERVICE,
+    ATTR_UNIT_OF_MEASUREMENT,
     EVENT_CALL_SERVICE,
     EVENT_HOMEASSISTANT_START,
     EVENT_HOMEASSISTANT_STOP,
     EVENT_LOGBOOK_ENTRY,
     EVENT_STATE_CHANGED,
     HTTP_BAD_REQUEST,
+    MATCH_ALL,
 )
 from homeassistant.core import DOMAIN as HA_DOMAIN, callback, split_entity_id
 from homeassistant.exceptions import InvalidEntityFormatError
@@ -41,9 +51,11 @@ from homeassistant.helpers.entityfilter import (
     convert_include_exclude_filter,
     generate_filter,
 )
+from homeassistant.helpers.event import async_track_point_in_utc_time
 from homeassistant.helpers.integration_platform import (
     async_process_integration_platforms,
 )
+from homeassistant.helpers.json import JSONEncoder
 from homeassistant.loader import bind_hass
 import homeassistant.util.dt as dt_util
 
@@ -59,9 +71,17 @@ CONF_ENTITIES = "entities"
 CONTINUOUS_DOMAINS = ["proximity", "sensor"]
 
 DOMAIN = "logbook"
+LOGBOOK_FILTERS = "logbook_filters"
 
 GROUP_BY_MINUTES = 15
 
+# Number of events to look up the context of at once, this leaves
+# room for the other parameters below the default SQLITE_MAX_VARIABLE_NUMBER
+CONTEXT_LOOKUP_BATCH_SIZE = 500
+
+# Number of contexts a live event stream remembers the origin of
+LIVE_CONTEXT_LOOKUP_SIZE = 256
+
 EMPTY_JSON_OBJECT = "{}"
 UNIT_OF_MEASUREMENT_JSON = '"unit_of_measurement":'
 
@@ -160,7 +180,9 @@ async def async_setup(hass, config):
         filters = None
         entities_filter = None
 
+    hass.data[LOGBOOK_FILTERS] = (filters, entities_filter)
     hass.http.register_view(LogbookView(conf, filters, entities_filter))
+    hass.components.websocket_api.async_register_command(ws_event_stream)
 
     hass.services.async_register(DOMAIN, "log", log_message, schema=LOG_MESSAGE_SCHEMA)
 
@@ -229,25 +251,272 @@ class LogbookView(HomeAssistantView):
             if end_day is None:
                 return self.json_message("Invalid end_time", HTTP_BAD_REQUEST)
 
+        limit = request.query.get("limit")
+        if limit is not None:
+            try:
+                limit = int(limit)
+            except ValueError:
+                limit = 0
+            if limit < 1:
+                return self.json_message("Invalid limit", HTTP_BAD_REQUEST)
+
+        continuation_token = request.query.get("continuation_token")
+        if continuation_token is not None:
+            continuation_token = dt_util.parse_datetime(continuation_token)
+            if continuation_token is None:
+                return self.json_message("Invalid continuation_token", HTTP_BAD_REQUEST)
+
         hass = request.app["hass"]
 
         entity_matches_only = "entity_matches_only" in request.query
 
-        def json_events():
-            """Fetch events and generate JSON."""
-            return self.json(
-                _get_events(
+        def write_json(write):
+            """Fetch events and write JSON."""
+            pager = None if limit is None else EventPager(limit)
+            encoder = JSONEncoder(allow_nan=False)
+
+            with session_scope(hass=hass) as session:
+                entries = _humanify_events(
                     hass,
+                    session,
                     start_day,
                     end_day,
                     entity_ids,
                     self.filters,
                     self.entities_filter,
                     entity_matches_only,
+                    continuation_token,
+                    pager,
                 )
+
+                if pager is not None:
+                    write('{"entries":')
+                write("[")
+                for index, entry in enumerate(entries):
+                    if index:
+                        write(",")
+                    write(encoder.encode(entry))
+                write("]")
+                if pager is not None:
+                    write(',"continuation_token":')
+                    write(encoder.encode(pager.continuation_token))
+                    write("}")
+
+        return await async_stream_json(hass, request, write_json)
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): "logbook/event_stream",
+        vol.Required("start_time"): str,
+        vol.Optional("end_time"): str,
+        vol.Optional("entity_ids"): cv.entity_ids,
+    }
+)
+@websocket_api.async_response
+async def ws_event_stream(hass, connection, msg):
+    """Handle logbook event stream websocket command.
+
+    Sends the logbook entries since start_time and then keeps sending
+    new entries as the events are fired until end_time, if given.
+    """
+    start_time = dt_util.parse_datetime(msg["start_time"])
+    if start_time is None:
+        connection.send_error(msg["id"], "invalid_start_time", "Invalid start_time")
+        return
+    start_time = dt_util.as_utc(start_time)
+
+    end_time = None
+    if "end_time" in msg:
+        end_time = dt_util.parse_datetime(msg["end_time"])
+        if end_time is None:
+            connection.send_error(msg["id"], "invalid_end_time", "Invalid end_time")
+            return
+        end_time = dt_util.as_utc(end_time)
+
+    entity_ids = msg.get("entity_ids")
+    filters, entities_filter = hass.data[LOGBOOK_FILTERS]
+    utc_now = dt_util.utcnow()
+    pending_entries = []
+
+    @callback
+    def send_entries(entries):
+        connection.send_message(
+            websocket_api.event_message(msg["id"], {"events": entries})
+        )
+
+    @callback
+    def forward_event(event):
+        """Forward the logbook entry of an event to websocket."""
+        entries = live_logbook.humanify(event)
+        if not entries:
+            return
+        if pending_entries is None:
+            send_entries(entries)
+        else:
+            pending_entries.extend(entries)
+
+    if end_time is None or end_time > utc_now:
+        live_logbook = LiveLogbook(
+            hass,
+            entities_filter
+            if entity_ids is None
+            else generate_filter([], entity_ids, [], []),
+        )
+        unsubs = [
+            hass.bus.async_listen(
+                MATCH_ALL, forward_event, event_filter=live_logbook.event_filter
             )
+        ]
+
+        @callback
+        def unsubscribe():
+            while unsubs:
+                unsubs.pop()()
+
+        @callback
+        def end_stream(_):
+            unsubscribe()
+            connection.subscriptions.pop(msg["id"], None)
+
+        if end_time is not None:
+            unsubs.append(async_track_point_in_utc_time(hass, end_stream, end_time))
+        connection.subscriptions[msg["id"]] = unsubscribe
+
+    connection.send_result(msg["id"])
+
+    # The recorder may still have events queued that were
+    # fired before the subscription started
+    instance = hass.data[recorder.DATA_INSTANCE]
+    if instance.is_alive():
+        await hass.async_add_executor_job(instance.block_till_committed)
+
+    send_entries(
+        await hass.async_add_executor_job(
+            _get_events,
+            hass,
+            start_time,
+            utc_now if end_time is None else min(end_time, utc_now),
+            entity_ids,
+            filters,
+            entities_filter,
+        )
+    )
+
+    entries, pending_entries = pending_entries, None
+    if entries:
+        send_entries(entries)
+
+
+class LiveLogbook:
+    """Humanify the events fired on the bus one at a time.
+
+    The events are filtered the same way as the events read from the
+    database. As the events that follow are not known yet, every event
+    is humanified on its own.
+    """
+
+    def __init__(self, hass, entities_filter):
+        """Initialize the live logbook."""
+        self._hass = hass
+        self._entities_filter = entities_filter
+        self._entity_attr_cache = EntityAttributeCache(hass)
+        self._context_lookup = {}
+
+    @callback
+    def event_filter(self, event):
+        """Return if an event can have a logbook entry or start a context."""
+        if event.event_type != EVENT_STATE_CHANGED:
+            return (
+                event.event_type in ALL_EVENT_TYPES_EXCEPT_STATE_CHANGED
+                or event.event_type in self._hass.data[DOMAIN]
+            )
+
+        old_state = event.data.get("old_state")
+        new_state = event.data.get("new_state")
+        if old_state is None or new_state is None:
+            return False
+        if old_state.state == new_state.state:
+            return False
+        if (
+            new_state.domain in CONTINUOUS_DOMAINS
+            and ATTR_UNIT_OF_MEASUREMENT in new_state.attributes
+        ):
+            return False
+        return self._entities_filter is None or self._entities_filter(
+            new_state.entity_id
+        )
+
+    @callback
+    def humanify(self, event):
+        """Return the logbook entries of an event."""
+        try:
+            lazy_event = LazyEventPartialState(_row_from_event(event))
+        except (TypeError, ValueError):
+            return []
+
+        context_lookup = self._context_lookup
+        if lazy_event.context_id not in context_lookup:
+            if len(context_lookup) >= LIVE_CONTEXT_LOOKUP_SIZE:
+                # Forget the oldest context
+                del context_lookup[next(iter(context_lookup))]
+            context_lookup[lazy_event.context_id] = lazy_event
+
+        if event.event_type == EVENT_CALL_SERVICE:
+            return []
+        if event.event_type != EVENT_STATE_CHANGED and not _keep_event(
+            self._hass, lazy_event, self._entities_filter
+        ):
+            return []
+
+        return list(
+            humanify(self._hass, (lazy_event,), self._entity_attr_cache, context_lookup)
+        )
+
+
+_EventRow = namedtuple(
+    "_EventRow",
+    [
+        "event_type",
+        "event_data",
+        "time_fired",
+        "context_id",
+        "context_user_id",
+        "state",
+        "entity_id",
+        "domain",
+        "attributes",
+    ],
+)
+
 
-        return await hass.async_add_executor_job(json_events)
+def _row_from_event(event):
+    """Return an event from the bus as it would be read from the database."""
+    if event.event_type != EVENT_STATE_CHANGED:
+        return _EventRow(
+            event.event_type,
+            json.dumps(event.data, cls=JSONEncoder),
+            event.time_fired,
+            event.context.id,
+            event.context.user_id,
+            None,
+            None,
+            None,
+            None,
+        )
+
+    new_state = event.data["new_state"]
+    return _EventRow(
+        event.event_type,
+        EMPTY_JSON_OBJECT,
+        event.time_fired,
+        event.context.id,
+        event.context.user_id,
+        new_state.state,
+        new_state.entity_id,
+        new_state.domain,
+        json.dumps(dict(new_state.attributes), cls=JSONEncoder),
+    )
 
 
 def humanify(hass, events, entity_attr_cache, context_lookup):
@@ -321,7 +590,7 @@ def humanify(hass, events, entity_attr_cache, context_lookup):
                     data["context_user_id"] = event.context_user_id
 
                 context_event = context_lookup.get(event.context_id)
-                if context_event and context_event != event:
+                if context_event and not _is_same_event(context_event, event):
                     _augment_data_with_context(
                         data,
                         entity_id,
@@ -398,7 +667,7 @@ def humanify(hass, events, entity_attr_cache, context_lookup):
                     data["context_user_id"] = event.context_user_id
 
                 context_event = context_lookup.get(event.context_id)
-                if context_event and context_event != event:
+                if context_event and not _is_same_event(context_event, event):
                     _augment_data_with_context(
                         data,
                         entity_id,
@@ -421,15 +690,58 @@ def _get_events(
     entity_matches_only=False,
 ):
     """Get events for a period of time."""
+    with session_scope(hass=hass) as session:
+        return list(
+            _humanify_events(
+                hass,
+                session,
+                start_day,
+                end_day,
+                entity_ids,
+                filters,
+                entities_filter,
+                entity_matches_only,
+            )
+        )
+
+
+def _humanify_events(
+    hass,
+    session,
+    start_day,
+    end_day,
+    entity_ids=None,
+    filters=None,
+    entities_filter=None,
+    entity_matches_only=False,
+    continuation_token=None,
+    pager=None,
+):
+    """Yield the logbook entries for a period of time.
+
+    When a continuation_token is given only the events after it are
+    returned. When a pager is given the events are cut off at the page
+    boundary and the pager holds the token for the next page.
+    """
 
     entity_attr_cache = EntityAttributeCache(hass)
     context_lookup = {None: None}
 
+    # The events are only filtered on the entity_ids in sql if the
+    # events that do not match are not needed to describe the context
+    match_entity_ids = entity_ids is not None and not entity_matches_only
+    # When not all the events since start_day are read the events
+    # that started a context have to be looked up separately
+    lookup_contexts = match_entity_ids or continuation_token is not None
+
     def yield_events(query):
         """Yield Events that are not filtered away."""
-        for row in query.yield_per(1000):
-            event = LazyEventPartialState(row)
-            context_lookup.setdefault(event.context_id, event)
+        events = (LazyEventPartialState(row) for row in query.yield_per(1000))
+        if lookup_contexts:
+            events = _lookup_contexts(events, context_lookup, context_query)
+        for event in events:
+            if not lookup_contexts:
+                context_lookup.setdefault(event.context_id, event)
             if event.event_type == EVENT_CALL_SERVICE:
                 continue
             if event.event_type == EVENT_STATE_CHANGED or _keep_event(
@@ -437,47 +749,99 @@ def _get_events(
             ):
                 yield event
 
+    def context_query(context_ids):
+        """Return the query for the events of the contexts since start_day."""
+        query = _generate_logbook_query(
+            hass,
+            session,
+            start_day,
+            end_day,
+            entity_ids,
+            filters,
+            entity_matches_only,
+        )
+        return query.filter(Events.context_id.in_(context_ids))
+
     if entity_ids is not None:
         entities_filter = generate_filter([], entity_ids, [], [])
 
-    with session_scope(hass=hass) as session:
-        old_state = aliased(States, name="old_state")
+    query = _generate_logbook_query(
+        hass,
+        session,
+        continuation_token or start_day,
+        end_day,
+        entity_ids,
+        filters,
+        entity_matches_only or match_entity_ids,
+    )
 
-        if entity_ids is not None:
-            query = _generate_events_query_without_states(session)
-            query = _apply_event_time_filter(query, start_day, end_day)
-            query = _apply_event_types_filter(
-                hass, query, ALL_EVENT_TYPES_EXCEPT_STATE_CHANGED
-            )
-            if entity_matches_only:
-                # When entity_matches_only is provided, contexts and events that do not
-                # contain the entity_ids are not included in the logbook response.
-                query = _apply_event_entity_id_matchers(query, entity_ids)
-
-            query = query.union_all(
-                _generate_states_query(
-                    session, start_day, end_day, old_state, entity_ids
-                )
-            )
-        else:
-            query = _generate_events_query(session)
-            query = _apply_event_time_filter(query, start_day, end_day)
-            query = _apply_events_types_and_states_filter(
-                hass, query, old_state
-            ).filter(
-                (States.last_updated == States.last_changed)
-                | (Events.event_type != EVENT_STATE_CHANGED)
-            )
-            if filters:
-                query = query.filter(
-                    filters.entity_filter() | (Events.event_type != EVENT_STATE_CHANGED)
-                )
+    events = yield_events(query)
+    if pager is not None:
+        events = pager.paginate(events)
 
-        query = query.order_by(Events.time_fired)
+    return humanify(hass, events, entity_attr_cache, context_lookup)
 
-        return list(
-            humanify(hass, yield_events(query), entity_attr_cache, context_lookup)
+
+def _is_same_event(event, other):
+    """Return if two events are the same, even if read separately."""
+    return event is other or (
+        event.context_id == other.context_id
+        and event.time_fired == other.time_fired
+        and event.event_type == other.event_type
+    )
+
+
+def _lookup_contexts(events, context_lookup, context_query):
+    """Look up the events that started the contexts of events in batches."""
+    while True:
+        events_batch = list(islice(events, CONTEXT_LOOKUP_BATCH_SIZE))
+        if not events_batch:
+            return
+
+        context_ids = {event.context_id for event in events_batch}.difference(
+            context_lookup
         )
+        if context_ids:
+            for row in context_query(list(context_ids)):
+                event = LazyEventPartialState(row)
+                context_lookup.setdefault(event.context_id, event)
+
+        yield from events_batch
+
+
+def _generate_logbook_query(
+    hass, session, start_day, end_day, entity_ids, filters, match_entity_ids
+):
+    """Return the query for the logbook events sorted by time fired."""
+    old_state = aliased(States, name="old_state")
+
+    if entity_ids is not None:
+        query = _generate_events_query_without_states(session)
+        query = _apply_event_time_filter(query, start_day, end_day)
+        query = _apply_event_types_filter(
+            hass, query, ALL_EVENT_TYPES_EXCEPT_STATE_CHANGED
+        )
+        if match_entity_ids:
+            # When entity_matches_only is provided, contexts and events that do not
+            # contain the entity_ids are not included in the logbook response.
+            query = _apply_event_entity_id_matchers(query, entity_ids)
+
+        query = query.union_all(
+            _generate_states_query(session, start_day, end_day, old_state, entity_ids)
+        )
+    else:
+        query = _generate_events_query(session)
+        query = _apply_event_time_filter(query, start_day, end_day)
+        query = _apply_events_types_and_states_filter(hass, query, old_state).filter(
+            (States.last_updated == States.last_changed)
+            | (Events.event_type != EVENT_STATE_CHANGED)
+        )
+        if filters:
+            query = query.filter(
+                filters.entity_filter() | (Events.event_type != EVENT_STATE_CHANGED)
+            )
+
+    return query.order_by(Events.time_fired)
 
 
 def _generate_events_query(session):
@@ -486,7 +850,7 @@ def _generate_events_query(session):
         States.state,
         States.entity_id,
         States.domain,
-        States.attributes,
+        SHARED_ATTRIBUTES.label("attributes"),
     )
 
 
@@ -505,6 +869,7 @@ def _generate_states_query(session, start_day, end_day, old_state, entity_ids):
         _generate_events_query(session)
         .outerjoin(Events, (States.event_id == Events.event_id))
         .outerjoin(old_state, (States.old_state_id == old_state.state_id))
+        .outerjoin(StateAttributes, STATE_ATTRIBUTES_JOIN)
         .filter(_missing_state_matcher(old_state))
         .filter(_continuous_entity_matcher())
         .filter((States.last_updated > start_day) & (States.last_updated < end_day))
@@ -519,6 +884,7 @@ def _apply_events_types_and_states_filter(hass, query, old_state):
     events_query = (
         query.outerjoin(States, (Events.event_id == States.event_id))
         .outerjoin(old_state, (States.old_state_id == old_state.state_id))
+        .outerjoin(StateAttributes, STATE_ATTRIBUTES_JOIN)
         .filter(
             (Events.event_type != EVENT_STATE_CHANGED)
             | _missing_state_matcher(old_state)
@@ -548,7 +914,7 @@ def _continuous_entity_matcher():
     #
     return sqlalchemy.or_(
         sqlalchemy.not_(States.domain.in_(CONTINUOUS_DOMAINS)),
-        sqlalchemy.not_(States.attributes.contains(UNIT_OF_MEASUREMENT_JSON)),
+        sqlalchemy.not_(SHARED_ATTRIBUTES.contains(UNIT_OF_MEASUREMENT_JSON)),
     )
 
 
@@ -634,7 +1000,7 @@ def _augment_data_with_context(
     ):
         return
 
-    if context_event == event:
+    if _is_same_event(context_event, event):
         return
 
     data["context_entity_id"] = attr_entity_id
@@ -658,6 +1024,35 @@ def _entity_name_from_event(entity_id, event, entity_attr_cache):
     ) or split_entity_id(entity_id)[1].replace("_", " ")
 
 
+class EventPager:
+    """Cut the logbook events into pages.
+
+    A page holds at least limit events and ends where the events are no
+    longer grouped together, so every page is humanified the same as if
+    all the events were read at once.
+    """
+
+    def __init__(self, limit):
+        """Initialize the pager."""
+        self._limit = limit
+        self.continuation_token = None
+
+    def paginate(self, events):
+        """Yield the events of the page."""
+        count = 0
+        group = None
+        last_event = None
+        for event in events:
+            event_group = event.time_fired_minute // GROUP_BY_MINUTES
+            if count >= self._limit and event_group != group:
+                self.continuation_token = last_event.time_fired_isoformat
+                return
+            count += 1
+            group = event_group
+            last_event = event
+            yield event
+
+
 class LazyEventPartialState:
     """A lazy version of core Event with limited State joined in."""
 
@@ -672,6 +1067,7 @@ class LazyEventPartialState:
         "domain",
         "context_id",
         "context_user_id",
+        "time_fired",
         "time_fired_minute",
     ]
 
@@ -687,7 +1083,8 @@ class LazyEventPartialState:
         self.domain = self._row.domain
         self.context_id = self._row.context_id
         self.context_user_id = self._row.context_user_id
-        self.time_fired_minute = self._row.time_fired.minute
+        self.time_fired = self._row.time_fired
+        self.time_fired_minute = self.time_fired.minute
 
     @property
     def attributes_icon(self):
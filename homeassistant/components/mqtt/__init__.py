@@ -1,6 +1,7 @@
 """Support for MQTT message handling."""
 import asyncio
-from functools import lru_cache, partial, wraps
+from collections import deque
+from functools import partial, wraps
 import inspect
 from itertools import groupby
 import json
@@ -8,8 +9,9 @@ import logging
 from operator import attrgetter
 import os
 import ssl
+import threading
 import time
-from typing import Any, Callable, List, Optional, Union
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Union
 import uuid
 
 import attr
@@ -84,6 +86,7 @@ from .discovery import (
 )
 from .models import Message, MessageCallbackType, PublishPayloadType
 from .subscription import async_subscribe_topics, async_unsubscribe_topics
+from .trie import TopicTrie
 from .util import _VALID_QOS_SCHEMA, valid_publish_topic, valid_subscribe_topic
 
 _LOGGER = logging.getLogger(__name__)
@@ -136,6 +139,13 @@ CONNECTION_FAILED_RECOVERABLE = "connection_failed_recoverable"
 DISCOVERY_COOLDOWN = 2
 TIMEOUT_ACK = 10
 
+# Received messages waiting to be handed to the event loop, newer
+# messages are dropped once the buffer is full
+MAX_PENDING_MESSAGES = 50000
+# Messages handled per event loop iteration so a flood of messages
+# does not block the other callbacks of the event loop
+MESSAGES_PER_DRAIN = 1000
+
 PLATFORMS = [
     "alarm_control_panel",
     "binary_sensor",
@@ -627,12 +637,11 @@ async def async_setup_entry(hass, entry):
     return True
 
 
-@attr.s(slots=True, frozen=True)
+@attr.s(slots=True, frozen=True, eq=False)
 class Subscription:
     """Class to hold data about an active subscription."""
 
     topic: str = attr.ib()
-    matcher: Any = attr.ib()
     job: HassJob = attr.ib()
     qos: int = attr.ib(default=0)
     encoding: str = attr.ib(default="utf-8")
@@ -655,7 +664,8 @@ class MQTT:
         self.hass = hass
         self.config_entry = config_entry
         self.conf = conf
-        self.subscriptions: List[Subscription] = []
+        self.subscriptions: Set[Subscription] = set()
+        self._subscription_trie = TopicTrie()
         self.connected = False
         self._ha_started = asyncio.Event()
         self._last_subscribe = time.time()
@@ -664,6 +674,15 @@ class MQTT:
 
         self._pending_operations = {}
 
+        self._messages_lock = threading.Lock()
+        self._pending_messages: List[Any] = []
+        self._pending_retained: Dict[str, int] = {}
+        self._draining_messages: Deque[Any] = deque()
+        self._drain_scheduled = False
+        self.coalesced_messages = 0
+        self.dropped_messages = 0
+        self._dropped_logged = 0
+
         if self.hass.state == CoreState.running:
             self._ha_started.set()
         else:
@@ -842,11 +861,9 @@ class MQTT:
         if not isinstance(topic, str):
             raise HomeAssistantError("Topic needs to be a string!")
 
-        subscription = Subscription(
-            topic, _matcher_for_topic(topic), HassJob(msg_callback), qos, encoding
-        )
-        self.subscriptions.append(subscription)
-        self._matching_subscriptions.cache_clear()
+        subscription = Subscription(topic, HassJob(msg_callback), qos, encoding)
+        self.subscriptions.add(subscription)
+        self._subscription_trie.add(topic, subscription)
 
         # Only subscribe if currently connected.
         if self.connected:
@@ -859,9 +876,9 @@ class MQTT:
             if subscription not in self.subscriptions:
                 raise HomeAssistantError("Can't remove subscription twice")
             self.subscriptions.remove(subscription)
-            self._matching_subscriptions.cache_clear()
+            self._subscription_trie.remove(topic, subscription)
 
-            if any(other.topic == topic for other in self.subscriptions):
+            if self._subscription_trie.has_filter(topic):
                 # Other subscriptions on topic remaining - don't unsubscribe.
                 return
 
@@ -947,16 +964,67 @@ class MQTT:
             self.hass.loop.create_task(publish_birth_message(birth_message))
 
     def _mqtt_on_message(self, _mqttc, _userdata, msg) -> None:
-        """Message received callback."""
-        self.hass.add_job(self._mqtt_handle_message, msg)
+        """Message received callback.
+
+        Messages are buffered and handed to the event loop in batches, so a
+        flood of messages does not wake up the event loop for every message.
+        A retained message replaces a pending retained message of the same
+        topic, unless a message that is not retained came in between.
+        """
+        with self._messages_lock:
+            pending = self._pending_messages
+            if not msg.retain:
+                self._pending_retained.pop(msg.topic, None)
+            elif msg.topic in self._pending_retained:
+                pending[self._pending_retained[msg.topic]] = msg
+                self.coalesced_messages += 1
+                return
 
-    @lru_cache(2048)
-    def _matching_subscriptions(self, topic):
-        subscriptions = []
-        for subscription in self.subscriptions:
-            if subscription.matcher(topic):
-                subscriptions.append(subscription)
-        return subscriptions
+            if len(pending) >= MAX_PENDING_MESSAGES:
+                self.dropped_messages += 1
+                return
+
+            if msg.retain:
+                self._pending_retained[msg.topic] = len(pending)
+            pending.append(msg)
+
+            if self._drain_scheduled:
+                return
+            self._drain_scheduled = True
+
+        self.hass.loop.call_soon_threadsafe(self._async_drain_messages)
+
+    @callback
+    def _async_drain_messages(self) -> None:
+        """Handle a batch of the messages received by the paho thread."""
+        draining = self._draining_messages
+        if not draining:
+            with self._messages_lock:
+                draining.extend(self._pending_messages)
+                self._pending_messages = []
+                self._pending_retained = {}
+
+        if self.dropped_messages > self._dropped_logged:
+            _LOGGER.warning(
+                "Dropped %s MQTT messages, they came in faster than they could be handled",
+                self.dropped_messages - self._dropped_logged,
+            )
+            self._dropped_logged = self.dropped_messages
+
+        for _ in range(min(len(draining), MESSAGES_PER_DRAIN)):
+            msg = draining.popleft()
+            try:
+                self._mqtt_handle_message(msg)
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("Error handling MQTT message on %s", msg.topic)
+
+        if not draining:
+            with self._messages_lock:
+                if not self._pending_messages:
+                    self._drain_scheduled = False
+                    return
+
+        self.hass.loop.call_soon(self._async_drain_messages)
 
     @callback
     def _mqtt_handle_message(self, msg) -> None:
@@ -968,7 +1036,7 @@ class MQTT:
         )
         timestamp = dt_util.utcnow()
 
-        subscriptions = self._matching_subscriptions(msg.topic)
+        subscriptions = self._subscription_trie.match(msg.topic)
 
         for subscription in subscriptions:
 
@@ -1066,16 +1134,6 @@ def _raise_on_error(result_code: int) -> None:
         )
 
 
-def _matcher_for_topic(subscription: str) -> Any:
-    # pylint: disable=import-outside-toplevel
-    from paho.mqtt.matcher import MQTTMatcher
-
-    matcher = MQTTMatcher()
-    matcher[subscription] = True
-
-    return lambda topic: next(matcher.iter_match(topic), False)
-
-
 class MqttAttributes(Entity):
     """Mixin used for platforms that support JSON attributes."""
 
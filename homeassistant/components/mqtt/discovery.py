@@ -5,10 +5,13 @@ import json
 import logging
 import re
 import time
+from typing import Callable, Iterable, List
 
 from homeassistant.components import mqtt
 from homeassistant.const import CONF_DEVICE, CONF_PLATFORM
-from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.core import callback
+from homeassistant.helpers.dispatcher import DATA_DISPATCHER, async_dispatcher_send
+from homeassistant.helpers.entity import Entity
 from homeassistant.helpers.typing import HomeAssistantType
 from homeassistant.loader import async_get_mqtt
 
@@ -46,7 +49,9 @@ SUPPORTED_COMPONENTS = [
 ALREADY_DISCOVERED = "mqtt_discovered_components"
 CONFIG_ENTRY_IS_SETUP = "mqtt_config_entry_is_setup"
 DATA_CONFIG_ENTRY_LOCK = "mqtt_config_entry_lock"
+DATA_CONFIG_ENTRY_SETUPS = "mqtt_config_entry_setups"
 DATA_CONFIG_FLOW_LOCK = "mqtt_discovery_config_flow_lock"
+DISCOVERY_PAYLOADS = "mqtt_discovery_payloads"
 DISCOVERY_UNSUBSCRIBE = "mqtt_discovery_unsubscribe"
 INTEGRATION_UNSUBSCRIBE = "mqtt_integration_discovery_unsubscribe"
 MQTT_DISCOVERY_UPDATED = "mqtt_discovery_updated_{}"
@@ -59,6 +64,7 @@ TOPIC_BASE = "~"
 def clear_discovery_hash(hass, discovery_hash):
     """Clear entry in ALREADY_DISCOVERED list."""
     del hass.data[ALREADY_DISCOVERED][discovery_hash]
+    hass.data.get(DISCOVERY_PAYLOADS, {}).pop(discovery_hash, None)
 
 
 def set_discovery_hash(hass, discovery_hash):
@@ -70,12 +76,67 @@ class MQTTConfig(dict):
     """Dummy class to allow adding attributes."""
 
 
+@callback
+def async_batch_add_entities(
+    hass: HomeAssistantType, async_add_entities: Callable[[Iterable[Entity]], None]
+) -> Callable[[Iterable[Entity]], None]:
+    """Wrap async_add_entities to add the entities discovered together at once.
+
+    Retained discovery messages arrive in bursts, adding the entities
+    discovered in the same event loop iteration with a single call saves
+    the overhead of adding them one by one.
+    """
+    pending: List[Entity] = []
+
+    async def async_add_pending() -> None:
+        """Add the entities discovered since the last call."""
+        entities = pending.copy()
+        pending.clear()
+        async_add_entities(entities)
+
+    @callback
+    def async_add_entities_batched(new_entities: Iterable[Entity]) -> None:
+        """Queue entities to be added with the others discovered together."""
+        if not pending:
+            hass.async_create_task(async_add_pending())
+        pending.extend(new_entities)
+
+    return async_add_entities_batched
+
+
 async def async_start(
     hass: HomeAssistantType, discovery_topic, config_entry=None
 ) -> bool:
     """Start MQTT Discovery."""
     mqtt_integrations = {}
 
+    async def async_setup_config_entry_platform(component):
+        """Set up the config entry for the platform of a discovered component."""
+        config_entries_key = f"{component}.mqtt"
+        try:
+            async with hass.data[DATA_CONFIG_ENTRY_LOCK]:
+                if config_entries_key in hass.data[CONFIG_ENTRY_IS_SETUP]:
+                    return
+                if component == "device_automation":
+                    # Local import to avoid circular dependencies
+                    # pylint: disable=import-outside-toplevel
+                    from . import device_automation
+
+                    await device_automation.async_setup_entry(hass, config_entry)
+                elif component == "tag":
+                    # Local import to avoid circular dependencies
+                    # pylint: disable=import-outside-toplevel
+                    from . import tag
+
+                    await tag.async_setup_entry(hass, config_entry)
+                else:
+                    await hass.config_entries.async_forward_entry_setup(
+                        config_entry, component
+                    )
+                hass.data[CONFIG_ENTRY_IS_SETUP].add(config_entries_key)
+        finally:
+            del hass.data[DATA_CONFIG_ENTRY_SETUPS][config_entries_key]
+
     async def async_entity_message_received(msg):
         """Process the received message."""
         hass.data[LAST_DISCOVERY] = time.time()
@@ -93,6 +154,25 @@ async def async_start(
             _LOGGER.warning("Integration %s is not supported", component)
             return
 
+        # If present, the node_id will be included in the discovered object id
+        discovery_id = " ".join((node_id, object_id)) if node_id else object_id
+        discovery_hash = (component, discovery_id)
+
+        if ALREADY_DISCOVERED not in hass.data:
+            hass.data[ALREADY_DISCOVERED] = {}
+        if (
+            discovery_hash in hass.data[ALREADY_DISCOVERED]
+            and hass.data[DISCOVERY_PAYLOADS].get(discovery_hash) == payload
+        ):
+            # Retained configs are sent again on every (re)subscribe
+            _LOGGER.info(
+                "Ignoring unchanged discovery payload for %s %s",
+                component,
+                discovery_id,
+            )
+            return
+        raw_payload = payload
+
         if payload:
             try:
                 payload = json.loads(payload)
@@ -123,10 +203,6 @@ async def async_start(
                     if value[-1] == TOPIC_BASE and key.endswith("topic"):
                         payload[key] = f"{value[:-1]}{base}"
 
-        # If present, the node_id will be included in the discovered object id
-        discovery_id = " ".join((node_id, object_id)) if node_id else object_id
-        discovery_hash = (component, discovery_id)
-
         if payload:
             # Attach MQTT topic to the payload, used for debug prints
             setattr(payload, "__configuration_source__", f"MQTT (topic: '{topic}')")
@@ -139,8 +215,6 @@ async def async_start(
 
             payload[CONF_PLATFORM] = "mqtt"
 
-        if ALREADY_DISCOVERED not in hass.data:
-            hass.data[ALREADY_DISCOVERED] = {}
         if discovery_hash in hass.data[ALREADY_DISCOVERED]:
             # Dispatch update
             _LOGGER.info(
@@ -148,34 +222,30 @@ async def async_start(
                 component,
                 discovery_id,
             )
-            async_dispatcher_send(
-                hass, MQTT_DISCOVERY_UPDATED.format(discovery_hash), payload
-            )
+            signal = MQTT_DISCOVERY_UPDATED.format(discovery_hash)
+            if hass.data.get(DATA_DISPATCHER, {}).get(signal):
+                hass.data[DISCOVERY_PAYLOADS][discovery_hash] = raw_payload
+            else:
+                # Nothing applied the update, so a resend must not be ignored
+                hass.data[DISCOVERY_PAYLOADS].pop(discovery_hash, None)
+            async_dispatcher_send(hass, signal, payload)
         elif payload:
             # Add component
             _LOGGER.info("Found new component: %s %s", component, discovery_id)
             hass.data[ALREADY_DISCOVERED][discovery_hash] = None
+            # The new entity is set up with this payload
+            hass.data[DISCOVERY_PAYLOADS][discovery_hash] = raw_payload
 
             config_entries_key = f"{component}.mqtt"
-            async with hass.data[DATA_CONFIG_ENTRY_LOCK]:
-                if config_entries_key not in hass.data[CONFIG_ENTRY_IS_SETUP]:
-                    if component == "device_automation":
-                        # Local import to avoid circular dependencies
-                        # pylint: disable=import-outside-toplevel
-                        from . import device_automation
-
-                        await device_automation.async_setup_entry(hass, config_entry)
-                    elif component == "tag":
-                        # Local import to avoid circular dependencies
-                        # pylint: disable=import-outside-toplevel
-                        from . import tag
-
-                        await tag.async_setup_entry(hass, config_entry)
-                    else:
-                        await hass.config_entries.async_forward_entry_setup(
-                            config_entry, component
-                        )
-                    hass.data[CONFIG_ENTRY_IS_SETUP].add(config_entries_key)
+            if config_entries_key not in hass.data[CONFIG_ENTRY_IS_SETUP]:
+                # Components discovered while the platform is set up wait for
+                # the same setup, so they are all dispatched together after it
+                setups = hass.data[DATA_CONFIG_ENTRY_SETUPS]
+                if config_entries_key not in setups:
+                    setups[config_entries_key] = hass.async_create_task(
+                        async_setup_config_entry_platform(component)
+                    )
+                await asyncio.shield(setups[config_entries_key])
 
             async_dispatcher_send(
                 hass, MQTT_DISCOVERY_NEW.format(component, "mqtt"), payload
@@ -184,6 +254,8 @@ async def async_start(
     hass.data[DATA_CONFIG_ENTRY_LOCK] = asyncio.Lock()
     hass.data[DATA_CONFIG_FLOW_LOCK] = asyncio.Lock()
     hass.data[CONFIG_ENTRY_IS_SETUP] = set()
+    hass.data[DATA_CONFIG_ENTRY_SETUPS] = {}
+    hass.data[DISCOVERY_PAYLOADS] = {}
 
     hass.data[DISCOVERY_UNSUBSCRIBE] = await mqtt.async_subscribe(
         hass, f"{discovery_topic}/#", async_entity_message_received, 0
@@ -0,0 +1,110 @@
+"""Prefix tree to match MQTT topics against subscription topic filters."""
+from typing import Any, Dict, List
+
+
+class _TrieNode:
+    """Level of a topic filter with the values of the filters ending here."""
+
+    __slots__ = ("children", "values")
+
+    def __init__(self) -> None:
+        """Initialize the node."""
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.values: List[Any] = []
+
+
+class TopicTrie:
+    """Prefix tree of topic filters.
+
+    Matching a topic walks the tree one topic level at a time, so it does
+    not depend on the number of filters. A "+" level matches any single
+    level and a "#" level the remaining levels, including none. Wildcards
+    on the first level do not match topics starting with "$".
+    """
+
+    def __init__(self) -> None:
+        """Initialize the tree."""
+        self._root = _TrieNode()
+
+    def add(self, topic_filter: str, value: Any) -> None:
+        """Add a value for a topic filter."""
+        node = self._root
+        for level in topic_filter.split("/"):
+            child = node.children.get(level)
+            if child is None:
+                child = node.children[level] = _TrieNode()
+            node = child
+        node.values.append(value)
+
+    def remove(self, topic_filter: str, value: Any) -> None:
+        """Remove a value of a topic filter.
+
+        Raises KeyError if the value was not added for the filter.
+        """
+        path = []
+        node = self._root
+        for level in topic_filter.split("/"):
+            child = node.children.get(level)
+            if child is None:
+                raise KeyError(topic_filter)
+            path.append((node, level))
+            node = child
+
+        for index, other in enumerate(node.values):
+            if other is value:
+                del node.values[index]
+                break
+        else:
+            raise KeyError(topic_filter)
+
+        # Drop the levels that no longer lead to any value
+        for parent, level in reversed(path):
+            child = parent.children[level]
+            if child.values or child.children:
+                break
+            del parent.children[level]
+
+    def has_filter(self, topic_filter: str) -> bool:
+        """Return if there are values for a topic filter."""
+        node = self._root
+        for level in topic_filter.split("/"):
+            child = node.children.get(level)
+            if child is None:
+                return False
+            node = child
+        return bool(node.values)
+
+    def match(self, topic: str) -> List[Any]:
+        """Return the values of all topic filters matching a topic."""
+        levels = topic.split("/")
+        matches: List[Any] = []
+        nodes = [self._root]
+        wildcards = not topic.startswith("$")
+
+        for level in levels:
+            next_nodes = []
+            for node in nodes:
+                children = node.children
+                child = children.get(level)
+                if child is not None:
+                    next_nodes.append(child)
+                if wildcards:
+                    child = children.get("+")
+                    if child is not None:
+                        next_nodes.append(child)
+                    child = children.get("#")
+                    if child is not None:
+                        matches.extend(child.values)
+            if not next_nodes:
+                return matches
+            nodes = next_nodes
+            wildcards = True
+
+        for node in nodes:
+            matches.extend(node.values)
+            # A filter ending in "#" also matches its parent level
+            child = node.children.get("#")
+            if child is not None:
+                matches.extend(child.values)
+
+        return matches
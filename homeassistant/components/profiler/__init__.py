@@ -10,20 +10,24 @@ import objgraph
 from pyprof2calltree import convert
 import voluptuous as vol
 
+from homeassistant.components import websocket_api
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.core import HomeAssistant, ServiceCall, callback
 import homeassistant.helpers.config_validation as cv
-from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.event import async_get_timer_wheel, async_track_time_interval
 from homeassistant.helpers.service import async_register_admin_service
 from homeassistant.helpers.typing import ConfigType
 
-from .const import DOMAIN
+from .const import BUS_PROFILER, DOMAIN
+from .listeners import BusProfiler
 
 SERVICE_START = "start"
 SERVICE_MEMORY = "memory"
 SERVICE_START_LOG_OBJECTS = "start_log_objects"
 SERVICE_STOP_LOG_OBJECTS = "stop_log_objects"
 SERVICE_DUMP_LOG_OBJECTS = "dump_log_objects"
+SERVICE_START_LISTENER_PROFILE = "start_listener_profile"
+SERVICE_STOP_LISTENER_PROFILE = "stop_listener_profile"
 
 SERVICES = (
     SERVICE_START,
@@ -31,13 +35,18 @@ SERVICES = (
     SERVICE_START_LOG_OBJECTS,
     SERVICE_STOP_LOG_OBJECTS,
     SERVICE_DUMP_LOG_OBJECTS,
+    SERVICE_START_LISTENER_PROFILE,
+    SERVICE_STOP_LISTENER_PROFILE,
 )
 
+PLATFORMS = ["sensor"]
+
 DEFAULT_SCAN_INTERVAL = timedelta(seconds=30)
 
 CONF_SECONDS = "seconds"
 CONF_SCAN_INTERVAL = "scan_interval"
 CONF_TYPE = "type"
+CONF_LIMIT = "limit"
 
 LOG_INTERVAL_SUB = "log_interval_subscription"
 
@@ -46,6 +55,7 @@ _LOGGER = logging.getLogger(__name__)
 
 async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
     """Set up the profiler component."""
+    websocket_api.async_register_command(hass, websocket_listener_stats)
     return True
 
 
@@ -84,6 +94,25 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
         hass.components.persistent_notification.async_dismiss("profile_object_logging")
         domain_data.pop(LOG_INTERVAL_SUB)()
 
+    async def _async_start_listener_profile(call: ServiceCall):
+        if BUS_PROFILER in domain_data:
+            domain_data[BUS_PROFILER].async_stop()
+
+        hass.components.persistent_notification.async_create(
+            "Listener profiling has started. The busiest event listeners are reported by the profiler sensors and the profiler/listener_stats websocket command.",
+            title="Listener profiling started",
+            notification_id="profile_listeners",
+        )
+        domain_data[BUS_PROFILER] = BusProfiler(hass)
+        domain_data[BUS_PROFILER].async_start()
+
+    async def _async_stop_listener_profile(call: ServiceCall):
+        if BUS_PROFILER not in domain_data:
+            return
+
+        hass.components.persistent_notification.async_dismiss("profile_listeners")
+        domain_data.pop(BUS_PROFILER).async_stop()
+
     def _dump_log_objects(call: ServiceCall):
         obj_type = call.data[CONF_TYPE]
 
@@ -149,19 +178,75 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
         schema=vol.Schema({vol.Required(CONF_TYPE): str}),
     )
 
+    async_register_admin_service(
+        hass,
+        DOMAIN,
+        SERVICE_START_LISTENER_PROFILE,
+        _async_start_listener_profile,
+        schema=vol.Schema({}),
+    )
+
+    async_register_admin_service(
+        hass,
+        DOMAIN,
+        SERVICE_STOP_LISTENER_PROFILE,
+        _async_stop_listener_profile,
+        schema=vol.Schema({}),
+    )
+
+    for platform in PLATFORMS:
+        hass.async_create_task(
+            hass.config_entries.async_forward_entry_setup(entry, platform)
+        )
+
     return True
 
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Unload a config entry."""
+    unload_ok = all(
+        await asyncio.gather(
+            *[
+                hass.config_entries.async_forward_entry_unload(entry, platform)
+                for platform in PLATFORMS
+            ]
+        )
+    )
+    if not unload_ok:
+        return False
+
     for service in SERVICES:
         hass.services.async_remove(domain=DOMAIN, service=service)
     if LOG_INTERVAL_SUB in hass.data[DOMAIN]:
         hass.data[DOMAIN][LOG_INTERVAL_SUB]()
+    if BUS_PROFILER in hass.data[DOMAIN]:
+        hass.data[DOMAIN][BUS_PROFILER].async_stop()
     hass.data.pop(DOMAIN)
     return True
 
 
+@websocket_api.require_admin
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): "profiler/listener_stats",
+        vol.Optional(CONF_LIMIT, default=25): vol.All(int, vol.Range(min=1)),
+    }
+)
+@callback
+def websocket_listener_stats(hass, connection, msg):
+    """Return the busiest event listeners while listener profiling runs."""
+    profiler = hass.data.get(DOMAIN, {}).get(BUS_PROFILER)
+    if profiler is None:
+        connection.send_error(
+            msg["id"], websocket_api.ERR_NOT_FOUND, "Listener profiling is not running"
+        )
+        return
+
+    result = profiler.async_as_dict(msg[CONF_LIMIT])
+    result["timer_wheel"] = async_get_timer_wheel(hass).async_as_dict()
+    connection.send_result(msg["id"], result)
+
+
 async def _async_generate_profile(hass: HomeAssistant, call: ServiceCall):
     start_time = int(time.time() * 1000000)
     hass.components.persistent_notification.async_create(
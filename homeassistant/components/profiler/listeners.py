@@ -0,0 +1,218 @@
+"""Measure the time spent by the listeners of the event bus."""
+from asyncio import Future, TimerHandle
+from collections import deque
+import functools
+import math
+import time
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from homeassistant.core import Event, HassJob, HassJobType, HomeAssistant, callback
+import homeassistant.util.dt as dt_util
+
+# Number of recent durations kept per listener for the 99th percentile
+DURATION_SAMPLES = 1000
+
+# Seconds between two measurements of the event loop lag
+LOOP_LAG_INTERVAL = 1.0
+
+
+def _ms(seconds: float) -> float:
+    """Convert seconds to rounded milliseconds."""
+    return round(seconds * 1000, 3)
+
+
+def listener_name(target: Callable) -> str:
+    """Return the module and qualified name of a listener."""
+    while isinstance(target, functools.partial):
+        target = target.func
+    qualname = getattr(target, "__qualname__", None) or type(target).__qualname__
+    return f"{getattr(target, '__module__', None)}.{qualname}"
+
+
+def listener_integration(name: str) -> str:
+    """Return the integration a listener belongs to."""
+    parts = name.split(".")
+    if parts[:2] == ["homeassistant", "components"] and len(parts) > 3:
+        return parts[2]
+    if parts[0] == "custom_components" and len(parts) > 2:
+        return parts[1]
+    return parts[0]
+
+
+class ListenerStats:
+    """Calls and durations of a listener."""
+
+    __slots__ = ("integration", "calls", "total", "durations")
+
+    def __init__(self, integration: str) -> None:
+        """Initialize the stats."""
+        self.integration = integration
+        self.calls = 0
+        self.total = 0.0
+        self.durations: Deque[float] = deque(maxlen=DURATION_SAMPLES)
+
+    def add(self, duration: float) -> None:
+        """Add the duration of a call."""
+        self.calls += 1
+        self.total += duration
+        self.durations.append(duration)
+
+    @property
+    def p99(self) -> float:
+        """Return the 99th percentile of the recent durations."""
+        if not self.durations:
+            return 0.0
+        durations = sorted(self.durations)
+        return durations[math.ceil(len(durations) * 0.99) - 1]
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the stats with durations in milliseconds."""
+        return {
+            "integration": self.integration,
+            "calls": self.calls,
+            "total": _ms(self.total),
+            "p99": _ms(self.p99),
+        }
+
+
+class BusProfiler:
+    """Run the listeners of fired events and time them.
+
+    Callbacks are timed while they run in the event loop. Coroutine
+    and executor jobs are timed from being scheduled until done, which
+    includes the time they spend waiting.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the profiler."""
+        self.hass = hass
+        self.started = dt_util.utcnow()
+        self.listeners: Dict[str, ListenerStats] = {}
+        self.events: Dict[str, int] = {}
+        self.listener_jobs: Dict[str, int] = {}
+        self.outstanding_jobs = 0
+        self.loop_lag = 0.0
+        self.max_loop_lag = 0.0
+        self._lag_timer: Optional[TimerHandle] = None
+
+    @callback
+    def async_start(self) -> None:
+        """Start running the listeners of the bus."""
+        self.hass.bus.async_set_profiler(self)
+        self._async_schedule_lag_check()
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop running the listeners of the bus."""
+        self.hass.bus.async_set_profiler(None)
+        if self._lag_timer is not None:
+            self._lag_timer.cancel()
+            self._lag_timer = None
+
+    @callback
+    def _async_schedule_lag_check(self) -> None:
+        """Schedule the next measurement of the event loop lag."""
+        expected = self.hass.loop.time() + LOOP_LAG_INTERVAL
+        self._lag_timer = self.hass.loop.call_at(
+            expected, self._async_check_lag, expected
+        )
+
+    @callback
+    def _async_check_lag(self, expected: float) -> None:
+        """Measure how late the event loop ran the timer."""
+        self.loop_lag = max(self.hass.loop.time() - expected, 0.0)
+        self.max_loop_lag = max(self.max_loop_lag, self.loop_lag)
+        self._async_schedule_lag_check()
+
+    @callback
+    def async_event_fired(self, event: Event) -> None:
+        """Count a fired event."""
+        self.events[event.event_type] = self.events.get(event.event_type, 0) + 1
+
+    @callback
+    def async_add_hass_job(self, job: HassJob, event: Event) -> Optional[Future]:
+        """Add the job of a listener and time it."""
+        name = listener_name(job.target)
+        stats = self.listeners.get(name)
+        if stats is None:
+            stats = self.listeners[name] = ListenerStats(listener_integration(name))
+        event_type = event.event_type
+        self.listener_jobs[event_type] = self.listener_jobs.get(event_type, 0) + 1
+        self.outstanding_jobs += 1
+
+        if job.job_type == HassJobType.Callback:
+            self.hass.loop.call_soon(self._run_callback, stats, job.target, event)
+            return None
+
+        task = self.hass.async_add_hass_job(job, event)
+        assert task is not None
+        task.add_done_callback(
+            functools.partial(self._job_done, stats, time.perf_counter())
+        )
+        return task
+
+    def _run_callback(
+        self, stats: ListenerStats, target: Callable, event: Event
+    ) -> None:
+        """Run a callback listener and time it."""
+        start = time.perf_counter()
+        try:
+            target(event)
+        finally:
+            self._add_duration(stats, time.perf_counter() - start)
+
+    def _job_done(self, stats: ListenerStats, start: float, _: Future) -> None:
+        """Time a coroutine or executor job once done."""
+        self._add_duration(stats, time.perf_counter() - start)
+
+    def _add_duration(self, stats: ListenerStats, duration: float) -> None:
+        """Add the duration of a finished job."""
+        stats.add(duration)
+        self.outstanding_jobs -= 1
+
+    @callback
+    def async_busiest_listener(self) -> Optional[str]:
+        """Return the listener with the highest cumulative time."""
+        if not self.listeners:
+            return None
+        return max(self.listeners, key=lambda name: self.listeners[name].total)
+
+    @callback
+    def async_as_dict(self, limit: int) -> Dict[str, Any]:
+        """Return the busiest listeners and the fan-out of event types."""
+        listeners = sorted(
+            self.listeners.items(), key=lambda item: item[1].total, reverse=True
+        )
+        integrations: Dict[str, float] = {}
+        for stats in self.listeners.values():
+            integrations[stats.integration] = (
+                integrations.get(stats.integration, 0.0) + stats.total
+            )
+        event_types: List[Dict[str, Any]] = [
+            {
+                "event_type": event_type,
+                "events": events,
+                "listener_jobs": self.listener_jobs.get(event_type, 0),
+                "fan_out": round(self.listener_jobs.get(event_type, 0) / events, 2),
+            }
+            for event_type, events in self.events.items()
+        ]
+        event_types.sort(key=lambda item: item["listener_jobs"], reverse=True)
+
+        return {
+            "started": self.started.isoformat(),
+            "loop_lag": _ms(self.loop_lag),
+            "max_loop_lag": _ms(self.max_loop_lag),
+            "outstanding_jobs": self.outstanding_jobs,
+            "listeners": [
+                {"listener": name, **stats.as_dict()}
+                for name, stats in listeners[:limit]
+            ],
+            "integrations": [
+                {"integration": integration, "total": _ms(total)}
+                for integration, total in sorted(
+                    integrations.items(), key=lambda item: item[1], reverse=True
+                )
+            ][:limit],
+            "event_types": event_types[:limit],
+        }
@@ -0,0 +1,124 @@
+"""Sensors reporting the load of the event bus while listener profiling runs."""
+from typing import Any, Dict, Optional
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import TIME_MILLISECONDS
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity import Entity
+
+from .const import BUS_PROFILER, DEFAULT_NAME, DOMAIN
+from .listeners import BusProfiler
+
+MAX_STATE_LENGTH = 255
+
+
+async def async_setup_entry(
+    hass: HomeAssistant, entry: ConfigEntry, async_add_entities
+) -> None:
+    """Set up the profiler sensors."""
+    async_add_entities(
+        [
+            LoopLagSensor(entry),
+            OutstandingJobsSensor(entry),
+            BusiestListenerSensor(entry),
+        ]
+    )
+
+
+class ProfilerSensor(Entity):
+    """Base class of the profiler sensors."""
+
+    _name = ""
+    _key = ""
+
+    def __init__(self, entry: ConfigEntry) -> None:
+        """Initialize the sensor."""
+        self._entry = entry
+
+    @property
+    def profiler(self) -> Optional[BusProfiler]:
+        """Return the running listener profiler."""
+        return self.hass.data[DOMAIN].get(BUS_PROFILER)
+
+    @property
+    def name(self) -> str:
+        """Return the name of the sensor."""
+        return f"{DEFAULT_NAME} {self._name}"
+
+    @property
+    def unique_id(self) -> str:
+        """Return the unique id of the sensor."""
+        return f"{self._entry.entry_id}_{self._key}"
+
+    @property
+    def available(self) -> bool:
+        """Return if listener profiling is running."""
+        return self.profiler is not None
+
+
+class LoopLagSensor(ProfilerSensor):
+    """Sensor for how late the event loop runs its timers."""
+
+    _name = "Event loop lag"
+    _key = "loop_lag"
+
+    @property
+    def state(self) -> Optional[float]:
+        """Return the latest event loop lag."""
+        if self.profiler is None:
+            return None
+        return round(self.profiler.loop_lag * 1000, 3)
+
+    @property
+    def unit_of_measurement(self) -> str:
+        """Return the unit of the lag."""
+        return TIME_MILLISECONDS
+
+    @property
+    def device_state_attributes(self) -> Optional[Dict[str, Any]]:
+        """Return the highest lag since profiling started."""
+        if self.profiler is None:
+            return None
+        return {"max_loop_lag": round(self.profiler.max_loop_lag * 1000, 3)}
+
+
+class OutstandingJobsSensor(ProfilerSensor):
+    """Sensor for the listener jobs that have not finished yet."""
+
+    _name = "Outstanding listener jobs"
+    _key = "outstanding_jobs"
+
+    @property
+    def state(self) -> Optional[int]:
+        """Return the number of outstanding listener jobs."""
+        if self.profiler is None:
+            return None
+        return self.profiler.outstanding_jobs
+
+
+class BusiestListenerSensor(ProfilerSensor):
+    """Sensor for the listener with the highest cumulative time."""
+
+    _name = "Busiest listener"
+    _key = "busiest_listener"
+
+    @property
+    def state(self) -> Optional[str]:
+        """Return the name of the busiest listener."""
+        if self.profiler is None:
+            return None
+        name = self.profiler.async_busiest_listener()
+        if name is None:
+            return None
+        # States are limited to 255 characters, the end names the function
+        return name[-MAX_STATE_LENGTH:]
+
+    @property
+    def device_state_attributes(self) -> Optional[Dict[str, Any]]:
+        """Return the calls and durations of the busiest listener."""
+        if self.profiler is None:
+            return None
+        name = self.profiler.async_busiest_listener()
+        if name is None:
+            return None
+        return self.profiler.listeners[name].as_dict()
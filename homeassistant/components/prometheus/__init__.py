@@ -1,8 +1,13 @@
 """Support for Prometheus metrics export."""
+import asyncio
+import gzip
 import logging
 import string
+import threading
+import time
+from typing import Dict, Optional, Set
 
-from aiohttp import web
+from aiohttp import hdrs, web
 import prometheus_client
 import voluptuous as vol
 
@@ -41,6 +46,12 @@ _LOGGER = logging.getLogger(__name__)
 
 API_ENDPOINT = "/api/prometheus"
 
+# Seconds a rendered exposition is served to all scrapes
+EXPOSITION_CACHE_TIME = 5
+# Scrapes repeat every few seconds, a fast compression is worth more
+# than a few saved bytes
+GZIP_COMPRESS_LEVEL = 1
+
 DOMAIN = "prometheus"
 CONF_FILTER = "filter"
 CONF_PROM_NAMESPACE = "namespace"
@@ -79,8 +90,6 @@ CONFIG_SCHEMA = vol.Schema(
 
 def setup(hass, config):
     """Activate Prometheus component."""
-    hass.http.register_view(PrometheusView(prometheus_client))
-
     conf = config[DOMAIN]
     entity_filter = conf[CONF_FILTER]
     namespace = conf.get(CONF_PROM_NAMESPACE)
@@ -103,6 +112,7 @@ def setup(hass, config):
         default_metric,
     )
 
+    hass.http.register_view(PrometheusView(prometheus_client, metrics))
     hass.bus.listen(EVENT_STATE_CHANGED, metrics.handle_event)
     return True
 
@@ -140,6 +150,10 @@ class PrometheusMetrics:
             self.metrics_prefix = ""
         self._metrics = {}
         self._climate_units = climate_units
+        # State changes are handled in the executor, guard the changed metrics
+        self._changed_lock = threading.Lock()
+        self._changed: Set[str] = set()
+        self._exposition = PrometheusExposition(prometheus_cli)
 
     def handle_event(self, event):
         """Listen for new messages on the bus, and add them to Prometheus."""
@@ -198,14 +212,27 @@ class PrometheusMetrics:
         if extra_labels is not None:
             labels.extend(extra_labels)
 
-        try:
-            return self._metrics[metric]
-        except KeyError:
+        if metric not in self._metrics:
             full_metric_name = self._sanitize_metric_name(
                 f"{self.metrics_prefix}{metric}"
             )
-            self._metrics[metric] = factory(full_metric_name, documentation, labels)
-            return self._metrics[metric]
+            # Rendered by PrometheusExposition instead of the default registry
+            self._metrics[metric] = factory(
+                full_metric_name, documentation, labels, registry=None
+            )
+
+        with self._changed_lock:
+            self._changed.add(metric)
+        return self._metrics[metric]
+
+    def render(self):
+        """Return the exposition of the metrics.
+
+        Only the metrics changed since the last call are rendered again.
+        """
+        with self._changed_lock:
+            changed, self._changed = self._changed, set()
+        return self._exposition.render(self._metrics.copy(), changed)
 
     @staticmethod
     def _sanitize_metric_name(metric: str) -> str:
@@ -473,21 +500,85 @@ class PrometheusMetrics:
         metric.labels(**self._labels(state)).inc()
 
 
+class PrometheusExposition:
+    """Exposition of the metrics, rendered per metric family.
+
+    The families of the Home Assistant metrics are kept rendered and only
+    rendered again once they changed. The collectors of the default
+    registry, like the process and platform collectors, are rendered
+    every time.
+    """
+
+    def __init__(self, prometheus_cli):
+        """Initialize the exposition."""
+        self.prometheus_cli = prometheus_cli
+        self._families: Dict[str, bytes] = {}
+        self._previous_changed: Set[str] = set()
+
+    def render(self, metrics, changed):
+        """Render the changed metric families and return the exposition."""
+        # A metric is marked changed before its value is set, so a value set
+        # while rendering shows once its family is rendered again next time
+        outdated = changed | self._previous_changed
+        self._previous_changed = changed
+
+        for metric, collector in metrics.items():
+            if metric in outdated or metric not in self._families:
+                self._families[metric] = self.prometheus_cli.generate_latest(collector)
+        body = b"".join(
+            [
+                self.prometheus_cli.generate_latest(),
+                *(self._families[metric] for metric in metrics),
+            ]
+        )
+        return body
+
+
 class PrometheusView(HomeAssistantView):
     """Handle Prometheus requests."""
 
     url = API_ENDPOINT
     name = "api:prometheus"
 
-    def __init__(self, prometheus_cli):
+    def __init__(self, prometheus_cli, metrics):
         """Initialize Prometheus view."""
         self.prometheus_cli = prometheus_cli
+        self.metrics = metrics
+        # Created in the event loop, the view is created in the executor
+        self._lock: Optional[asyncio.Lock] = None
+        self._rendered: Optional[float] = None
+        self._body = b""
+        self._gzip_body: Optional[bytes] = None
 
     async def get(self, request):
         """Handle request for Prometheus metrics."""
         _LOGGER.debug("Received Prometheus metrics request")
 
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        hass = request.app["hass"]
+        headers = {}
+        # Scrapes arriving while rendering wait for it and share the result
+        async with self._lock:
+            if (
+                self._rendered is None
+                or time.monotonic() - self._rendered >= EXPOSITION_CACHE_TIME
+            ):
+                self._body = await hass.async_add_executor_job(self.metrics.render)
+                self._gzip_body = None
+                self._rendered = time.monotonic()
+            body = self._body
+
+            # Compressed once, by the first scrape of the render that asks for it
+            if "gzip" in request.headers.get(hdrs.ACCEPT_ENCODING, ""):
+                if self._gzip_body is None:
+                    self._gzip_body = await hass.async_add_executor_job(
+                        gzip.compress, body, GZIP_COMPRESS_LEVEL
+                    )
+                body = self._gzip_body
+                headers[hdrs.CONTENT_ENCODING] = "gzip"
+
         return web.Response(
-            body=self.prometheus_cli.generate_latest(),
-            content_type=CONTENT_TYPE_TEXT_PLAIN,
+            body=body, content_type=CONTENT_TYPE_TEXT_PLAIN, headers=headers
         )
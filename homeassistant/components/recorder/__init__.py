@@ -1,6 +1,6 @@
 """Support for recording details."""
 import asyncio
-from collections import namedtuple
+from collections import OrderedDict, namedtuple
 import concurrent.futures
 from datetime import datetime
 import logging
@@ -9,7 +9,14 @@ import threading
 import time
 from typing import Any, Callable, List, Optional
 
-from sqlalchemy import create_engine, event as sqlalchemy_event, exc, select
+from sqlalchemy import (
+    bindparam,
+    create_engine,
+    event as sqlalchemy_event,
+    exc,
+    func,
+    select,
+)
 from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.pool import StaticPool
 import voluptuous as vol
@@ -36,7 +43,9 @@ import homeassistant.util.dt as dt_util
 
 from . import migration, purge
 from .const import CONF_DB_INTEGRITY_CHECK, DATA_INSTANCE, DOMAIN, SQLITE_URL_PREFIX
-from .models import Base, Events, RecorderRuns, States
+from .models import Base, Events, RecorderRuns, StateAttributes, States, StateSnapshots
+from .snapshots import SNAPSHOT_INTERVAL, SnapshotTracker
+from .statistics import STATISTICS_TABLES, StatisticsCompiler
 from .util import session_scope, validate_or_move_away_sqlite_database
 
 _LOGGER = logging.getLogger(__name__)
@@ -59,8 +68,22 @@ DEFAULT_DB_INTEGRITY_CHECK = True
 DEFAULT_DB_MAX_RETRIES = 10
 DEFAULT_DB_RETRY_WAIT = 3
 DEFAULT_COMMIT_INTERVAL = 1
+DEFAULT_BATCH_INSERT = False
 KEEPALIVE_TIME = 30
 
+# Maximum number of events held in the write-behind
+# buffer before it is written out ahead of the commit
+MAX_PENDING_EVENTS = 5000
+
+# Number of recently seen shared attributes to keep the
+# state_attributes id of so they are not looked up again
+STATE_ATTRIBUTES_ID_CACHE_SIZE = 2048
+
+# Seconds to wait for the events queued so far to be committed
+# and how often to check the recorder is still running meanwhile
+COMMIT_WAIT_TIMEOUT = 30
+COMMIT_WAIT_INTERVAL = 1
+
 # Controls how often we clean up
 # States and Events objects
 EXPIRE_AFTER_COMMITS = 120
@@ -73,6 +96,7 @@ CONF_PURGE_KEEP_DAYS = "purge_keep_days"
 CONF_PURGE_INTERVAL = "purge_interval"
 CONF_EVENT_TYPES = "event_types"
 CONF_COMMIT_INTERVAL = "commit_interval"
+CONF_BATCH_INSERT = "batch_insert"
 
 EXCLUDE_SCHEMA = INCLUDE_EXCLUDE_FILTER_SCHEMA_INNER.extend(
     {vol.Optional(CONF_EVENT_TYPES): vol.All(cv.ensure_list, [cv.string])}
@@ -106,6 +130,9 @@ CONFIG_SCHEMA = vol.Schema(
                     vol.Optional(
                         CONF_DB_INTEGRITY_CHECK, default=DEFAULT_DB_INTEGRITY_CHECK
                     ): cv.boolean,
+                    vol.Optional(
+                        CONF_BATCH_INSERT, default=DEFAULT_BATCH_INSERT
+                    ): cv.boolean,
                 }
             ),
         )
@@ -164,6 +191,7 @@ async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
     db_max_retries = conf[CONF_DB_MAX_RETRIES]
     db_retry_wait = conf[CONF_DB_RETRY_WAIT]
     db_integrity_check = conf[CONF_DB_INTEGRITY_CHECK]
+    batch_insert = conf[CONF_BATCH_INSERT]
 
     db_url = conf.get(CONF_DB_URL)
     if not db_url:
@@ -181,6 +209,7 @@ async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
         entity_filter=entity_filter,
         exclude_t=exclude_t,
         db_integrity_check=db_integrity_check,
+        batch_insert=batch_insert,
     )
     instance.async_initialize()
     instance.start()
@@ -198,6 +227,8 @@ async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
 
 PurgeTask = namedtuple("PurgeTask", ["keep_days", "repack"])
 
+CommitTask = namedtuple("CommitTask", ["done"])
+
 
 class WaitTask:
     """An object to insert into the recorder queue to tell it set the _queue_watch event."""
@@ -218,6 +249,7 @@ class Recorder(threading.Thread):
         entity_filter: Callable[[str], bool],
         exclude_t: List[str],
         db_integrity_check: bool,
+        batch_insert: bool = DEFAULT_BATCH_INSERT,
     ) -> None:
         """Initialize the recorder."""
         threading.Thread.__init__(self, name="Recorder")
@@ -232,6 +264,7 @@ class Recorder(threading.Thread):
         self.db_max_retries = db_max_retries
         self.db_retry_wait = db_retry_wait
         self.db_integrity_check = db_integrity_check
+        self.batch_insert = batch_insert
         self.async_db_ready = asyncio.Future()
         self._queue_watch = threading.Event()
         self.engine: Any = None
@@ -245,6 +278,13 @@ class Recorder(threading.Thread):
         self._keepalive_count = 0
         self._old_states = {}
         self._pending_expunge = []
+        self._old_state_ids = {}
+        self._pending_events = []
+        self._state_attributes_ids = OrderedDict()
+        self._pending_state_attributes = {}
+        self._statistics = StatisticsCompiler()
+        self._snapshots = SnapshotTracker()
+        self._next_snapshot = self.recording_start + SNAPSHOT_INTERVAL
         self.event_session = None
         self.get_session = None
         self._completed_database_setup = False
@@ -360,13 +400,22 @@ class Recorder(threading.Thread):
                 self._close_connection()
                 return
             if isinstance(event, PurgeTask):
+                # Make sure the purge does not remove state attributes
+                # that pending states are about to reference
+                self._commit_event_session_or_retry()
                 # Schedule a new purge task if this one didn't finish
-                if not purge.purge_old_data(self, event.keep_days, event.repack):
+                if purge.purge_old_data(self, event.keep_days, event.repack):
+                    self._prune_snapshots()
+                else:
                     self.queue.put(PurgeTask(event.keep_days, event.repack))
                 continue
             if isinstance(event, WaitTask):
                 self._queue_watch.set()
                 continue
+            if isinstance(event, CommitTask):
+                self._commit_event_session_or_retry()
+                event.done.set()
+                continue
             if event.event_type == EVENT_TIME_CHANGED:
                 self._keepalive_count += 1
                 if self._keepalive_count >= KEEPALIVE_TIME:
@@ -386,50 +435,293 @@ class Recorder(threading.Thread):
                 if not self.entity_filter(entity_id):
                     continue
 
-            try:
-                if event.event_type == EVENT_STATE_CHANGED:
-                    dbevent = Events.from_event(event, event_data="{}")
+            if event.event_type == EVENT_STATE_CHANGED:
+                new_state = event.data.get("new_state")
+                if new_state is not None:
+                    self._statistics.add_state(new_state)
                 else:
-                    dbevent = Events.from_event(event)
-                dbevent.created = event.time_fired
-                self.event_session.add(dbevent)
+                    self._statistics.remove_entity(entity_id, event.time_fired)
+
+            if self.batch_insert:
+                self._pending_events.append(event)
+            else:
+                self._add_event_to_session(event)
+
+            # If they do not have a commit interval
+            # than we commit right away
+            if (
+                not self.commit_interval
+                or len(self._pending_events) >= MAX_PENDING_EVENTS
+            ):
+                self._commit_event_session_or_retry()
+
+    def _add_event_to_session(self, event):
+        """Add the ORM objects for an event to the event session."""
+        dbevent = None
+        try:
+            if event.event_type == EVENT_STATE_CHANGED:
+                dbevent = Events.from_event(event, event_data="{}")
+            else:
+                dbevent = Events.from_event(event)
+            dbevent.created = event.time_fired
+            self.event_session.add(dbevent)
+        except (TypeError, ValueError):
+            _LOGGER.warning("Event is not JSON serializable: %s", event)
+        except Exception as err:  # pylint: disable=broad-except
+            # Must catch the exception to prevent the loop from collapsing
+            _LOGGER.exception("Error adding event: %s", err)
+
+        if dbevent and event.event_type == EVENT_STATE_CHANGED:
+            try:
+                dbstate = States.from_event(event)
+                has_new_state = event.data.get("new_state")
+                if dbstate.entity_id in self._old_states:
+                    old_state = self._old_states.pop(dbstate.entity_id)
+                    if old_state.state_id:
+                        dbstate.old_state_id = old_state.state_id
+                    else:
+                        dbstate.old_state = old_state
+                if not has_new_state:
+                    dbstate.state = None
+                self._set_state_attributes(dbstate)
+                dbstate.event = dbevent
+                dbstate.created = event.time_fired
+                self.event_session.add(dbstate)
+                self._snapshots.add_dbstate(dbstate)
+                if has_new_state:
+                    self._old_states[dbstate.entity_id] = dbstate
+                    self._pending_expunge.append(dbstate)
             except (TypeError, ValueError):
-                _LOGGER.warning("Event is not JSON serializable: %s", event)
+                _LOGGER.warning(
+                    "State is not JSON serializable: %s",
+                    event.data.get("new_state"),
+                )
             except Exception as err:  # pylint: disable=broad-except
                 # Must catch the exception to prevent the loop from collapsing
-                _LOGGER.exception("Error adding event: %s", err)
+                _LOGGER.exception("Error adding state change: %s", err)
+
+    def _set_state_attributes(self, dbstate):
+        """Point a new state at a deduplicated state_attributes row."""
+        shared_attrs = dbstate.attributes
+        dbstate.attributes = None
+
+        attributes_id = self._get_attributes_id(shared_attrs)
+        if attributes_id is not None:
+            dbstate.attributes_id = attributes_id
+            return
+
+        dbstate_attributes = self._pending_state_attributes.get(shared_attrs)
+        if dbstate_attributes is None:
+            dbstate_attributes = StateAttributes(
+                hash=StateAttributes.hash_shared_attrs(shared_attrs),
+                shared_attrs=shared_attrs,
+            )
+            self._pending_state_attributes[shared_attrs] = dbstate_attributes
+        dbstate.state_attributes = dbstate_attributes
+
+    def _get_attributes_id(self, shared_attrs):
+        """Return the state_attributes id for shared attributes if it exists."""
+        attributes_id = self._state_attributes_ids.get(shared_attrs)
+        if attributes_id is not None:
+            self._state_attributes_ids.move_to_end(shared_attrs)
+            return attributes_id
+
+        attr_hash = StateAttributes.hash_shared_attrs(shared_attrs)
+        for attributes_id, db_shared_attrs in self.event_session.execute(
+            select([StateAttributes.attributes_id, StateAttributes.shared_attrs]).where(
+                StateAttributes.hash == attr_hash
+            )
+        ):
+            if db_shared_attrs == shared_attrs:
+                self._cache_attributes_id(shared_attrs, attributes_id)
+                return attributes_id
+
+        return None
+
+    def _cache_attributes_id(self, shared_attrs, attributes_id):
+        """Remember the state_attributes id of recently seen shared attributes."""
+        self._state_attributes_ids[shared_attrs] = attributes_id
+        if len(self._state_attributes_ids) > STATE_ATTRIBUTES_ID_CACHE_SIZE:
+            self._state_attributes_ids.popitem(last=False)
 
-            if dbevent and event.event_type == EVENT_STATE_CHANGED:
+    def _write_pending_events(self):
+        """Write the buffered events with Core level inserts.
+
+        Rows are serialized up front so an event that cannot be
+        serialized is skipped without affecting the rest of the batch.
+        The events, the new state attributes and the states are each
+        written with a single executemany in the order they were queued,
+        bypassing the ORM unit of work and identity map.
+
+        Returns the latest state_id per entity_id written by this batch
+        and the ids of the state_attributes rows it created.
+        """
+        event_rows = []
+        state_rows = []
+        for event in self._pending_events:
+            if event.event_type != EVENT_STATE_CHANGED:
                 try:
-                    dbstate = States.from_event(event)
-                    has_new_state = event.data.get("new_state")
-                    if dbstate.entity_id in self._old_states:
-                        old_state = self._old_states.pop(dbstate.entity_id)
-                        if old_state.state_id:
-                            dbstate.old_state_id = old_state.state_id
-                        else:
-                            dbstate.old_state = old_state
-                    if not has_new_state:
-                        dbstate.state = None
-                    dbstate.event = dbevent
-                    dbstate.created = event.time_fired
-                    self.event_session.add(dbstate)
-                    if has_new_state:
-                        self._old_states[dbstate.entity_id] = dbstate
-                        self._pending_expunge.append(dbstate)
+                    event_row = Events.row_from_event(event)
                 except (TypeError, ValueError):
-                    _LOGGER.warning(
-                        "State is not JSON serializable: %s",
-                        event.data.get("new_state"),
-                    )
-                except Exception as err:  # pylint: disable=broad-except
-                    # Must catch the exception to prevent the loop from collapsing
-                    _LOGGER.exception("Error adding state change: %s", err)
+                    _LOGGER.warning("Event is not JSON serializable: %s", event)
+                    continue
+                event_row["created"] = event.time_fired
+                event_rows.append(event_row)
+                continue
 
-            # If they do not have a commit interval
-            # than we commit right away
-            if not self.commit_interval:
-                self._commit_event_session_or_retry()
+            event_row = Events.row_from_event(event, event_data="{}")
+            event_row["created"] = event.time_fired
+            event_rows.append(event_row)
+            try:
+                state_row = States.row_from_event(event)
+            except (TypeError, ValueError):
+                _LOGGER.warning(
+                    "State is not JSON serializable: %s",
+                    event.data.get("new_state"),
+                )
+                continue
+            state_row["created"] = event.time_fired
+            if not event.data.get("new_state"):
+                state_row["state"] = None
+            # Keep the position of the event of the state
+            state_rows.append((len(event_rows) - 1, state_row))
+
+        if not event_rows:
+            return {}, {}
+        # pylint: disable=no-member
+        event_ids = self._insert_rows(Events.__table__, Events.event_id, event_rows)
+        if not state_rows:
+            return {}, {}
+
+        attributes_ids, new_attributes_ids = self._get_or_insert_attributes_ids(
+            {state_row["attributes"] for _, state_row in state_rows}
+        )
+
+        # The old state of a state that follows another state of its
+        # entity in this batch is set once the state ids are known
+        batch_old_states = []
+        last_index = {}
+        for index, (event_index, state_row) in enumerate(state_rows):
+            entity_id = state_row["entity_id"]
+            state_row["event_id"] = event_ids[event_index]
+            state_row["attributes_id"] = attributes_ids[state_row.pop("attributes")]
+            old_index = last_index.get(entity_id)
+            if old_index is None:
+                state_row["old_state_id"] = self._old_state_ids.get(entity_id)
+            else:
+                state_row["old_state_id"] = None
+                if state_rows[old_index][1]["state"] is not None:
+                    batch_old_states.append((index, old_index))
+            last_index[entity_id] = index
+
+        state_ids = self._insert_rows(
+            States.__table__,
+            States.state_id,
+            [state_row for _, state_row in state_rows],
+        )
+        if batch_old_states:
+            self.event_session.execute(
+                States.__table__.update()
+                .where(States.state_id == bindparam("b_state_id"))
+                .values(old_state_id=bindparam("b_old_state_id")),
+                [
+                    {"b_state_id": state_ids[index], "b_old_state_id": state_ids[old]}
+                    for index, old in batch_old_states
+                ],
+            )
+        # pylint: enable=no-member
+
+        old_state_ids = {}
+        for (_, state_row), state_id in zip(state_rows, state_ids):
+            entity_id = state_row["entity_id"]
+            self._snapshots.add_state_id(entity_id, state_id, state_row["last_updated"])
+            if state_row["state"] is None:
+                old_state_ids[entity_id] = None
+            else:
+                old_state_ids[entity_id] = state_id
+
+        return old_state_ids, new_attributes_ids
+
+    def _insert_rows(self, table, primary_key, rows):
+        """Insert rows with a single executemany and return their primary keys.
+
+        The recorder thread is the only writer of the tables so the rows
+        get increasing primary keys above the highest one before the
+        insert, in the order they are inserted in.
+        """
+        last_id = self.event_session.execute(select([func.max(primary_key)])).scalar()
+        self.event_session.execute(table.insert(), rows)
+        query = select([primary_key]).order_by(primary_key)
+        if last_id is not None:
+            query = query.where(primary_key > last_id)
+        row_ids = [row_id for row_id, in self.event_session.execute(query)]
+        if len(row_ids) != len(rows):
+            raise RuntimeError(
+                f"Inserted {len(rows)} rows in {table.name} but found {len(row_ids)}"
+            )
+        return row_ids
+
+    def _get_or_insert_attributes_ids(self, shared_attrs_set):
+        """Return the state_attributes ids of shared attributes.
+
+        The attributes that are not cached are looked up with one query
+        per chunk of hashes and the missing ones are inserted with a
+        single executemany. Returns the ids of all the attributes and of
+        the inserted ones.
+        """
+        attributes_ids = {}
+        missing = {}
+        for shared_attrs in shared_attrs_set:
+            attributes_id = self._state_attributes_ids.get(shared_attrs)
+            if attributes_id is None:
+                missing[shared_attrs] = StateAttributes.hash_shared_attrs(shared_attrs)
+            else:
+                self._state_attributes_ids.move_to_end(shared_attrs)
+                attributes_ids[shared_attrs] = attributes_id
+        if not missing:
+            return attributes_ids, {}
+
+        for shared_attrs, attributes_id in self._find_attributes_ids(missing).items():
+            self._cache_attributes_id(shared_attrs, attributes_id)
+            attributes_ids[shared_attrs] = attributes_id
+            del missing[shared_attrs]
+        if not missing:
+            return attributes_ids, {}
+
+        self.event_session.execute(
+            StateAttributes.__table__.insert(),  # pylint: disable=no-member
+            [
+                {"hash": attr_hash, "shared_attrs": shared_attrs}
+                for shared_attrs, attr_hash in missing.items()
+            ],
+        )
+        new_attributes_ids = self._find_attributes_ids(missing)
+        attributes_ids.update(new_attributes_ids)
+        return attributes_ids, new_attributes_ids
+
+    def _find_attributes_ids(self, hashes):
+        """Look up the state_attributes ids of shared attributes by their hash."""
+        found = {}
+        unique_hashes = list(set(hashes.values()))
+        for chunk_start in range(0, len(unique_hashes), purge.MAX_ROWS_TO_PURGE):
+            chunk = unique_hashes[chunk_start : chunk_start + purge.MAX_ROWS_TO_PURGE]
+            for attributes_id, shared_attrs in self.event_session.execute(
+                select(
+                    [StateAttributes.attributes_id, StateAttributes.shared_attrs]
+                ).where(StateAttributes.hash.in_(chunk))
+            ):
+                if shared_attrs in hashes:
+                    found.setdefault(shared_attrs, attributes_id)
+        return found
+
+    def _write_statistics(self):
+        """Write the statistics of the periods that have passed."""
+        self._statistics.compile(dt_util.utcnow())
+        for period, rows in self._statistics.pending.items():
+            if rows:
+                self.event_session.execute(
+                    STATISTICS_TABLES[period].__table__.insert(), rows
+                )
 
     def _send_keep_alive(self):
         try:
@@ -473,6 +765,9 @@ class Recorder(threading.Thread):
             except Exception as err:  # pylint: disable=broad-except
                 # Must catch the exception to prevent the loop from collapsing
                 _LOGGER.exception("Error saving events: %s", err)
+                self._pending_events = []
+                self._statistics.clear_pending()
+                self._snapshots.clear_pending()
                 return
 
         _LOGGER.error(
@@ -482,6 +777,11 @@ class Recorder(threading.Thread):
         self._reopen_event_session()
 
     def _reopen_event_session(self):
+        self._pending_events = []
+        self._statistics.clear_pending()
+        self._snapshots.clear_pending()
+        self._pending_state_attributes = {}
+
         try:
             self.event_session.rollback()
         except Exception as err:  # pylint: disable=broad-except
@@ -503,9 +803,14 @@ class Recorder(threading.Thread):
 
     def _commit_event_session(self):
         self._commits_without_expire += 1
+        old_state_ids = None
+        new_attributes_ids = {}
 
         try:
-            if self._pending_expunge:
+            if self._pending_events:
+                old_state_ids, new_attributes_ids = self._write_pending_events()
+            self._write_statistics()
+            if self._pending_expunge or self._pending_state_attributes:
                 self.event_session.flush()
                 for dbstate in self._pending_expunge:
                     # Expunge the state so its not expired
@@ -517,8 +822,28 @@ class Recorder(threading.Thread):
         except Exception as err:
             _LOGGER.error("Error executing query: %s", err)
             self.event_session.rollback()
+            self._pending_state_attributes = {}
             raise
 
+        self._statistics.clear_pending()
+        self._snapshots.commit()
+        for shared_attrs, dbstate_attributes in self._pending_state_attributes.items():
+            new_attributes_ids[shared_attrs] = dbstate_attributes.attributes_id
+        self._pending_state_attributes = {}
+        for shared_attrs, attributes_id in new_attributes_ids.items():
+            self._cache_attributes_id(shared_attrs, attributes_id)
+
+        if old_state_ids is not None:
+            self._pending_events = []
+            for entity_id, state_id in old_state_ids.items():
+                if state_id is None:
+                    self._old_state_ids.pop(entity_id, None)
+                else:
+                    self._old_state_ids[entity_id] = state_id
+
+        if dt_util.utcnow() >= self._next_snapshot:
+            self._write_snapshot()
+
         # Expire is an expensive operation (frequently more expensive
         # than the flush and commit itself) so we only
         # do it after EXPIRE_AFTER_COMMITS commits
@@ -526,6 +851,68 @@ class Recorder(threading.Thread):
             self._commits_without_expire = 0
             self.event_session.expire_all()
 
+    def _write_snapshot(self):
+        """Write the latest state of every entity at the checkpoint."""
+        self._next_snapshot = dt_util.utcnow() + SNAPSHOT_INTERVAL
+        rows = self._snapshots.snapshot_rows()
+        if not rows:
+            return
+
+        try:
+            self.event_session.execute(
+                StateSnapshots.__table__.insert(), rows  # pylint: disable=no-member
+            )
+            self.event_session.commit()
+        except Exception as err:  # pylint: disable=broad-except
+            # History falls back to scanning the recorder run
+            # so a missing snapshot is not fatal
+            _LOGGER.exception("Error writing state snapshot: %s", err)
+            self.event_session.rollback()
+            return
+
+        self._snapshots.snapshot_written()
+        _LOGGER.debug(
+            "Wrote state snapshot of %s entities at %s",
+            len(rows),
+            self._snapshots.checkpoint,
+        )
+
+    def evict_purged_states(self, state_ids):
+        """Stop using purged states as the old state of the next states."""
+        state_ids = set(state_ids)
+        for entity_id, state_id in list(self._old_state_ids.items()):
+            if state_id in state_ids:
+                del self._old_state_ids[entity_id]
+        for entity_id, dbstate in list(self._old_states.items()):
+            if dbstate.state_id in state_ids:
+                del self._old_states[entity_id]
+
+    def evict_purged_attributes(self, attributes_ids):
+        """Stop reusing purged state attributes for the next states."""
+        for shared_attrs, attributes_id in list(self._state_attributes_ids.items()):
+            if attributes_id in attributes_ids:
+                del self._state_attributes_ids[shared_attrs]
+
+    def _prune_snapshots(self):
+        """Stop tracking the states that have been purged."""
+        state_ids = list(self._snapshots.state_ids.values())
+        existing_state_ids = []
+        try:
+            for chunk_start in range(0, len(state_ids), purge.MAX_ROWS_TO_PURGE):
+                chunk = state_ids[chunk_start : chunk_start + purge.MAX_ROWS_TO_PURGE]
+                existing_state_ids.extend(
+                    state_id
+                    for state_id, in self.event_session.execute(
+                        select([States.state_id]).where(States.state_id.in_(chunk))
+                    )
+                )
+        except Exception as err:  # pylint: disable=broad-except
+            # Must catch the exception to prevent the loop from collapsing
+            _LOGGER.exception("Error pruning state snapshot: %s", err)
+            return
+
+        self._snapshots.prune(existing_state_ids)
+
     @callback
     def event_listener(self, event):
         """Listen for new events and put them in the process queue."""
@@ -547,6 +934,21 @@ class Recorder(threading.Thread):
         self.queue.put(WaitTask())
         self._queue_watch.wait()
 
+    def block_till_committed(self, timeout=COMMIT_WAIT_TIMEOUT):
+        """Block till all events queued so far are committed to the database.
+
+        Returns False if the recorder stopped or could not commit them
+        within the timeout.
+        """
+        task = CommitTask(threading.Event())
+        self.queue.put(task)
+        deadline = time.monotonic() + timeout
+        while not task.done.wait(COMMIT_WAIT_INTERVAL):
+            if not self.is_alive() or time.monotonic() >= deadline:
+                _LOGGER.debug("Gave up waiting for the recorder to commit")
+                return False
+        return True
+
     def _setup_connection(self):
         """Ensure database is ready to fly."""
         kwargs = {}
@@ -277,6 +277,23 @@ def _apply_update(engine, new_version, old_version):
         _drop_index(engine, "states", "ix_states_entity_id")
         _create_index(engine, "events", "ix_events_event_type_time_fired")
         _drop_index(engine, "events", "ix_events_event_type")
+    elif new_version == 10:
+        # The state_attributes table itself is created with create_all
+        # when the connection is set up
+        _add_columns(engine, "states", ["attributes_id INTEGER"])
+        _create_index(engine, "states", "ix_states_attributes_id")
+    elif new_version == 11:
+        # Used by the purge to disconnect states from the
+        # states that are being removed
+        _create_index(engine, "states", "ix_states_old_state_id")
+    elif new_version == 12:
+        # The statistics tables are created with create_all
+        # when the connection is set up
+        pass
+    elif new_version == 13:
+        # The state_snapshots table is created with create_all
+        # when the connection is set up
+        pass
     else:
         raise ValueError(f"No schema migration defined for version {new_version}")
 
@@ -1,17 +1,21 @@
 """Models for SQLAlchemy."""
 import json
 import logging
+import zlib
 
 from sqlalchemy import (
+    BigInteger,
     Boolean,
     Column,
     DateTime,
+    Float,
     ForeignKey,
     Index,
     Integer,
     String,
     Text,
     distinct,
+    func,
 )
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
@@ -25,7 +29,7 @@ import homeassistant.util.dt as dt_util
 # pylint: disable=invalid-name
 Base = declarative_base()
 
-SCHEMA_VERSION = 9
+SCHEMA_VERSION = 13
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -33,10 +37,23 @@ DB_TIMEZONE = "+00:00"
 
 TABLE_EVENTS = "events"
 TABLE_STATES = "states"
+TABLE_STATE_ATTRIBUTES = "state_attributes"
+TABLE_STATISTICS = "statistics"
+TABLE_STATISTICS_SHORT_TERM = "statistics_short_term"
+TABLE_STATE_SNAPSHOTS = "state_snapshots"
 TABLE_RECORDER_RUNS = "recorder_runs"
 TABLE_SCHEMA_CHANGES = "schema_changes"
 
-ALL_TABLES = [TABLE_EVENTS, TABLE_STATES, TABLE_RECORDER_RUNS, TABLE_SCHEMA_CHANGES]
+ALL_TABLES = [
+    TABLE_EVENTS,
+    TABLE_STATES,
+    TABLE_STATE_ATTRIBUTES,
+    TABLE_STATISTICS,
+    TABLE_STATISTICS_SHORT_TERM,
+    TABLE_STATE_SNAPSHOTS,
+    TABLE_RECORDER_RUNS,
+    TABLE_SCHEMA_CHANGES,
+]
 
 
 class Events(Base):  # type: ignore
@@ -62,15 +79,31 @@ class Events(Base):  # type: ignore
     @staticmethod
     def from_event(event, event_data=None):
         """Create an event database object from a native event."""
-        return Events(
-            event_type=event.event_type,
-            event_data=event_data or json.dumps(event.data, cls=JSONEncoder),
-            origin=str(event.origin.value),
-            time_fired=event.time_fired,
-            context_id=event.context.id,
-            context_user_id=event.context.user_id,
-            context_parent_id=event.context.parent_id,
-        )
+        return Events(**Events.row_from_event(event, event_data))
+
+    @staticmethod
+    def row_from_event(event, event_data=None):
+        """Create an events table row from a native event.
+
+        The row can be passed to a Core level insert to skip the ORM.
+        """
+        if event_data is None:
+            try:
+                event_data = event.data_json
+            except ValueError:
+                # NaN and infinity are not valid JSON but they have always
+                # been recorded
+                event_data = json.dumps(event.data, cls=JSONEncoder)
+
+        return {
+            "event_type": event.event_type,
+            "event_data": event_data,
+            "origin": str(event.origin.value),
+            "time_fired": event.time_fired,
+            "context_id": event.context.id,
+            "context_user_id": event.context.user_id,
+            "context_parent_id": event.context.parent_id,
+        }
 
     def to_native(self, validate_entity_id=True):
         """Convert to a natve HA Event."""
@@ -106,9 +139,13 @@ class States(Base):  # type: ignore
     last_changed = Column(DateTime(timezone=True), default=dt_util.utcnow)
     last_updated = Column(DateTime(timezone=True), default=dt_util.utcnow, index=True)
     created = Column(DateTime(timezone=True), default=dt_util.utcnow)
-    old_state_id = Column(Integer, ForeignKey("states.state_id"))
+    old_state_id = Column(Integer, ForeignKey("states.state_id"), index=True)
+    attributes_id = Column(
+        Integer, ForeignKey("state_attributes.attributes_id"), index=True
+    )
     event = relationship("Events", uselist=False)
     old_state = relationship("States", remote_side=[state_id])
+    state_attributes = relationship("StateAttributes", uselist=False)
 
     __table_args__ = (
         # Used for fetching the state of entities at a specific time
@@ -119,34 +156,55 @@ class States(Base):  # type: ignore
     @staticmethod
     def from_event(event):
         """Create object from a state_changed event."""
+        return States(**States.row_from_event(event))
+
+    @staticmethod
+    def row_from_event(event):
+        """Create a states table row from a state_changed event.
+
+        The row can be passed to a Core level insert to skip the ORM.
+        """
         entity_id = event.data["entity_id"]
         state = event.data.get("new_state")
 
-        dbstate = States(entity_id=entity_id)
-
         # State got deleted
         if state is None:
-            dbstate.state = ""
-            dbstate.domain = split_entity_id(entity_id)[0]
-            dbstate.attributes = "{}"
-            dbstate.last_changed = event.time_fired
-            dbstate.last_updated = event.time_fired
-        else:
-            dbstate.domain = state.domain
-            dbstate.state = state.state
-            dbstate.attributes = json.dumps(dict(state.attributes), cls=JSONEncoder)
-            dbstate.last_changed = state.last_changed
-            dbstate.last_updated = state.last_updated
+            return {
+                "entity_id": entity_id,
+                "state": "",
+                "domain": split_entity_id(entity_id)[0],
+                "attributes": "{}",
+                "last_changed": event.time_fired,
+                "last_updated": event.time_fired,
+            }
 
-        return dbstate
+        try:
+            attributes = state.attributes_json
+        except ValueError:
+            # NaN and infinity are not valid JSON but they have always
+            # been recorded
+            attributes = json.dumps(dict(state.attributes), cls=JSONEncoder)
+
+        return {
+            "entity_id": entity_id,
+            "state": state.state,
+            "domain": state.domain,
+            "attributes": attributes,
+            "last_changed": state.last_changed,
+            "last_updated": state.last_updated,
+        }
 
     def to_native(self, validate_entity_id=True):
         """Convert to an HA state object."""
+        if self.attributes_id is not None:
+            attributes = self.state_attributes.shared_attrs
+        else:
+            attributes = self.attributes
         try:
             return State(
                 self.entity_id,
                 self.state,
-                json.loads(self.attributes),
+                json.loads(attributes),
                 process_timestamp(self.last_changed),
                 process_timestamp(self.last_updated),
                 # Join the events table on event_id to get the context instead
@@ -160,6 +218,81 @@ class States(Base):  # type: ignore
             return None
 
 
+class StateAttributes(Base):  # type: ignore
+    """State attribute change history.
+
+    Attributes that are identical between states are only stored once
+    and referenced by States.attributes_id.
+    """
+
+    __tablename__ = TABLE_STATE_ATTRIBUTES
+    attributes_id = Column(Integer, primary_key=True)
+    hash = Column(BigInteger, index=True)
+    shared_attrs = Column(Text)
+
+    @staticmethod
+    def hash_shared_attrs(shared_attrs):
+        """Return the hash used to look up shared attributes."""
+        return zlib.crc32(shared_attrs.encode("utf-8"))
+
+
+# Use with an outer join on StateAttributes to get the attributes
+# of both deduplicated and pre-deduplication states
+SHARED_ATTRIBUTES = func.coalesce(StateAttributes.shared_attrs, States.attributes)
+STATE_ATTRIBUTES_JOIN = States.attributes_id == StateAttributes.attributes_id
+
+
+class StatisticsBase:
+    """Aggregated numeric states of an entity over a period."""
+
+    id = Column(Integer, primary_key=True)
+    entity_id = Column(String(255))
+    start = Column(DateTime(timezone=True))
+    mean = Column(Float)
+    min = Column(Float)
+    max = Column(Float)
+    last = Column(Float)
+    created = Column(DateTime(timezone=True), default=dt_util.utcnow)
+
+    def as_dict(self):
+        """Return a dict representation of the statistics."""
+        return {
+            "entity_id": self.entity_id,
+            "start": process_timestamp_to_utc_isoformat(self.start),
+            "mean": self.mean,
+            "min": self.min,
+            "max": self.max,
+            "last": self.last,
+        }
+
+
+class Statistics(Base, StatisticsBase):  # type: ignore
+    """Hourly statistics."""
+
+    __tablename__ = TABLE_STATISTICS
+    __table_args__ = (Index("ix_statistics_entity_id_start", "entity_id", "start"),)
+
+
+class StatisticsShortTerm(Base, StatisticsBase):  # type: ignore
+    """Five minute statistics."""
+
+    __tablename__ = TABLE_STATISTICS_SHORT_TERM
+    __table_args__ = (
+        Index("ix_statistics_short_term_entity_id_start", "entity_id", "start"),
+        Index("ix_statistics_short_term_start", "start"),
+    )
+
+
+class StateSnapshots(Base):  # type: ignore
+    """The latest state of every entity at a checkpoint."""
+
+    __tablename__ = TABLE_STATE_SNAPSHOTS
+    snapshot_id = Column(Integer, primary_key=True)
+    checkpoint = Column(DateTime(timezone=True), index=True)
+    entity_id = Column(String(255))
+    state_id = Column(Integer, ForeignKey("states.state_id"), index=True)
+
+
 class RecorderRuns(Base):  # type: ignore
     """Representation of recorder run."""
 
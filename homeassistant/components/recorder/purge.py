@@ -7,60 +7,79 @@ from sqlalchemy.exc import OperationalError, SQLAlchemyError
 
 import homeassistant.util.dt as dt_util
 
-from .models import Events, RecorderRuns, States
-from .util import execute, session_scope
+from .models import (
+    Events,
+    RecorderRuns,
+    StateAttributes,
+    States,
+    StateSnapshots,
+    StatisticsShortTerm,
+)
+from .util import session_scope
 
 _LOGGER = logging.getLogger(__name__)
 
+# Keep the number of ids per statement below
+# the default SQLITE_MAX_VARIABLE_NUMBER of 999
+MAX_ROWS_TO_PURGE = 998
+
 
 def purge_old_data(instance, purge_days: int, repack: bool) -> bool:
     """Purge events and states older than purge_days ago.
 
-    Cleans up an timeframe of an hour, based on the oldest record.
+    Deletes at most MAX_ROWS_TO_PURGE states and events by primary key
+    in one short transaction. Returns False when there are more rows to
+    purge so the recorder can write out the events that have been queued
+    in the meantime before the next chunk is purged.
     """
     purge_before = dt_util.utcnow() - timedelta(days=purge_days)
     _LOGGER.debug("Purging states and events before target %s", purge_before)
 
     try:
         with session_scope(session=instance.get_session()) as session:
-            # Purge a max of 1 hour, based on the oldest states or events record
-            batch_purge_before = purge_before
-
-            query = session.query(States).order_by(States.last_updated.asc()).limit(1)
-            states = execute(query, to_native=True, validate_entity_ids=False)
-            if states:
-                batch_purge_before = min(
-                    batch_purge_before,
-                    states[0].last_updated + timedelta(hours=1),
-                )
-
-            query = session.query(Events).order_by(Events.time_fired.asc()).limit(1)
-            events = execute(query, to_native=True)
-            if events:
-                batch_purge_before = min(
-                    batch_purge_before,
-                    events[0].time_fired + timedelta(hours=1),
-                )
-
-            _LOGGER.debug("Purging states and events before %s", batch_purge_before)
+            timer_start = time.perf_counter()
 
-            deleted_rows = (
-                session.query(States)
-                .filter(States.last_updated < batch_purge_before)
-                .delete(synchronize_session=False)
+            state_ids, attributes_ids = _select_state_ids_to_purge(
+                session, purge_before
             )
-            _LOGGER.debug("Deleted %s states", deleted_rows)
-
-            deleted_rows = (
-                session.query(Events)
-                .filter(Events.time_fired < batch_purge_before)
-                .delete(synchronize_session=False)
+            event_ids = _select_event_ids_to_purge(session, purge_before)
+            statistics_ids = _select_short_term_statistics_ids_to_purge(
+                session, purge_before
             )
-            _LOGGER.debug("Deleted %s events", deleted_rows)
+            snapshot_ids = _select_snapshot_ids_to_purge(session, purge_before)
+
+            if state_ids:
+                _purge_state_ids(session, state_ids)
+                instance.evict_purged_states(state_ids)
+            if attributes_ids:
+                instance.evict_purged_attributes(
+                    _purge_unused_attributes_ids(session, attributes_ids)
+                )
+            if event_ids:
+                _purge_event_ids(session, event_ids)
+            if statistics_ids:
+                _purge_short_term_statistics_ids(session, statistics_ids)
+            if snapshot_ids:
+                _purge_snapshot_ids(session, snapshot_ids)
+
+            if state_ids or event_ids:
+                elapsed = time.perf_counter() - timer_start
+                _LOGGER.debug(
+                    "Purged %s states and %s events in %fs (%d rows/s)",
+                    len(state_ids),
+                    len(event_ids),
+                    elapsed,
+                    (len(state_ids) + len(event_ids)) / max(elapsed, 0.000001),
+                )
 
             # If states or events purging isn't processing the purge_before yet,
             # return false, as we are not done yet.
-            if batch_purge_before != purge_before:
+            if (
+                len(state_ids) == MAX_ROWS_TO_PURGE
+                or len(event_ids) == MAX_ROWS_TO_PURGE
+                or len(statistics_ids) == MAX_ROWS_TO_PURGE
+                or len(snapshot_ids) == MAX_ROWS_TO_PURGE
+            ):
                 _LOGGER.debug("Purging hasn't fully completed yet")
                 return False
 
@@ -80,7 +99,10 @@ def purge_old_data(instance, purge_days: int, repack: bool) -> bool:
             # Optimize mysql / mariadb tables to free up space on disk
             elif instance.engine.driver in ("mysqldb", "pymysql"):
                 _LOGGER.debug("Optimizing SQL DB to free space")
-                instance.engine.execute("OPTIMIZE TABLE states, events, recorder_runs")
+                instance.engine.execute(
+                    "OPTIMIZE TABLE states, state_attributes, events, "
+                    "statistics_short_term, state_snapshots, recorder_runs"
+                )
 
     except OperationalError as err:
         # Retry when one of the following MySQL errors occurred:
@@ -100,3 +122,162 @@ def purge_old_data(instance, purge_days: int, repack: bool) -> bool:
     except SQLAlchemyError as err:
         _LOGGER.warning("Error purging history: %s", err)
     return True
+
+
+def _select_state_ids_to_purge(session, purge_before):
+    """Return the oldest state ids and the attributes ids they use."""
+    states = (
+        session.query(States.state_id, States.attributes_id)
+        .filter(States.last_updated < purge_before)
+        .order_by(States.state_id)
+        .limit(MAX_ROWS_TO_PURGE)
+        .all()
+    )
+    state_ids = [state.state_id for state in states]
+    attributes_ids = {
+        state.attributes_id for state in states if state.attributes_id is not None
+    }
+    _LOGGER.debug("Selected %s state ids to remove", len(state_ids))
+    return state_ids, attributes_ids
+
+
+def _select_event_ids_to_purge(session, purge_before):
+    """Return the oldest event ids."""
+    events = (
+        session.query(Events.event_id)
+        .filter(Events.time_fired < purge_before)
+        .order_by(Events.event_id)
+        .limit(MAX_ROWS_TO_PURGE)
+        .all()
+    )
+    event_ids = [event.event_id for event in events]
+    _LOGGER.debug("Selected %s event ids to remove", len(event_ids))
+    return event_ids
+
+
+def _purge_state_ids(session, state_ids):
+    """Disconnect states and delete by state id."""
+    # Update old_state_id to NULL before deleting to ensure
+    # the delete does not fail due to a foreign key constraint
+    # since some databases (MSSQL) cannot do the ON DELETE SET NULL
+    # for us.
+    disconnected_rows = (
+        session.query(States)
+        .filter(States.old_state_id.in_(state_ids))
+        .update({"old_state_id": None}, synchronize_session=False)
+    )
+    _LOGGER.debug("Updated %s states to remove old_state_id", disconnected_rows)
+
+    # A snapshot of an entity that has not changed for a long
+    # time can still point at a state that is being removed
+    deleted_rows = (
+        session.query(StateSnapshots)
+        .filter(StateSnapshots.state_id.in_(state_ids))
+        .delete(synchronize_session=False)
+    )
+    _LOGGER.debug("Deleted %s state_snapshots of removed states", deleted_rows)
+
+    deleted_rows = (
+        session.query(States)
+        .filter(States.state_id.in_(state_ids))
+        .delete(synchronize_session=False)
+    )
+    _LOGGER.debug("Deleted %s states", deleted_rows)
+
+
+def _purge_unused_attributes_ids(session, attributes_ids):
+    """Delete the attributes of purged states that are no longer used.
+
+    Returns the ids of the deleted attributes.
+    """
+    still_used = {
+        state.attributes_id
+        for state in session.query(States.attributes_id)
+        .filter(States.attributes_id.in_(attributes_ids))
+        .distinct()
+    }
+    unused_attributes_ids = attributes_ids - still_used
+    if not unused_attributes_ids:
+        return unused_attributes_ids
+
+    deleted_rows = (
+        session.query(StateAttributes)
+        .filter(StateAttributes.attributes_id.in_(unused_attributes_ids))
+        .delete(synchronize_session=False)
+    )
+    _LOGGER.debug("Deleted %s state_attributes", deleted_rows)
+    return unused_attributes_ids
+
+
+def _purge_event_ids(session, event_ids):
+    """Disconnect states and delete by event id."""
+    # A state can be newer than the purge target while the event
+    # that created it is not, so make sure it does not keep a
+    # reference to an event that no longer exists.
+    disconnected_rows = (
+        session.query(States)
+        .filter(States.event_id.in_(event_ids))
+        .update({"event_id": None}, synchronize_session=False)
+    )
+    _LOGGER.debug("Updated %s states to remove event_id", disconnected_rows)
+
+    deleted_rows = (
+        session.query(Events)
+        .filter(Events.event_id.in_(event_ids))
+        .delete(synchronize_session=False)
+    )
+    _LOGGER.debug("Deleted %s events", deleted_rows)
+
+
+def _select_short_term_statistics_ids_to_purge(session, purge_before):
+    """Return the oldest short term statistics ids.
+
+    Hourly statistics are kept, they are what remains of the
+    history of an entity once its states have been purged.
+    """
+    statistics = (
+        session.query(StatisticsShortTerm.id)
+        .filter(StatisticsShortTerm.start < purge_before)
+        .order_by(StatisticsShortTerm.id)
+        .limit(MAX_ROWS_TO_PURGE)
+        .all()
+    )
+    statistics_ids = [statistic.id for statistic in statistics]
+    _LOGGER.debug(
+        "Selected %s short term statistics ids to remove", len(statistics_ids)
+    )
+    return statistics_ids
+
+
+def _purge_short_term_statistics_ids(session, statistics_ids):
+    """Delete short term statistics by id."""
+    deleted_rows = (
+        session.query(StatisticsShortTerm)
+        .filter(StatisticsShortTerm.id.in_(statistics_ids))
+        .delete(synchronize_session=False)
+    )
+    _LOGGER.debug("Deleted %s short term statistics", deleted_rows)
+
+
+def _select_snapshot_ids_to_purge(session, purge_before):
+    """Return the oldest state snapshot ids."""
+    snapshots = (
+        session.query(StateSnapshots.snapshot_id)
+        .filter(StateSnapshots.checkpoint < purge_before)
+        .order_by(StateSnapshots.snapshot_id)
+        .limit(MAX_ROWS_TO_PURGE)
+        .all()
+    )
+    snapshot_ids = [snapshot.snapshot_id for snapshot in snapshots]
+    _LOGGER.debug("Selected %s state snapshot ids to remove", len(snapshot_ids))
+    return snapshot_ids
+
+
+def _purge_snapshot_ids(session, snapshot_ids):
+    """Delete state snapshots by id."""
+    deleted_rows = (
+        session.query(StateSnapshots)
+        .filter(StateSnapshots.snapshot_id.in_(snapshot_ids))
+        .delete(synchronize_session=False)
+    )
+    _LOGGER.debug("Deleted %s state_snapshots", deleted_rows)
@@ -0,0 +1,83 @@
+"""Track the latest recorded state of every entity for state snapshots."""
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .models import States
+
+# How often the latest state of every entity is written so
+# finding the states at a point in time only has to scan the
+# states recorded since the nearest checkpoint
+SNAPSHOT_INTERVAL = timedelta(hours=1)
+
+
+class SnapshotTracker:
+    """Track the state_id of the latest state of every entity.
+
+    Only states that have been committed are tracked, the checkpoint
+    is the last_updated of the newest one. Every state recorded up to
+    the checkpoint is either in the snapshot or superseded by it.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the tracker."""
+        self.state_ids: Dict[str, int] = {}
+        self.checkpoint: Optional[datetime] = None
+        self._pending_dbstates: List[States] = []
+        self._pending: Dict[str, Tuple[int, datetime]] = {}
+        self._written = True
+
+    def add_dbstate(self, dbstate: States) -> None:
+        """Add a state that will get its state_id when the session is flushed."""
+        self._pending_dbstates.append(dbstate)
+
+    def add_state_id(
+        self, entity_id: str, state_id: int, last_updated: datetime
+    ) -> None:
+        """Add a state that has been inserted."""
+        self._pending[entity_id] = (state_id, last_updated)
+
+    def commit(self) -> None:
+        """Track the pending states once they have been committed."""
+        for dbstate in self._pending_dbstates:
+            if dbstate.state_id is not None:
+                self._pending[dbstate.entity_id] = (
+                    dbstate.state_id,
+                    dbstate.last_updated,
+                )
+        for entity_id, (state_id, last_updated) in self._pending.items():
+            self.state_ids[entity_id] = state_id
+            if self.checkpoint is None or last_updated > self.checkpoint:
+                self.checkpoint = last_updated
+            self._written = False
+        self.clear_pending()
+
+    def clear_pending(self) -> None:
+        """Forget the states that have not been committed."""
+        self._pending_dbstates = []
+        self._pending = {}
+
+    def snapshot_rows(self) -> List[dict]:
+        """Return the rows of a snapshot if there are new states to write."""
+        if self._written:
+            return []
+        return [
+            {
+                "checkpoint": self.checkpoint,
+                "entity_id": entity_id,
+                "state_id": state_id,
+            }
+            for entity_id, state_id in self.state_ids.items()
+        ]
+
+    def snapshot_written(self) -> None:
+        """Mark the current snapshot as written."""
+        self._written = True
+
+    def prune(self, existing_state_ids: Iterable[int]) -> None:
+        """Forget the states that have been purged."""
+        existing_state_ids = set(existing_state_ids)
+        self.state_ids = {
+            entity_id: state_id
+            for entity_id, state_id in self.state_ids.items()
+            if state_id in existing_state_ids
+        }
@@ -0,0 +1,273 @@
+"""Compile downsampled statistics of numeric states."""
+from datetime import datetime, timedelta
+import math
+from typing import Dict, List, Optional
+
+from homeassistant.const import ATTR_UNIT_OF_MEASUREMENT
+from homeassistant.core import State
+
+from .models import Statistics, StatisticsShortTerm, process_timestamp
+
+PERIOD_5MINUTE = "5minute"
+PERIOD_HOUR = "hour"
+
+STATISTICS_TABLES = {PERIOD_5MINUTE: StatisticsShortTerm, PERIOD_HOUR: Statistics}
+
+SHORT_TERM_PERIOD = timedelta(minutes=5)
+HOUR_PERIOD = timedelta(hours=1)
+
+
+def period_start(point_in_time: datetime, period: timedelta) -> datetime:
+    """Return the start of the period point_in_time is in."""
+    if period == HOUR_PERIOD:
+        return point_in_time.replace(minute=0, second=0, microsecond=0)
+    return point_in_time.replace(
+        minute=point_in_time.minute - point_in_time.minute % 5,
+        second=0,
+        microsecond=0,
+    )
+
+
+class _Accumulator:
+    """Aggregate the values of an entity within a period.
+
+    The mean is weighted by how long each value was held. The value held
+    at the end of a period is carried over to the next period.
+    """
+
+    __slots__ = (
+        "start",
+        "duration",
+        "weighted_sum",
+        "min",
+        "max",
+        "last",
+        "value",
+        "since",
+    )
+
+    def __init__(self, start: datetime, value: Optional[float] = None) -> None:
+        """Initialize an accumulator, holding a value from the start."""
+        self.start = start
+        # Seconds a value was held and the sum of the values times their seconds
+        self.duration = 0.0
+        self.weighted_sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.last: Optional[float] = None
+        # The value held since a point in time, None in a gap
+        self.value: Optional[float] = None
+        self.since = start
+        if value is not None:
+            self.add(value, start)
+
+    def _hold(self, until: datetime) -> None:
+        """Account for the current value being held until a point in time."""
+        if until <= self.since:
+            return
+        if self.value is not None:
+            seconds = (until - self.since).total_seconds()
+            self.duration += seconds
+            self.weighted_sum += self.value * seconds
+        self.since = until
+
+    def add(self, value: float, point_in_time: datetime) -> None:
+        """Hold a value from a point in time."""
+        self._hold(point_in_time)
+        self.value = value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.last = value
+
+    def add_gap(self, point_in_time: datetime) -> None:
+        """Hold no value from a point in time."""
+        self._hold(point_in_time)
+        self.value = None
+
+    def close(self, end: datetime) -> Optional["_Accumulator"]:
+        """Hold the current value until the end of the period.
+
+        Returns the accumulator of the next period if a value is held.
+        """
+        self._hold(end)
+        if self.value is None:
+            return None
+        return _Accumulator(end, self.value)
+
+    def merge(self, other: "_Accumulator") -> None:
+        """Add the values of a closed accumulator of a shorter period."""
+        self.duration += other.duration
+        self.weighted_sum += other.weighted_sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.last = other.last
+
+    def as_row(self, entity_id: str) -> dict:
+        """Return a statistics table row."""
+        if self.duration:
+            mean = self.weighted_sum / self.duration
+        else:
+            # Only held for an instant before a gap
+            mean = self.last
+        return {
+            "entity_id": entity_id,
+            "start": self.start,
+            "mean": mean,
+            "min": self.min,
+            "max": self.max,
+            "last": self.last,
+        }
+
+
+class StatisticsCompiler:
+    """Compile statistics of numeric states incrementally.
+
+    Numeric states with a unit of measurement are aggregated in memory
+    as they are recorded. Once a period has passed its row is held as
+    pending until the recorder writes it and commits. The value of an
+    entity is carried over to the next periods until its state is no
+    longer numeric or it is removed.
+
+    The open periods are only kept in memory. The periods a restart falls
+    in only cover the time after the restart, from when the entities
+    set their state again.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the compiler."""
+        self._short_term: Dict[str, _Accumulator] = {}
+        self._hourly: Dict[str, _Accumulator] = {}
+        self._next_compile: Optional[datetime] = None
+        self.pending: Dict[str, List[dict]] = {PERIOD_5MINUTE: [], PERIOD_HOUR: []}
+
+    def add_state(self, state: State) -> None:
+        """Add a recorded state."""
+        value: Optional[float] = None
+        if ATTR_UNIT_OF_MEASUREMENT in state.attributes:
+            try:
+                value = float(state.state)
+            except ValueError:
+                pass
+            else:
+                if not math.isfinite(value):
+                    value = None
+
+        entity_id = state.entity_id
+        point_in_time = self._point_in_time(
+            entity_id, process_timestamp(state.last_updated)
+        )
+        if point_in_time is None:
+            return
+        accumulator = self._open_short_term(entity_id, point_in_time)
+        if value is not None:
+            if accumulator is None:
+                start = period_start(point_in_time, SHORT_TERM_PERIOD)
+                accumulator = self._short_term[entity_id] = _Accumulator(start)
+            accumulator.add(value, point_in_time)
+        elif accumulator is not None:
+            accumulator.add_gap(point_in_time)
+
+    def remove_entity(self, entity_id: str, point_in_time: datetime) -> None:
+        """Stop holding the value of a removed entity."""
+        point_in_time = self._point_in_time(entity_id, point_in_time)
+        if point_in_time is None:
+            return
+        accumulator = self._open_short_term(entity_id, point_in_time)
+        if accumulator is not None:
+            accumulator.add_gap(point_in_time)
+
+    def compile(self, now: datetime) -> None:
+        """Close the periods that have passed."""
+        if self._next_compile is not None and now < self._next_compile:
+            return
+
+        short_term_start = period_start(now, SHORT_TERM_PERIOD)
+        self._next_compile = short_term_start + SHORT_TERM_PERIOD
+
+        for entity_id in list(self._short_term):
+            self._close_short_term(entity_id, short_term_start)
+
+        hour_start = period_start(now, HOUR_PERIOD)
+        for entity_id, accumulator in list(self._hourly.items()):
+            if accumulator.start < hour_start:
+                del self._hourly[entity_id]
+                self.pending[PERIOD_HOUR].append(accumulator.as_row(entity_id))
+
+    def clear_pending(self) -> None:
+        """Forget the pending rows once they have been written."""
+        for rows in self.pending.values():
+            rows.clear()
+
+    def _point_in_time(
+        self, entity_id: str, point_in_time: datetime
+    ) -> Optional[datetime]:
+        """Return the point in time to apply a change of an entity at.
+
+        A change recorded after a compile closed its period replaces the
+        value carried over to the open period from its start. None is
+        returned if a newer change was applied already.
+        """
+        accumulator = self._short_term.get(entity_id)
+        if accumulator is None or point_in_time >= accumulator.start:
+            return point_in_time
+        if accumulator.since > accumulator.start:
+            return None
+        del self._short_term[entity_id]
+        return accumulator.start
+
+    def _open_short_term(
+        self, entity_id: str, point_in_time: datetime
+    ) -> Optional[_Accumulator]:
+        """Return the accumulator of the period a point in time is in.
+
+        The periods before it are closed. None is returned if no value is
+        held.
+        """
+        if entity_id not in self._short_term:
+            return None
+        self._close_short_term(
+            entity_id, period_start(point_in_time, SHORT_TERM_PERIOD)
+        )
+        return self._short_term.get(entity_id)
+
+    def _close_short_term(self, entity_id: str, until: datetime) -> None:
+        """Close the short term periods of an entity that start before until.
+
+        Each closed period is folded into its hour. The value held at the
+        end of a period is carried over to the next one.
+        """
+        accumulator: Optional[_Accumulator] = self._short_term[entity_id]
+        while accumulator is not None and accumulator.start < until:
+            next_accumulator = accumulator.close(accumulator.start + SHORT_TERM_PERIOD)
+            if accumulator.last is not None:
+                self.pending[PERIOD_5MINUTE].append(accumulator.as_row(entity_id))
+                self._fold_hourly(entity_id, accumulator)
+            accumulator = next_accumulator
+
+        if accumulator is None:
+            del self._short_term[entity_id]
+        else:
+            self._short_term[entity_id] = accumulator
+
+    def _fold_hourly(self, entity_id: str, accumulator: _Accumulator) -> None:
+        """Add a closed short term period to the hour it is in."""
+        hour_start = period_start(accumulator.start, HOUR_PERIOD)
+        hourly = self._hourly.get(entity_id)
+        if hourly is not None and hourly.start != hour_start:
+            del self._hourly[entity_id]
+            self.pending[PERIOD_HOUR].append(hourly.as_row(entity_id))
+            hourly = None
+        if hourly is None:
+            hourly = self._hourly[entity_id] = _Accumulator(hour_start)
+        hourly.merge(accumulator)
+
+
+def statistics_during_period(session, start_time, end_time, entity_ids, period):
+    """Return the statistics of entities for a period of time."""
+    table = STATISTICS_TABLES[period]
+    query = session.query(table).filter(table.start >= start_time)
+    if end_time is not None:
+        query = query.filter(table.start < end_time)
+    if entity_ids is not None:
+        query = query.filter(table.entity_id.in_(entity_ids))
+    return query.order_by(table.entity_id, table.start)
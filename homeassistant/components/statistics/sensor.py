@@ -3,6 +3,7 @@ from collections import deque
 import logging
 import statistics
 
+from sqlalchemy.orm import joinedload
 import voluptuous as vol
 
 from homeassistant.components.recorder.models import States
@@ -326,8 +327,10 @@ class StatisticsSensor(Entity):
         _LOGGER.debug("%s: initializing values from the database", self.entity_id)
 
         with session_scope(hass=self.hass) as session:
-            query = session.query(States).filter(
-                States.entity_id == self._entity_id.lower()
+            query = (
+                session.query(States)
+                .options(joinedload(States.state_attributes))
+                .filter(States.entity_id == self._entity_id.lower())
             )
 
             if self._max_age is not None:
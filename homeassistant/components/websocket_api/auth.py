@@ -16,11 +16,16 @@ TYPE_AUTH_INVALID = "auth_invalid"
 TYPE_AUTH_OK = "auth_ok"
 TYPE_AUTH_REQUIRED = "auth_required"
 
+# Clients that set this in the auth message receive the messages
+# queued within one loop iteration as a single JSON array frame
+COALESCE_MESSAGES = "coalesce_messages"
+
 AUTH_MESSAGE_SCHEMA = vol.Schema(
     {
         vol.Required("type"): TYPE_AUTH,
         vol.Exclusive("api_password", "auth"): str,
         vol.Exclusive("access_token", "auth"): str,
+        vol.Optional(COALESCE_MESSAGES, default=False): bool,
     }
 )
 
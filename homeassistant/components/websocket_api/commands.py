@@ -14,10 +14,15 @@ from homeassistant.exceptions import (
     Unauthorized,
 )
 from homeassistant.helpers import config_validation as cv, entity
-from homeassistant.helpers.event import TrackTemplate, async_track_template_result
+from homeassistant.helpers.event import (
+    TrackTemplate,
+    async_track_state_change_event,
+    async_track_template_result,
+)
 from homeassistant.helpers.service import async_get_all_descriptions
 from homeassistant.helpers.template import Template
 from homeassistant.loader import IntegrationNotFound, async_get_integration
+from homeassistant.setup import async_get_setup_timeline
 
 from . import const, decorators, messages
 
@@ -28,6 +33,7 @@ from . import const, decorators, messages
 def async_register_commands(hass, async_reg):
     """Register commands."""
     async_reg(hass, handle_subscribe_events)
+    async_reg(hass, handle_subscribe_entities)
     async_reg(hass, handle_unsubscribe_events)
     async_reg(hass, handle_call_service)
     async_reg(hass, handle_get_states)
@@ -37,6 +43,7 @@ def async_register_commands(hass, async_reg):
     async_reg(hass, handle_render_template)
     async_reg(hass, handle_manifest_list)
     async_reg(hass, handle_manifest_get)
+    async_reg(hass, handle_integration_setup_timeline)
     async_reg(hass, handle_entity_source)
     async_reg(hass, handle_subscribe_trigger)
     async_reg(hass, handle_test_condition)
@@ -94,6 +101,74 @@ def handle_subscribe_events(hass, connection, msg):
     connection.send_message(messages.result_message(msg["id"]))
 
 
+@callback
+@decorators.websocket_command(
+    {
+        vol.Required("type"): "subscribe_entities",
+        vol.Optional("entity_ids"): cv.entity_ids,
+    }
+)
+def handle_subscribe_entities(hass, connection, msg):
+    """Handle subscribe entities command.
+
+    Sends the compressed states of the entities and then only
+    the changes of a state compared to the previous one.
+    """
+    entity_ids = msg.get("entity_ids")
+    can_read = _async_entity_read_checker(connection)
+
+    @callback
+    def forward_entity_changes(event):
+        """Forward the changes of an entity to websocket."""
+        if not can_read(event.data["entity_id"]):
+            return
+
+        connection.send_message(messages.cached_state_diff_message(msg["id"], event))
+
+    if entity_ids is None:
+        states = hass.states.async_all()
+        connection.subscriptions[msg["id"]] = hass.bus.async_listen(
+            EVENT_STATE_CHANGED, forward_entity_changes
+        )
+    else:
+        states = [
+            state
+            for state in (hass.states.get(entity_id) for entity_id in entity_ids)
+            if state is not None
+        ]
+        connection.subscriptions[msg["id"]] = async_track_state_change_event(
+            hass, entity_ids, forward_entity_changes
+        )
+
+    connection.send_message(messages.result_message(msg["id"]))
+    connection.send_message(
+        messages.entities_add_message(
+            msg["id"], (state for state in states if can_read(state.entity_id))
+        )
+    )
+
+
+@callback
+def _async_entity_read_checker(connection):
+    """Return a function that checks if the user can read an entity.
+
+    The permissions of the user are looked up once per entity.
+    """
+    permissions = connection.user.permissions
+    if permissions.access_all_entities(POLICY_READ):
+        return lambda entity_id: True
+
+    allowed = {}
+
+    def can_read(entity_id):
+        """Return if the user can read the entity."""
+        if entity_id not in allowed:
+            allowed[entity_id] = permissions.check_entity(entity_id, POLICY_READ)
+        return allowed[entity_id]
+
+    return can_read
+
+
 @callback
 @decorators.websocket_command(
     {
@@ -181,7 +256,7 @@ def handle_get_states(hass, connection, msg):
             if entity_perm(state.entity_id, "read")
         ]
 
-    connection.send_message(messages.result_message(msg["id"], states))
+    connection.send_message(messages.states_result_message(msg["id"], states))
 
 
 @decorators.websocket_command({vol.Required("type"): "get_services"})
@@ -229,6 +304,13 @@ async def handle_manifest_get(hass, connection, msg):
         connection.send_error(msg["id"], const.ERR_NOT_FOUND, "Integration not found")
 
 
+@callback
+@decorators.websocket_command({vol.Required("type"): "integration/setup_timeline"})
+def handle_integration_setup_timeline(hass, connection, msg):
+    """Handle integration setup timeline command."""
+    connection.send_result(msg["id"], async_get_setup_timeline(hass))
+
+
 @callback
 @decorators.websocket_command({vol.Required("type"): "ping"})
 def handle_ping(hass, connection, msg):
@@ -12,7 +12,7 @@ from homeassistant.const import EVENT_HOMEASSISTANT_STOP
 from homeassistant.core import callback
 from homeassistant.helpers.event import async_call_later
 
-from .auth import AuthPhase, auth_required_message
+from .auth import COALESCE_MESSAGES, AuthPhase, auth_required_message
 from .const import (
     CANCELLATION_ERRORS,
     DATA_CONNECTIONS,
@@ -63,23 +63,43 @@ class WebSocketHandler:
         self._writer_task = None
         self._logger = WebSocketAdapter(_WS_LOGGER, {"connid": id(self)})
         self._peak_checker_unsub = None
+        self._coalesce_messages = False
 
     async def _writer(self):
-        """Write outgoing messages."""
+        """Write outgoing messages.
+
+        If the client opted in, all the messages that are queued when the
+        writer wakes up are sent as a single JSON array frame.
+        """
+        to_write = self._to_write
         # Exceptions if Socket disconnected or cancelled by connection handler
         with suppress(RuntimeError, ConnectionResetError, *CANCELLATION_ERRORS):
             while not self.wsock.closed:
-                message = await self._to_write.get()
-                if message is None:
+                messages = [await to_write.get()]
+                if self._coalesce_messages:
+                    while not to_write.empty():
+                        messages.append(to_write.get_nowait())
+
+                closing = False
+                for index, message in enumerate(messages):
+                    if message is None:
+                        closing = True
+                        del messages[index:]
+                        break
+                    if not isinstance(message, str):
+                        messages[index] = message_to_json(message)
+
+                if len(messages) == 1:
+                    self._logger.debug("Sending %s", messages[0])
+                    await self.wsock.send_str(messages[0])
+                elif messages:
+                    coalesced = f"[{','.join(messages)}]"
+                    self._logger.debug("Sending %s", coalesced)
+                    await self.wsock.send_str(coalesced)
+
+                if closing:
                     break
 
-                self._logger.debug("Sending %s", message)
-
-                if not isinstance(message, str):
-                    message = message_to_json(message)
-
-                await self.wsock.send_str(message)
-
         # Clean up the peaker checker when we shut down the writer
         if self._peak_checker_unsub:
             self._peak_checker_unsub()
@@ -185,6 +205,7 @@ class WebSocketHandler:
 
             self._logger.debug("Received %s", msg_data)
             connection = await auth.async_handle(msg_data)
+            self._coalesce_messages = msg_data.get(COALESCE_MESSAGES, False)
             self.hass.data[DATA_CONNECTIONS] = (
                 self.hass.data.get(DATA_CONNECTIONS, 0) + 1
             )
@@ -2,17 +2,16 @@
 
 from functools import lru_cache
 import logging
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, Union
 
 import voluptuous as vol
 
-from homeassistant.core import Event
+from homeassistant.core import Context, Event, State
 from homeassistant.helpers import config_validation as cv
 from homeassistant.util.json import (
     find_paths_unserializable_data,
     format_unserializable_data,
 )
-from homeassistant.util.yaml.loader import JSON_TYPE
 
 from . import const
 
@@ -31,6 +30,20 @@ BASE_COMMAND_MESSAGE_SCHEMA = vol.Schema({vol.Required("id"): cv.positive_int})
 IDEN_TEMPLATE = "__IDEN__"
 IDEN_JSON_TEMPLATE = '"__IDEN__"'
 
+# Abbreviated keys of the subscribe_entities messages
+COMPRESSED_STATE_STATE = "s"
+COMPRESSED_STATE_ATTRIBUTES = "a"
+COMPRESSED_STATE_CONTEXT = "c"
+COMPRESSED_STATE_LAST_CHANGED = "lc"
+COMPRESSED_STATE_LAST_UPDATED = "lu"
+
+ENTITY_EVENT_ADD = "a"
+ENTITY_EVENT_REMOVE = "r"
+ENTITY_EVENT_CHANGE = "c"
+
+DIFF_ADDITIONS = "+"
+DIFF_REMOVALS = "-"
+
 
 def result_message(iden: int, result: Any = None) -> Dict:
     """Return a success result message."""
@@ -47,7 +60,7 @@ def error_message(iden: int, code: str, message: str) -> Dict:
     }
 
 
-def event_message(iden: JSON_TYPE, event: Any) -> Dict:
+def event_message(iden: Union[int, str], event: Any) -> Dict:
     """Return an event message."""
     return {"id": iden, "type": "event", "event": event}
 
@@ -71,7 +84,25 @@ def _cached_event_message(event: Event) -> str:
     The IDEN_TEMPLATE is used which will be replaced
     with the actual iden in cached_event_message
     """
-    return message_to_json(event_message(IDEN_TEMPLATE, event))
+    try:
+        return f'{{"id": {IDEN_JSON_TEMPLATE}, "type": "event", "event": {event.as_json()}}}'
+    except (ValueError, TypeError):
+        # Log what can not be serialized and send an error instead
+        return message_to_json(event_message(IDEN_TEMPLATE, event))
+
+
+def states_result_message(iden: int, states: Iterable[State]) -> str:
+    """Return a result message of states reusing their serialized JSON."""
+    states = list(states)
+    try:
+        encoded_states = ", ".join(state.as_json() for state in states)
+    except (ValueError, TypeError):
+        # Log what can not be serialized and send an error instead
+        return message_to_json(result_message(iden, states))
+    return (
+        f'{{"id": {iden}, "type": "{const.TYPE_RESULT}", "success": true, '
+        f'"result": [{encoded_states}]}}'
+    )
 
 
 def message_to_json(message: Any) -> str:
@@ -90,3 +121,99 @@ def message_to_json(message: Any) -> str:
                 message["id"], const.ERR_UNKNOWN_ERROR, "Invalid JSON in response"
             )
         )
+
+
+def compressed_state_dict(state: State) -> Dict[str, Any]:
+    """Return a compact dict representation of a state.
+
+    The entity_id is left out as the dict is keyed by it and the
+    last_updated is left out when it is the same as the last_changed.
+    """
+    compressed = {
+        COMPRESSED_STATE_STATE: state.state,
+        COMPRESSED_STATE_ATTRIBUTES: dict(state.attributes),
+        COMPRESSED_STATE_CONTEXT: _compressed_context(state.context),
+        COMPRESSED_STATE_LAST_CHANGED: state.last_changed.timestamp(),
+    }
+    if state.last_changed != state.last_updated:
+        compressed[COMPRESSED_STATE_LAST_UPDATED] = state.last_updated.timestamp()
+    return compressed
+
+
+def _compressed_context(context: Context) -> Any:
+    """Return the context id or the full context if it has a parent or user."""
+    if context.parent_id is None and context.user_id is None:
+        return context.id
+    return context.as_dict()
+
+
+def entities_add_message(iden: int, states: Iterable[State]) -> str:
+    """Return an entity add message for the initial states of a subscription."""
+    return message_to_json(
+        event_message(
+            iden,
+            {
+                ENTITY_EVENT_ADD: {
+                    state.entity_id: compressed_state_dict(state) for state in states
+                }
+            },
+        )
+    )
+
+
+def cached_state_diff_message(iden: int, event: Event) -> str:
+    """Return an entity change message for a state changed event.
+
+    Like the event messages the diff is serialized to json once per
+    event for all the connections that subscribed to the entity.
+    """
+    return _cached_state_diff_message(event).replace(IDEN_JSON_TEMPLATE, str(iden), 1)
+
+
+@lru_cache(maxsize=128)
+def _cached_state_diff_message(event: Event) -> str:
+    """Cache and serialize the state diff of the event to json."""
+    return message_to_json(event_message(IDEN_TEMPLATE, _state_diff_event(event)))
+
+
+def _state_diff_event(event: Event) -> Dict[str, Any]:
+    """Return the entity event of a state changed event."""
+    entity_id = event.data["entity_id"]
+    new_state = event.data["new_state"]
+    if new_state is None:
+        return {ENTITY_EVENT_REMOVE: [entity_id]}
+    old_state = event.data["old_state"]
+    if old_state is None:
+        return {ENTITY_EVENT_ADD: {entity_id: compressed_state_dict(new_state)}}
+    return {ENTITY_EVENT_CHANGE: {entity_id: _state_diff(old_state, new_state)}}
+
+
+def _state_diff(old_state: State, new_state: State) -> Dict[str, Any]:
+    """Return the changes between two states of an entity."""
+    additions: Dict[str, Any] = {}
+    diff = {DIFF_ADDITIONS: additions}
+    if old_state.state != new_state.state:
+        additions[COMPRESSED_STATE_STATE] = new_state.state
+    if old_state.last_changed != new_state.last_changed:
+        additions[COMPRESSED_STATE_LAST_CHANGED] = new_state.last_changed.timestamp()
+    elif old_state.last_updated != new_state.last_updated:
+        additions[COMPRESSED_STATE_LAST_UPDATED] = new_state.last_updated.timestamp()
+    if old_state.context.id != new_state.context.id:
+        additions[COMPRESSED_STATE_CONTEXT] = _compressed_context(new_state.context)
+
+    old_attributes = old_state.attributes
+    new_attributes = new_state.attributes
+    if old_attributes != new_attributes:
+        changed_attributes = {
+            key: value
+            for key, value in new_attributes.items()
+            if key not in old_attributes or old_attributes[key] != value
+        }
+        if changed_attributes:
+            additions[COMPRESSED_STATE_ATTRIBUTES] = changed_attributes
+        removed_attributes = [
+            key for key in old_attributes if key not in new_attributes
+        ]
+        if removed_attributes:
+            diff[DIFF_REMOVALS] = {COMPRESSED_STATE_ATTRIBUTES: removed_attributes}
+    return diff
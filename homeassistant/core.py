@@ -13,6 +13,7 @@ import logging
 import os
 import pathlib
 import re
+import sys
 import threading
 from time import monotonic
 from types import MappingProxyType
@@ -29,12 +30,12 @@ from typing import (
     Mapping,
     Optional,
     Set,
+    Tuple,
     TypeVar,
     Union,
     cast,
 )
 
-import attr
 import voluptuous as vol
 import yarl
 
@@ -70,6 +71,7 @@ from homeassistant.exceptions import (
     ServiceNotFound,
     Unauthorized,
 )
+from homeassistant.helpers.json import json_dumps, json_dumps_object
 from homeassistant.util import location, network
 from homeassistant.util.async_ import fire_coroutine_threadsafe, run_callback_threadsafe
 import homeassistant.util.dt as dt_util
@@ -116,6 +118,9 @@ TIMEOUT_EVENT_START = 15
 
 _LOGGER = logging.getLogger(__name__)
 
+# Marks a context id that has not been generated yet
+_LAZY_CONTEXT_ID = object()
+
 
 def split_entity_id(entity_id: str) -> List[str]:
     """Split a state entity_id into domain, object_id."""
@@ -563,13 +568,64 @@ class HomeAssistant:
             self._stopped.set()
 
 
-@attr.s(slots=True, frozen=True)
 class Context:
-    """The context that triggered something."""
+    """The context that triggered something.
+
+    Most contexts are never looked up by id so the id is only
+    generated the first time it is accessed.
+    """
+
+    __slots__ = ("user_id", "parent_id", "_id")
+
+    user_id: Optional[str]
+    parent_id: Optional[str]
+    _id: Any
+
+    def __init__(
+        self,
+        user_id: Optional[str] = None,
+        parent_id: Optional[str] = None,
+        id: Any = _LAZY_CONTEXT_ID,  # pylint: disable=redefined-builtin
+    ) -> None:
+        """Initialize a context."""
+        object.__setattr__(self, "user_id", user_id)
+        object.__setattr__(self, "parent_id", parent_id)
+        object.__setattr__(self, "_id", id)
+
+    @property
+    def id(self) -> str:  # pylint: disable=invalid-name
+        """Return the id of the context."""
+        if self._id is _LAZY_CONTEXT_ID:
+            object.__setattr__(self, "_id", uuid_util.random_uuid_hex())
+        return self._id  # type: ignore
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        """Contexts are immutable."""
+        raise AttributeError(f"Can not set {name}, Context is immutable")
 
-    user_id: str = attr.ib(default=None)
-    parent_id: Optional[str] = attr.ib(default=None)
-    id: str = attr.ib(factory=uuid_util.random_uuid_hex)
+    def __reduce__(self) -> Tuple:
+        """Return how to copy or pickle the context."""
+        return (self.__class__, (self.user_id, self.parent_id, self.id))
+
+    def __eq__(self, other: Any) -> bool:
+        """Return the comparison."""
+        return (
+            other.__class__ is self.__class__
+            and self.id == other.id
+            and self.user_id == other.user_id
+            and self.parent_id == other.parent_id
+        )
+
+    def __hash__(self) -> int:
+        """Make hashable."""
+        return hash((self.user_id, self.parent_id, self.id))
+
+    def __repr__(self) -> str:
+        """Return the representation."""
+        return (
+            f"Context(user_id={self.user_id!r}, parent_id={self.parent_id!r}, "
+            f"id={self.id!r})"
+        )
 
     def as_dict(self) -> dict:
         """Return a dictionary representation of the context."""
@@ -590,7 +646,15 @@ class EventOrigin(enum.Enum):
 class Event:
     """Representation of an event within the bus."""
 
-    __slots__ = ["event_type", "data", "origin", "time_fired", "context"]
+    __slots__ = [
+        "event_type",
+        "data",
+        "origin",
+        "time_fired",
+        "context",
+        "_data_json",
+        "_as_json",
+    ]
 
     def __init__(
         self,
@@ -606,6 +670,8 @@ class Event:
         self.origin = origin
         self.time_fired = time_fired or dt_util.utcnow()
         self.context: Context = context or Context()
+        self._data_json: Optional[str] = None
+        self._as_json: Optional[str] = None
 
     def __hash__(self) -> int:
         """Make hashable."""
@@ -625,6 +691,43 @@ class Event:
             "context": self.context.as_dict(),
         }
 
+    @property
+    def data_json(self) -> str:
+        """Return the data encoded to JSON.
+
+        Serialized once for the recorder, the websocket and the API.
+        States in the data reuse their own cached JSON. Raises ValueError
+        or TypeError if the data is not valid JSON.
+        """
+        if self._data_json is None:
+            data = self.data
+            if all(key.__class__ is str for key in data):
+                self._data_json = json_dumps_object(
+                    {
+                        key: value.as_json()
+                        if isinstance(value, State)
+                        else json_dumps(value)
+                        for key, value in data.items()
+                    }
+                )
+            else:
+                self._data_json = json_dumps(data)
+        return self._data_json
+
+    def as_json(self) -> str:
+        """Return the JSON of as_dict, serialized once for all consumers."""
+        if self._as_json is None:
+            self._as_json = json_dumps_object(
+                {
+                    "event_type": json_dumps(self.event_type),
+                    "data": self.data_json,
+                    "origin": json_dumps(str(self.origin.value)),
+                    "time_fired": json_dumps(self.time_fired.isoformat()),
+                    "context": json_dumps(self.context.as_dict()),
+                }
+            )
+        return self._as_json
+
     def __repr__(self) -> str:
         """Return the representation."""
         # pylint: disable=maybe-no-member
@@ -650,8 +753,9 @@ class EventBus:
 
     def __init__(self, hass: HomeAssistant) -> None:
         """Initialize a new event bus."""
-        self._listeners: Dict[str, List[HassJob]] = {}
+        self._listeners: Dict[str, List[Tuple[HassJob, Optional[Callable]]]] = {}
         self._hass = hass
+        self._profiler: Optional[Any] = None
 
     @callback
     def async_listeners(self) -> Dict[str, int]:
@@ -661,6 +765,19 @@ class EventBus:
         """
         return {key: len(self._listeners[key]) for key in self._listeners}
 
+    @callback
+    def async_set_profiler(self, profiler: Optional[Any]) -> None:
+        """Set the profiler that runs the listeners of fired events.
+
+        The profiler needs an async_event_fired(event) method, called for
+        every fired event, and an async_add_hass_job(job, event) method,
+        called instead of hass.async_add_hass_job for every listener.
+        Pass None to stop profiling.
+
+        This method must be run in the event loop.
+        """
+        self._profiler = profiler
+
     @property
     def listeners(self) -> Dict[str, int]:
         """Return dictionary with events and the number of listeners."""
@@ -703,11 +820,25 @@ class EventBus:
         if event_type != EVENT_TIME_CHANGED:
             _LOGGER.debug("Bus:Handling %s", event)
 
+        profiler = self._profiler
+        if profiler is None:
+            add_hass_job = self._hass.async_add_hass_job
+        else:
+            profiler.async_event_fired(event)
+            add_hass_job = profiler.async_add_hass_job
+
         if not listeners:
             return
 
-        for job in listeners:
-            self._hass.async_add_hass_job(job, event)
+        for job, event_filter in listeners:
+            if event_filter is not None:
+                try:
+                    if not event_filter(event):
+                        continue
+                except Exception:  # pylint: disable=broad-except
+                    _LOGGER.exception("Error in event filter")
+                    continue
+            add_hass_job(job, event)
 
     def listen(self, event_type: str, listener: Callable) -> CALLBACK_TYPE:
         """Listen for all events or events of a specific type.
@@ -726,23 +857,40 @@ class EventBus:
         return remove_listener
 
     @callback
-    def async_listen(self, event_type: str, listener: Callable) -> CALLBACK_TYPE:
+    def async_listen(
+        self,
+        event_type: str,
+        listener: Callable,
+        event_filter: Optional[Callable] = None,
+    ) -> CALLBACK_TYPE:
         """Listen for all events or events of a specific type.
 
         To listen to all events specify the constant ``MATCH_ALL``
         as event_type.
 
+        An optional event_filter, which must be a callback decorated with
+        @callback that returns a boolean value, determines if the
+        listener callable should run. The filter is evaluated inline
+        when the event is fired so no job is scheduled for events
+        the listener does not care about.
+
         This method must be run in the event loop.
         """
-        return self._async_listen_job(event_type, HassJob(listener))
+        if event_filter is not None and not is_callback(event_filter):
+            raise HomeAssistantError(f"Event filter {event_filter} is not a callback")
+        return self._async_listen_filterable_job(
+            event_type, (HassJob(listener), event_filter)
+        )
 
     @callback
-    def _async_listen_job(self, event_type: str, hassjob: HassJob) -> CALLBACK_TYPE:
-        self._listeners.setdefault(event_type, []).append(hassjob)
+    def _async_listen_filterable_job(
+        self, event_type: str, filterable_job: Tuple[HassJob, Optional[Callable]]
+    ) -> CALLBACK_TYPE:
+        self._listeners.setdefault(event_type, []).append(filterable_job)
 
         def remove_listener() -> None:
             """Remove the listener."""
-            self._async_remove_listener(event_type, hassjob)
+            self._async_remove_listener(event_type, filterable_job)
 
         return remove_listener
 
@@ -775,12 +923,12 @@ class EventBus:
 
         This method must be run in the event loop.
         """
-        job: Optional[HassJob] = None
+        filterable_job: Optional[Tuple[HassJob, Optional[Callable]]] = None
 
         @callback
         def _onetime_listener(event: Event) -> None:
             """Remove listener from event bus and then fire listener."""
-            nonlocal job
+            nonlocal filterable_job
             if hasattr(_onetime_listener, "run"):
                 return
             # Set variable so that we will never run twice.
@@ -789,22 +937,24 @@ class EventBus:
             # multiple times as well.
             # This will make sure the second time it does nothing.
             setattr(_onetime_listener, "run", True)
-            assert job is not None
-            self._async_remove_listener(event_type, job)
+            assert filterable_job is not None
+            self._async_remove_listener(event_type, filterable_job)
             self._hass.async_run_job(listener, event)
 
-        job = HassJob(_onetime_listener)
+        filterable_job = (HassJob(_onetime_listener), None)
 
-        return self._async_listen_job(event_type, job)
+        return self._async_listen_filterable_job(event_type, filterable_job)
 
     @callback
-    def _async_remove_listener(self, event_type: str, hassjob: HassJob) -> None:
+    def _async_remove_listener(
+        self, event_type: str, filterable_job: Tuple[HassJob, Optional[Callable]]
+    ) -> None:
         """Remove a listener of a specific event_type.
 
         This method must be run in the event loop.
         """
         try:
-            self._listeners[event_type].remove(hassjob)
+            self._listeners[event_type].remove(filterable_job)
 
             # delete event_type list if empty
             if not self._listeners[event_type]:
@@ -812,7 +962,9 @@ class EventBus:
         except (KeyError, ValueError):
             # KeyError is key event_type listener did not exist
             # ValueError if listener did not exist within event_type
-            _LOGGER.exception("Unable to remove unknown job listener %s", hassjob)
+            _LOGGER.exception(
+                "Unable to remove unknown job listener %s", filterable_job
+            )
 
 
 class State:
@@ -838,6 +990,7 @@ class State:
         "domain",
         "object_id",
         "_as_dict",
+        "_as_json",
     ]
 
     def __init__(
@@ -867,12 +1020,18 @@ class State:
 
         self.entity_id = entity_id.lower()
         self.state = state
-        self.attributes = MappingProxyType(attributes or {})
+        self.attributes: Mapping[str, Any]
+        if attributes is not None and attributes.__class__ is MappingProxyType:
+            # Shared with the previous state of the entity
+            self.attributes = attributes
+        else:
+            self.attributes = MappingProxyType(attributes or {})
         self.last_updated = last_updated or dt_util.utcnow()
         self.last_changed = last_changed or self.last_updated
         self.context = context or Context()
         self.domain, self.object_id = split_entity_id(self.entity_id)
         self._as_dict: Optional[Dict[str, Collection[Any]]] = None
+        self._as_json: Optional[str] = None
 
     @property
     def name(self) -> str:
@@ -905,6 +1064,31 @@ class State:
             }
         return self._as_dict
 
+    @property
+    def attributes_json(self) -> str:
+        """Return the attributes encoded to JSON.
+
+        Not cached, only the recorder needs the attributes on their own.
+        Raises ValueError or TypeError if they are not valid JSON.
+        """
+        return json_dumps(dict(self.attributes))
+
+    def as_json(self) -> str:
+        """Return the JSON of as_dict, serialized once for all consumers."""
+        if self._as_json is None:
+            as_dict = self.as_dict()
+            self._as_json = json_dumps_object(
+                {
+                    "entity_id": json_dumps(self.entity_id),
+                    "state": json_dumps(self.state),
+                    "attributes": self.attributes_json,
+                    "last_changed": json_dumps(as_dict["last_changed"]),
+                    "last_updated": json_dumps(as_dict["last_updated"]),
+                    "context": json_dumps(as_dict["context"]),
+                }
+            )
+        return self._as_json
+
     @classmethod
     def from_dict(cls, json_dict: Dict) -> Any:
         """Initialize a state from a dict.
@@ -1169,6 +1353,12 @@ class StateMachine:
         if same_state and same_attr:
             return
 
+        if same_attr:
+            # Only the state changed, keep sharing the attributes
+            attributes = old_state.attributes  # type: ignore
+        else:
+            attributes = _intern_attribute_keys(attributes)
+
         if context is None:
             context = Context()
 
@@ -1193,6 +1383,18 @@ class StateMachine:
         )
 
 
+def _intern_attribute_keys(attributes: Mapping) -> Dict:
+    """Copy the attributes with interned keys.
+
+    The same attribute names are used by thousands of states, keys that
+    come from parsed payloads are not interned by Python itself.
+    """
+    return {
+        sys.intern(key) if key.__class__ is str else key: value
+        for key, value in attributes.items()
+    }
+
+
 class Service:
     """Representation of a callable service."""
 
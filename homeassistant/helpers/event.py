@@ -5,12 +5,14 @@ from dataclasses import dataclass
 from datetime import datetime, timedelta
 import functools as ft
 import logging
+from operator import attrgetter
 import time
 from typing import (
     Any,
     Awaitable,
     Callable,
     Dict,
+    FrozenSet,
     Iterable,
     List,
     Optional,
@@ -62,6 +64,13 @@ TRACK_STATE_REMOVED_DOMAIN_LISTENER = "track_state_removed_domain_listener"
 TRACK_ENTITY_REGISTRY_UPDATED_CALLBACKS = "track_entity_registry_updated_callbacks"
 TRACK_ENTITY_REGISTRY_UPDATED_LISTENER = "track_entity_registry_updated_listener"
 
+_TEMPLATE_RENDERS_FOR_EVENT = "track_template_renders_for_event"
+_TIMER_WHEEL = "timer_wheel"
+
+# Callbacks that run more than this many seconds after
+# they were due are counted as late by the timer wheel
+TIMER_LATE_THRESHOLD = 1
+
 _ALL_LISTENER = "all"
 _DOMAINS_LISTENER = "domains"
 _ENTITIES_LISTENER = "entities"
@@ -244,6 +253,11 @@ def async_track_state_change_event(
 
     if TRACK_STATE_CHANGE_LISTENER not in hass.data:
 
+        @callback
+        def _async_state_change_filter(event: Event) -> bool:
+            """Filter state changes by entity_id."""
+            return event.data.get("entity_id") in entity_callbacks
+
         @callback
         def _async_state_change_dispatcher(event: Event) -> None:
             """Dispatch state changes by entity_id."""
@@ -261,7 +275,9 @@ def async_track_state_change_event(
                     )
 
         hass.data[TRACK_STATE_CHANGE_LISTENER] = hass.bus.async_listen(
-            EVENT_STATE_CHANGED, _async_state_change_dispatcher
+            EVENT_STATE_CHANGED,
+            _async_state_change_dispatcher,
+            event_filter=_async_state_change_filter,
         )
 
     job = HassJob(action)
@@ -328,6 +344,12 @@ def async_track_entity_registry_updated_event(
 
     if TRACK_ENTITY_REGISTRY_UPDATED_LISTENER not in hass.data:
 
+        @callback
+        def _async_entity_registry_updated_filter(event: Event) -> bool:
+            """Filter entity registry updates by entity_id."""
+            entity_id = event.data.get("old_entity_id", event.data["entity_id"])
+            return entity_id in entity_callbacks
+
         @callback
         def _async_entity_registry_updated_dispatcher(event: Event) -> None:
             """Dispatch entity registry updates by entity_id."""
@@ -346,7 +368,9 @@ def async_track_entity_registry_updated_event(
                     )
 
         hass.data[TRACK_ENTITY_REGISTRY_UPDATED_LISTENER] = hass.bus.async_listen(
-            EVENT_ENTITY_REGISTRY_UPDATED, _async_entity_registry_updated_dispatcher
+            EVENT_ENTITY_REGISTRY_UPDATED,
+            _async_entity_registry_updated_dispatcher,
+            event_filter=_async_entity_registry_updated_filter,
         )
 
     job = HassJob(action)
@@ -368,13 +392,21 @@ def async_track_entity_registry_updated_event(
     return remove_listener
 
 
+@callback
+def _async_domain_has_listeners(
+    domain: str, callbacks: Dict[str, List[HassJob]]
+) -> bool:
+    """Check if the domain has any listeners."""
+    return domain in callbacks or MATCH_ALL in callbacks
+
+
 @callback
 def _async_dispatch_domain_event(
     hass: HomeAssistant, event: Event, callbacks: Dict[str, List]
 ) -> None:
     domain = split_entity_id(event.data["entity_id"])[0]
 
-    if domain not in callbacks and MATCH_ALL not in callbacks:
+    if not _async_domain_has_listeners(domain, callbacks):
         return
 
     listeners = callbacks.get(domain, []) + callbacks.get(MATCH_ALL, [])
@@ -403,6 +435,13 @@ def async_track_state_added_domain(
 
     if TRACK_STATE_ADDED_DOMAIN_LISTENER not in hass.data:
 
+        @callback
+        def _async_state_change_filter(event: Event) -> bool:
+            """Filter state changes by entity_id."""
+            return event.data.get("old_state") is None and _async_domain_has_listeners(
+                split_entity_id(event.data["entity_id"])[0], domain_callbacks
+            )
+
         @callback
         def _async_state_change_dispatcher(event: Event) -> None:
             """Dispatch state changes by entity_id."""
@@ -412,7 +451,9 @@ def async_track_state_added_domain(
             _async_dispatch_domain_event(hass, event, domain_callbacks)
 
         hass.data[TRACK_STATE_ADDED_DOMAIN_LISTENER] = hass.bus.async_listen(
-            EVENT_STATE_CHANGED, _async_state_change_dispatcher
+            EVENT_STATE_CHANGED,
+            _async_state_change_dispatcher,
+            event_filter=_async_state_change_filter,
         )
 
     job = HassJob(action)
@@ -449,6 +490,13 @@ def async_track_state_removed_domain(
 
     if TRACK_STATE_REMOVED_DOMAIN_LISTENER not in hass.data:
 
+        @callback
+        def _async_state_change_filter(event: Event) -> bool:
+            """Filter state changes by entity_id."""
+            return event.data.get("new_state") is None and _async_domain_has_listeners(
+                split_entity_id(event.data["entity_id"])[0], domain_callbacks
+            )
+
         @callback
         def _async_state_change_dispatcher(event: Event) -> None:
             """Dispatch state changes by entity_id."""
@@ -458,7 +506,9 @@ def async_track_state_removed_domain(
             _async_dispatch_domain_event(hass, event, domain_callbacks)
 
         hass.data[TRACK_STATE_REMOVED_DOMAIN_LISTENER] = hass.bus.async_listen(
-            EVENT_STATE_CHANGED, _async_state_change_dispatcher
+            EVENT_STATE_CHANGED,
+            _async_state_change_dispatcher,
+            event_filter=_async_state_change_filter,
         )
 
     job = HassJob(action)
@@ -838,6 +888,7 @@ class _TrackTemplateResultInfo:
         track_template_: TrackTemplate,
         now: datetime,
         event: Optional[Event],
+        replayed: bool = False,
     ) -> Union[bool, TrackTemplateResult]:
         """Re-render the template if conditions match.
 
@@ -877,9 +928,11 @@ class _TrackTemplateResultInfo:
             )
 
         self._rate_limit.async_triggered(template, now)
-        self._info[template] = info = template.async_render_to_info(
-            track_template_.variables
-        )
+        if event and not replayed:
+            info = _async_render_to_info_for_event(self.hass, event, track_template_)
+        else:
+            info = template.async_render_to_info(track_template_.variables)
+        self._info[template] = info
 
         try:
             result: Union[str, TemplateError] = info.result()
@@ -902,7 +955,7 @@ class _TrackTemplateResultInfo:
         self,
         event: Optional[Event],
         track_templates: Optional[Iterable[TrackTemplate]] = None,
-        replayed: Optional[bool] = False,
+        replayed: bool = False,
     ) -> None:
         """Refresh the template.
 
@@ -921,7 +974,9 @@ class _TrackTemplateResultInfo:
         now = event.time_fired if not replayed and event else dt_util.utcnow()
 
         for track_template_ in track_templates or self._track_templates:
-            update = self._render_template_if_ready(track_template_, now, event)
+            update = self._render_template_if_ready(
+                track_template_, now, event, replayed
+            )
             if not update:
                 continue
 
@@ -1117,6 +1172,138 @@ def async_track_point_in_time(
 track_point_in_time = threaded_listener_factory(async_track_point_in_time)
 
 
+class _TimerEntry:
+    """A callback scheduled on the timer wheel."""
+
+    __slots__ = ("deadline", "action", "cancelled")
+
+    def __init__(self, deadline: float, action: Callable[[], None]) -> None:
+        """Initialize the entry."""
+        self.deadline = deadline
+        self.action = action
+        self.cancelled = False
+
+
+class TimerWheel:
+    """Schedule callbacks in buckets of the second they are due in.
+
+    A single loop timer is armed per bucket, for its earliest callback,
+    instead of one timer per callback. Cancelling a callback only
+    removes it from its bucket and the timer of a bucket is cancelled
+    once the bucket is empty.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the timer wheel."""
+        self._hass = hass
+        self._buckets: Dict[int, Set[_TimerEntry]] = {}
+        self._timers: Dict[int, Tuple[float, asyncio.TimerHandle]] = {}
+        self.scheduled = 0
+        self.fired = 0
+        self.late = 0
+        self.cancelled = 0
+
+    @property
+    def pending(self) -> int:
+        """Return the number of callbacks that have not run yet."""
+        return sum(len(bucket) for bucket in self._buckets.values())
+
+    @callback
+    def async_as_dict(self) -> Dict[str, int]:
+        """Return the counters of the timer wheel."""
+        return {
+            "pending": self.pending,
+            "scheduled": self.scheduled,
+            "fired": self.fired,
+            "late": self.late,
+            "cancelled": self.cancelled,
+        }
+
+    @callback
+    def async_schedule(
+        self, deadline: float, action: Callable[[], None]
+    ) -> CALLBACK_TYPE:
+        """Run a callback once the timestamp deadline has passed."""
+        entry = _TimerEntry(deadline, action)
+        second = int(deadline)
+        self._buckets.setdefault(second, set()).add(entry)
+        timer = self._timers.get(second)
+        if timer is None or deadline < timer[0]:
+            self._arm(second, deadline, time.time())
+        self.scheduled += 1
+
+        @callback
+        def cancel() -> None:
+            """Remove the callback from its bucket."""
+            # A callback that is due can be cancelled by another
+            # callback of its bucket after it left the bucket
+            entry.cancelled = True
+            bucket = self._buckets.get(second)
+            if bucket is None or entry not in bucket:
+                return
+            bucket.remove(entry)
+            self.cancelled += 1
+            if not bucket:
+                del self._buckets[second]
+                self._timers.pop(second)[1].cancel()
+
+        return cancel
+
+    @callback
+    def _arm(self, second: int, deadline: float, now: float) -> None:
+        """Arm the timer of a bucket for a deadline."""
+        timer = self._timers.get(second)
+        if timer is not None:
+            timer[1].cancel()
+        self._timers[second] = (
+            deadline,
+            self._hass.loop.call_later(deadline - now, self._fire, second),
+        )
+
+    @callback
+    def _fire(self, second: int) -> None:
+        """Run the callbacks of a bucket that are due."""
+        del self._timers[second]
+        bucket = self._buckets[second]
+
+        # Depending on the available clock support (including timer hardware
+        # and the OS kernel) it can happen that we fire a little bit too early
+        # as measured by utcnow(). That is bad when callbacks have assumptions
+        # about the current time. Thus, callbacks that are not due yet stay
+        # in the bucket and the timer is rearmed for the remaining time.
+        now = time_tracker_utcnow().timestamp()
+        due = sorted(
+            (entry for entry in bucket if entry.deadline <= now),
+            key=attrgetter("deadline"),
+        )
+        bucket.difference_update(due)
+        if bucket:
+            self._arm(second, min(entry.deadline for entry in bucket), now)
+        else:
+            del self._buckets[second]
+
+        for entry in due:
+            if entry.cancelled:
+                self.cancelled += 1
+                continue
+            self.fired += 1
+            if now - entry.deadline > TIMER_LATE_THRESHOLD:
+                self.late += 1
+            try:
+                entry.action()
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("Error running timer callback %s", entry.action)
+
+
+@callback
+def async_get_timer_wheel(hass: HomeAssistant) -> TimerWheel:
+    """Return the timer wheel of a hass instance."""
+    timer_wheel: Optional[TimerWheel] = hass.data.get(_TIMER_WHEEL)
+    if timer_wheel is None:
+        timer_wheel = hass.data[_TIMER_WHEEL] = TimerWheel(hass)
+    return timer_wheel
+
+
 @callback
 @bind_hass
 def async_track_point_in_utc_time(
@@ -1132,39 +1319,14 @@ def async_track_point_in_utc_time(
     # having to figure out how to call the action every time its called.
     job = action if isinstance(action, HassJob) else HassJob(action)
 
-    cancel_callback: Optional[asyncio.TimerHandle] = None
-
     @callback
     def run_action() -> None:
         """Call the action."""
-        nonlocal cancel_callback
-
-        now = time_tracker_utcnow()
-
-        # Depending on the available clock support (including timer hardware
-        # and the OS kernel) it can happen that we fire a little bit too early
-        # as measured by utcnow(). That is bad when callbacks have assumptions
-        # about the current time. Thus, we rearm the timer for the remaining
-        # time.
-        delta = (utc_point_in_time - now).total_seconds()
-        if delta > 0:
-            _LOGGER.debug("Called %f seconds too early, rearming", delta)
-
-            cancel_callback = hass.loop.call_later(delta, run_action)
-            return
-
         hass.async_run_hass_job(job, utc_point_in_time)
 
-    delta = utc_point_in_time.timestamp() - time.time()
-    cancel_callback = hass.loop.call_later(delta, run_action)
-
-    @callback
-    def unsub_point_in_time_listener() -> None:
-        """Cancel the call_later."""
-        assert cancel_callback is not None
-        cancel_callback.cancel()
-
-    return unsub_point_in_time_listener
+    return async_get_timer_wheel(hass).async_schedule(
+        utc_point_in_time.timestamp(), run_action
+    )
 
 
 track_point_in_utc_time = threaded_listener_factory(async_track_point_in_utc_time)
@@ -1474,6 +1636,41 @@ def _event_triggers_rerender(event: Event, info: RenderInfo) -> bool:
     return bool(info.filter_lifecycle(entity_id))
 
 
+@callback
+def _async_render_to_info_for_event(
+    hass: HomeAssistant, event: Event, track_template_: TrackTemplate
+) -> RenderInfo:
+    """Render a template once per state change for the same source and variables.
+
+    Many trackers can follow the same template, like a dashboard that
+    subscribes to it from many clients. The trackers re-render in the
+    same dispatch of the event so they can share the render.
+    """
+    template = track_template_.template
+    variables = track_template_.variables
+    try:
+        key = (
+            template.template,
+            frozenset(variables.items()) if variables else None,
+        )
+        hash(key)
+    except TypeError:
+        # Variables that can not be compared cheaply are not shared
+        return template.async_render_to_info(variables)
+
+    renders: Optional[
+        Tuple[Event, Dict[Tuple[str, Optional[FrozenSet]], RenderInfo]]
+    ] = hass.data.get(_TEMPLATE_RENDERS_FOR_EVENT)
+    if renders is None or renders[0] is not event:
+        renders = (event, {})
+        hass.data[_TEMPLATE_RENDERS_FOR_EVENT] = renders
+
+    info = renders[1].get(key)
+    if info is None:
+        info = renders[1][key] = template.async_render_to_info(variables)
+    return info
+
+
 @callback
 def _rate_limit_for_event(
     event: Event, info: RenderInfo, track_template_: TrackTemplate
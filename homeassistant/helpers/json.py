@@ -1,7 +1,8 @@
 """Helpers to help with encoding Home Assistant objects in JSON."""
 from datetime import datetime
 import json
-from typing import Any
+from json.encoder import c_make_encoder, encode_basestring_ascii  # type: ignore
+from typing import Any, Dict
 
 
 class JSONEncoder(json.JSONEncoder):
@@ -20,3 +21,54 @@ class JSONEncoder(json.JSONEncoder):
             return o.as_dict()
 
         return json.JSONEncoder.default(self, o)
+
+
+# Encoding with a shared encoder skips creating one for every call
+_STRICT_ENCODER = JSONEncoder(allow_nan=False)
+
+# The C encoder of the shared encoder is built again for every value that
+# is not a string. Build it once instead, without the circular reference
+# check: attributes and event data are almost always primitive values.
+_FAST_ENCODER = (
+    c_make_encoder(
+        None,
+        _STRICT_ENCODER.default,
+        encode_basestring_ascii,
+        None,
+        ": ",
+        ", ",
+        False,
+        False,
+        False,
+    )
+    if c_make_encoder is not None
+    else None
+)
+
+
+def json_dumps(obj: Any) -> str:
+    """Encode an object to valid JSON.
+
+    Raises ValueError for NaN and infinity, like the JSON of the APIs.
+    """
+    if obj.__class__ is str:
+        return encode_basestring_ascii(obj)  # type: ignore
+    if _FAST_ENCODER is not None:
+        try:
+            return "".join(_FAST_ENCODER(obj, 0))
+        except RecursionError:
+            # Let the shared encoder tell circular references apart
+            pass
+    return _STRICT_ENCODER.encode(obj)
+
+
+def json_dumps_object(encoded_values: Dict[str, str]) -> str:
+    """Join JSON encoded values into a JSON object."""
+    return (
+        "{"
+        + ", ".join(
+            f"{encode_basestring_ascii(key)}: {value}"
+            for key, value in encoded_values.items()
+        )
+        + "}"
+    )
@@ -2,21 +2,34 @@
 from ast import literal_eval
 import asyncio
 import base64
+from collections import OrderedDict
 import collections.abc
 from datetime import datetime, timedelta
 from functools import partial, wraps
 import json
 import logging
 import math
-from operator import attrgetter
 import random
 import re
-from typing import Any, Dict, Generator, Iterable, Optional, Type, Union
+import threading
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
 from urllib.parse import urlencode as urllib_urlencode
-import weakref
 
 import jinja2
 from jinja2 import contextfilter, contextfunction
+from jinja2.bccache import Bucket
+from jinja2.filters import FILTERS
 from jinja2.sandbox import ImmutableSandboxedEnvironment
 from jinja2.utils import Namespace  # type: ignore
 import voluptuous as vol
@@ -30,7 +43,7 @@ from homeassistant.const import (
     STATE_UNKNOWN,
 )
 from homeassistant.core import State, callback, split_entity_id, valid_entity_id
-from homeassistant.exceptions import TemplateError
+from homeassistant.exceptions import HomeAssistantError, TemplateError
 from homeassistant.helpers import location as loc_helper
 from homeassistant.helpers.typing import HomeAssistantType, TemplateVarsType
 from homeassistant.loader import bind_hass
@@ -47,6 +60,14 @@ DATE_STR_FORMAT = "%Y-%m-%d %H:%M:%S"
 
 _RENDER_INFO = "template.render_info"
 _ENVIRONMENT = "template.environment"
+_SORTED_STATES = "template.sorted_states"
+
+# Number of compiled templates kept in memory for the whole process
+COMPILED_CACHE_SIZE = 4096
+
+BYTECODE_STORAGE_KEY = "core.template_bytecode"
+BYTECODE_STORAGE_VERSION = 1
+BYTECODE_SAVE_DELAY = 30
 
 _RE_JINJA_DELIMITERS = re.compile(r"\{%|\{\{|\{#")
 # Match "simple" ints and floats. -1.0, 1, +5, 5.0
@@ -67,9 +88,20 @@ _COLLECTABLE_STATE_ATTRIBUTES = {
     "name",
 }
 
+# Only the results of the selectattr, rejectattr and map(attribute=...)
+# filters are kept between renders. Loops and other filters over all
+# states or a domain still evaluate every state, so these templates
+# keep being rate limited.
 ALL_STATES_RATE_LIMIT = timedelta(minutes=1)
 DOMAIN_STATES_RATE_LIMIT = timedelta(seconds=1)
 
+# Number of filter arguments the results are kept for per template state
+FILTER_RESULTS_SIZE = 8
+
+# The stock filters the memoized filters apply to a single item
+_SELECTATTR_FILTER = FILTERS["selectattr"]
+_MAP_FILTER = FILTERS["map"]
+
 
 @bind_hass
 def attach(hass: HomeAssistantType, obj: Any) -> None:
@@ -296,10 +328,7 @@ class Template:
     def _env(self):
         if self.hass is None:
             return _NO_HASS_ENV
-        ret = self.hass.data.get(_ENVIRONMENT)
-        if ret is None:
-            ret = self.hass.data[_ENVIRONMENT] = TemplateEnvironment(self.hass)
-        return ret
+        return _template_environment(self.hass)
 
     def ensure_valid(self):
         """Return if template is valid."""
@@ -550,6 +579,141 @@ class Template:
         return 'Template("' + self.template + '")'
 
 
+def _template_environment(hass: HomeAssistantType) -> "TemplateEnvironment":
+    """Return the template environment of a hass instance."""
+    ret = hass.data.get(_ENVIRONMENT)
+    if ret is None:
+        ret = hass.data[_ENVIRONMENT] = TemplateEnvironment(hass)
+    return ret
+
+
+class CompiledCodeCache:
+    """Keep the most recently used compiled templates of the process.
+
+    The same template string is often used by many template entities,
+    automations and subscriptions so it only has to be compiled once.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        """Initialize the cache."""
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._cache: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Any:
+        """Return the compiled code of a template or None."""
+        with self._lock:
+            code = self._cache.get(key)
+            if code is None:
+                self.misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return code
+
+    def set(self, key: Any, code: Any) -> None:
+        """Add the compiled code of a template."""
+        with self._lock:
+            self._cache[key] = code
+            self._cache.move_to_end(key)
+            if len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+
+    def items(self) -> List[Tuple[Any, Any]]:
+        """Return the cached items, least recently used first."""
+        with self._lock:
+            return list(self._cache.items())
+
+    def clear(self) -> None:
+        """Remove all compiled code and reset the stats."""
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def cache_info(self) -> Dict[str, int]:
+        """Return the cache stats."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "maxsize": self.maxsize,
+            "currsize": len(self._cache),
+        }
+
+
+_COMPILED_CACHE = CompiledCodeCache(COMPILED_CACHE_SIZE)
+
+
+class TemplateBytecodeCache(jinja2.BytecodeCache):
+    """Persist the bytecode of compiled templates across restarts.
+
+    Only the bytecode of the most recently used templates compiled or
+    loaded during this run is saved so templates that are no longer used
+    are dropped.
+    """
+
+    def __init__(self, hass: HomeAssistantType) -> None:
+        """Initialize the bytecode cache."""
+        # Circular dep
+        # pylint: disable=import-outside-toplevel
+        from homeassistant.helpers.storage import Store
+
+        self._hass = hass
+        self._store = Store(hass, BYTECODE_STORAGE_VERSION, BYTECODE_STORAGE_KEY)
+        self._bytecode: Dict[str, str] = {}
+        self._used = CompiledCodeCache(COMPILED_CACHE_SIZE)
+
+    async def async_load(self) -> None:
+        """Load the bytecode saved by a previous run."""
+        data = await self._store.async_load()
+        if isinstance(data, dict):
+            self._bytecode = data["bytecode"]
+
+    def load_bytecode(self, bucket: Bucket) -> None:
+        """Load the bytecode of a template into the bucket."""
+        encoded = self._bytecode.pop(bucket.key, None)
+        if encoded is None:
+            return
+        # Resets the bucket if it was compiled by another
+        # version of Jinja or Python or the source changed
+        try:
+            bucket.bytecode_from_string(base64.b64decode(encoded))
+        except Exception as err:  # pylint: disable=broad-except
+            _LOGGER.debug("Ignoring invalid bytecode of %s: %s", bucket.key, err)
+            bucket.reset()
+            return
+        if bucket.code is not None:
+            self._used.set(bucket.key, encoded)
+
+    def dump_bytecode(self, bucket: Bucket) -> None:
+        """Save the bytecode of a compiled template."""
+        encoded = base64.b64encode(bucket.bytecode_to_string()).decode()
+        self._used.set(bucket.key, encoded)
+        # Templates can be compiled in the executor
+        self._hass.loop.call_soon_threadsafe(
+            self._store.async_delay_save, self._data_to_save, BYTECODE_SAVE_DELAY
+        )
+
+    @callback
+    def _data_to_save(self) -> Dict[str, Dict[str, str]]:
+        """Return the bytecode to save."""
+        return {"bytecode": dict(self._used.items())}
+
+
+@bind_hass
+async def async_load_bytecode_cache(hass: HomeAssistantType) -> None:
+    """Restore the templates compiled in previous runs."""
+    bytecode_cache = TemplateBytecodeCache(hass)
+    try:
+        await bytecode_cache.async_load()
+    except HomeAssistantError as err:
+        _LOGGER.warning("Unable to load the template bytecode cache: %s", err)
+        return
+    _template_environment(hass).bytecode_cache = bytecode_cache
+
+
 class AllStates:
     """Class to expose all HA states as attributes."""
 
@@ -648,7 +812,7 @@ class DomainStates:
 class TemplateState(State):
     """Class to represent a state object in a template."""
 
-    __slots__ = ("_hass", "_state", "_collect")
+    __slots__ = ("_hass", "_state", "_collect", "_filter_results")
 
     # Inheritance is done so functions that check against State keep working
     # pylint: disable=super-init-not-called
@@ -657,6 +821,7 @@ class TemplateState(State):
         self._hass = hass
         self._state = state
         self._collect = collect
+        self._filter_results = None
 
     def _collect_state(self):
         if self._collect and _RENDER_INFO in self._hass.data:
@@ -758,8 +923,149 @@ def _collect_state(hass: HomeAssistantType, entity_id: str) -> None:
 
 def _state_generator(hass: HomeAssistantType, domain: Optional[str]) -> Generator:
     """State generator for a domain or all states."""
-    for state in sorted(hass.states.async_all(domain), key=attrgetter("entity_id")):
-        yield TemplateState(hass, state, collect=False)
+    yield from _sorted_template_states(hass, domain).template_states
+
+
+class _SortedTemplateStates:
+    """Template states of a domain sorted by entity_id.
+
+    Kept between renders so iterating a domain only wraps the states
+    that changed since the previous render instead of sorting and
+    wrapping every state of the domain again.
+    """
+
+    __slots__ = ("states", "positions", "template_states")
+
+    def __init__(self, hass: HomeAssistantType, states: List[State]) -> None:
+        """Sort and wrap the states."""
+        # The states in state machine order
+        self.states = states
+        order = sorted(range(len(states)), key=lambda idx: states[idx].entity_id)
+        # Position of each state in the sorted template states
+        self.positions = [0] * len(states)
+        for position, idx in enumerate(order):
+            self.positions[idx] = position
+        self.template_states = [
+            TemplateState(hass, states[idx], collect=False) for idx in order
+        ]
+
+    def update(self, hass: HomeAssistantType, states: List[State]) -> bool:
+        """Wrap the states that changed.
+
+        Returns False if entities were added or removed.
+        """
+        old_states = self.states
+        if len(states) != len(old_states):
+            return False
+
+        for idx, (old_state, state) in enumerate(zip(old_states, states)):
+            if old_state is state:
+                continue
+            # Changing the state of an entity keeps its place
+            # in the state machine
+            if old_state.entity_id != state.entity_id:
+                return False
+            self.template_states[self.positions[idx]] = TemplateState(
+                hass, state, collect=False
+            )
+
+        self.states = states
+        return True
+
+
+def _sorted_template_states(
+    hass: HomeAssistantType, domain: Optional[str]
+) -> _SortedTemplateStates:
+    """Return the sorted template states of a domain or all states."""
+    cache = hass.data.get(_SORTED_STATES)
+    if cache is None:
+        cache = hass.data[_SORTED_STATES] = {}
+
+    states = hass.states.async_all(domain)
+    sorted_states = cache.get(domain)
+    if sorted_states is None or not sorted_states.update(hass, states):
+        sorted_states = cache[domain] = _SortedTemplateStates(hass, states)
+    return sorted_states
+
+
+def _filter_results(seq: Iterable, func: Callable[[Any], Any], key: Any) -> Generator:
+    """Yield the items of a sequence with the result of a filter function.
+
+    The results of the last FILTER_RESULTS_SIZE filter arguments are kept
+    on the template states of a domain. A state that changed is wrapped
+    in a new template state, so only the results of the states that
+    changed are computed again on the next render.
+    """
+    try:
+        hash(key)
+    except TypeError:
+        key = None
+
+    # pylint: disable=protected-access
+    for item in seq:
+        # Template states that collect must be read to be collected
+        if key is None or not isinstance(item, TemplateState) or item._collect:
+            yield item, func(item)
+            continue
+
+        results = item._filter_results
+        if results is None:
+            results = item._filter_results = OrderedDict()
+        elif key in results:
+            yield item, results[key]
+            continue
+        if len(results) >= FILTER_RESULTS_SIZE:
+            results.popitem(last=False)
+        result = results[key] = func(item)
+        yield item, result
+
+
+@contextfilter
+def select_attr(context, seq, *args, **kwargs):
+    """Select the items for which a test on an attribute succeeds."""
+    for item, result in _filter_results(
+        seq or (),
+        lambda item: _attr_test(context, item, args, kwargs),
+        ("attr_test", args, tuple(sorted(kwargs.items()))),
+    ):
+        if result:
+            yield item
+
+
+@contextfilter
+def reject_attr(context, seq, *args, **kwargs):
+    """Reject the items for which a test on an attribute succeeds."""
+    for item, result in _filter_results(
+        seq or (),
+        lambda item: _attr_test(context, item, args, kwargs),
+        ("attr_test", args, tuple(sorted(kwargs.items()))),
+    ):
+        if not result:
+            yield item
+
+
+def _attr_test(context: Any, item: Any, args: Tuple, kwargs: Dict) -> bool:
+    """Return if the stock selectattr filter selects an item."""
+    return any(True for _ in _SELECTATTR_FILTER(context, (item,), *args, **kwargs))
+
+
+@contextfilter
+def map_attr(context, seq, *args, **kwargs):
+    """Apply a filter to the items or look up an attribute of them.
+
+    Only looking up an attribute is memoized, filters may depend on
+    more than the item.
+    """
+    if args or "attribute" not in kwargs:
+        yield from _MAP_FILTER(context, seq, *args, **kwargs)
+        return
+
+    for _, result in _filter_results(
+        seq or (),
+        lambda item: list(_MAP_FILTER(context, (item,), **kwargs))[0],
+        ("map", tuple(sorted(kwargs.items()))),
+    ):
+        yield result
 
 
 def _get_state_if_valid(
@@ -1296,7 +1602,6 @@ class TemplateEnvironment(ImmutableSandboxedEnvironment):
         """Initialise template environment."""
         super().__init__()
         self.hass = hass
-        self.template_cache = weakref.WeakValueDictionary()
         self.filters["round"] = forgiving_round
         self.filters["multiply"] = multiply
         self.filters["log"] = logarithm
@@ -1329,6 +1634,9 @@ class TemplateEnvironment(ImmutableSandboxedEnvironment):
         self.filters["bitwise_and"] = bitwise_and
         self.filters["bitwise_or"] = bitwise_or
         self.filters["ord"] = ord
+        self.filters["selectattr"] = select_attr
+        self.filters["rejectattr"] = reject_attr
+        self.filters["map"] = map_attr
         self.globals["log"] = logarithm
         self.globals["sin"] = sine
         self.globals["cos"] = cosine
@@ -1403,12 +1711,27 @@ class TemplateEnvironment(ImmutableSandboxedEnvironment):
             # any instance of this.
             return super().compile(source, name, filename, raw, defer_init)
 
-        cached = self.template_cache.get(source)
+        # Environments with and without hass have different filters
+        key = (self.hass is None, source)
+        cached = _COMPILED_CACHE.get(key)
 
         if cached is None:
-            cached = self.template_cache[source] = super().compile(source)
+            cached = self._compile_source(source)
+            _COMPILED_CACHE.set(key, cached)
 
         return cached
 
+    def _compile_source(self, source):
+        """Compile the template or load its bytecode from a previous run."""
+        bytecode_cache = self.bytecode_cache
+        if bytecode_cache is None:
+            return super().compile(source)
+
+        bucket = bytecode_cache.get_bucket(self, source, None, source)
+        if bucket.code is None:
+            bucket.code = super().compile(source)
+            bytecode_cache.set_bucket(bucket)
+        return bucket.code
+
 
 _NO_HASS_ENV = TemplateEnvironment(None)
@@ -9,7 +9,7 @@ import logging
 from timeit import default_timer as timer
 from typing import Callable, Dict, TypeVar
 
-from homeassistant import core
+from homeassistant import config_entries, core
 from homeassistant.components.websocket_api.const import JSON_DUMP
 from homeassistant.const import ATTR_NOW, EVENT_STATE_CHANGED, EVENT_TIME_CHANGED
 from homeassistant.helpers.entityfilter import convert_include_exclude_filter
@@ -323,6 +323,106 @@ async def json_serialize_states(hass):
     return timer() - start
 
 
+@benchmark
+async def mqtt_message_dispatch(hass):
+    """Dispatch MQTT messages with thousands of subscriptions.
+
+    Mimics a large discovery setup: 4000 subscriptions on device topics
+    plus a few wildcard subscriptions, receiving messages on 20000
+    distinct topics while entities subscribe and unsubscribe.
+    """
+    # pylint: disable=import-outside-toplevel
+    from paho.mqtt.client import MQTTMessage
+
+    from homeassistant.components import mqtt
+
+    devices = 1000
+    topics = 20000
+    received = 0
+
+    @core.callback
+    def listener(msg):
+        """Handle message."""
+        nonlocal received
+        received += 1
+
+    entry = config_entries.ConfigEntry(
+        1,
+        mqtt.DOMAIN,
+        "Benchmark",
+        {},
+        config_entries.SOURCE_USER,
+        config_entries.CONN_CLASS_LOCAL_PUSH,
+        {},
+    )
+    client = mqtt.MQTT(hass, entry, mqtt.CONFIG_SCHEMA({mqtt.DOMAIN: {}})[mqtt.DOMAIN])
+
+    for device in range(devices):
+        for topic in ("state", "attributes", "availability", "command"):
+            await client.async_subscribe(f"home/device_{device}/{topic}", listener, 0)
+    await client.async_subscribe("home/+/state", listener, 0)
+    await client.async_subscribe("homeassistant/#", listener, 0)
+
+    messages = []
+    for index in range(topics):
+        msg = MQTTMessage(topic=f"home/device_{index}/state".encode())
+        msg.payload = f"state_{index}".encode()
+        messages.append(msg)
+
+    start = timer()
+    for index, msg in enumerate(messages):
+        client._mqtt_handle_message(msg)  # pylint: disable=protected-access
+        if index % 10 == 0:
+            unsub = await client.async_subscribe(
+                f"home/entity_{index}/availability", listener, 0
+            )
+            unsub()
+    await hass.async_block_till_done()
+    runtime = timer() - start
+
+    # Device topics below 1000 match the device and the wildcard subscription
+    assert received == topics + devices, received
+    return runtime
+
+
+@benchmark
+async def recorder_write_states(hass):
+    """Record 20000 state changes with the ORM."""
+    return await _recorder_write_states(hass, batch_insert=False)
+
+
+@benchmark
+async def recorder_write_states_batch(hass):
+    """Record 20000 state changes with write-behind batch inserts."""
+    return await _recorder_write_states(hass, batch_insert=True)
+
+
+async def _recorder_write_states(hass, batch_insert):
+    """Record state changes of 200 entities in an in-memory database."""
+    # pylint: disable=import-outside-toplevel
+    from homeassistant.components import recorder
+
+    hass.state = core.CoreState.running
+    config = {
+        recorder.CONF_DB_URL: "sqlite://",
+        recorder.CONF_BATCH_INSERT: batch_insert,
+    }
+    await recorder.async_setup(hass, recorder.CONFIG_SCHEMA({recorder.DOMAIN: config}))
+    instance = hass.data[recorder.DATA_INSTANCE]
+    await instance.async_db_ready
+
+    start = timer()
+    for index in range(20000):
+        hass.states.async_set(
+            f"sensor.benchmark_{index % 200}",
+            str(index),
+            {"unit_of_measurement": "W", "friendly_name": f"Power {index % 200}"},
+        )
+    await hass.async_block_till_done()
+    await hass.async_add_executor_job(instance.block_till_committed, 600)
+    return timer() - start
+
+
 def _create_state_changed_event_from_old_new(
     entity_id, event_time_fired, old_state, new_state
 ):
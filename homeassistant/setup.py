@@ -1,9 +1,11 @@
 """All methods needed to bootstrap a Home Assistant instance."""
 import asyncio
+import contextlib
+from datetime import datetime
 import logging.handlers
 from timeit import default_timer as timer
 from types import ModuleType
-from typing import Awaitable, Callable, Optional, Set
+from typing import Any, Awaitable, Callable, Dict, Generator, Optional, Set, Tuple
 
 from homeassistant import config as conf_util, core, loader, requirements
 from homeassistant.config import async_notify_setup_error
@@ -20,6 +22,14 @@ DATA_SETUP_DONE = "setup_done"
 DATA_SETUP_STARTED = "setup_started"
 DATA_SETUP = "setup_tasks"
 DATA_DEPS_REQS = "deps_reqs_processed"
+DATA_SETUP_TIMELINE = "setup_timeline"
+
+# Phases of the setup of an integration recorded in the timeline
+PHASE_WAIT_DEPENDENCIES = "wait_dependencies"
+PHASE_REQUIREMENTS = "requirements"
+PHASE_IMPORT = "import"
+PHASE_SETUP = "setup"
+PHASE_PLATFORM_SETUP = "platform_setup"
 
 SLOW_SETUP_WARNING = 10
 SLOW_SETUP_MAX_WAIT = 300
@@ -34,6 +44,46 @@ def async_set_domains_to_be_loaded(hass: core.HomeAssistant, domains: Set[str])
     hass.data[DATA_SETUP_DONE] = {domain: asyncio.Event() for domain in domains}
 
 
+@contextlib.contextmanager
+def async_record_setup_phase(
+    hass: core.HomeAssistant, integration: str, phase: str
+) -> Generator[None, None, None]:
+    """Record when a setup phase of an integration started and how long it took.
+
+    A phase that runs more than once, like a platform that is retried,
+    keeps its first start and adds up the durations.
+    """
+    started = dt_util.utcnow()
+    start = timer()
+    try:
+        yield
+    finally:
+        phases = hass.data.setdefault(DATA_SETUP_TIMELINE, {}).setdefault(
+            integration, {}
+        )
+        if phase in phases:
+            phases[phase] = (phases[phase][0], phases[phase][1] + timer() - start)
+        else:
+            phases[phase] = (started, timer() - start)
+
+
+@core.callback
+def async_get_setup_timeline(
+    hass: core.HomeAssistant,
+) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """Return the start and duration of the setup phases of every integration."""
+    timeline: Dict[str, Dict[str, Tuple[datetime, float]]] = hass.data.get(
+        DATA_SETUP_TIMELINE, {}
+    )
+    return {
+        integration: {
+            phase: {"started": started.isoformat(), "duration": round(duration, 3)}
+            for phase, (started, duration) in phases.items()
+        }
+        for integration, phases in timeline.items()
+    }
+
+
 def setup_component(hass: core.HomeAssistant, domain: str, config: ConfigType) -> bool:
     """Set up a component and all its dependencies."""
     return asyncio.run_coroutine_threadsafe(
@@ -209,8 +259,9 @@ async def _async_setup_component(
             hass.data[DATA_SETUP_STARTED].pop(domain)
             return False
 
-        async with hass.timeout.async_timeout(SLOW_SETUP_MAX_WAIT, domain):
-            result = await task
+        with async_record_setup_phase(hass, domain, PHASE_SETUP):
+            async with hass.timeout.async_timeout(SLOW_SETUP_MAX_WAIT, domain):
+                result = await task
     except asyncio.TimeoutError:
         _LOGGER.error(
             "Setup of %s is taking longer than %s seconds."
@@ -339,10 +390,11 @@ async def async_process_deps_reqs(
         raise HomeAssistantError("Could not set up all dependencies.")
 
     if not hass.config.skip_pip and integration.requirements:
-        async with hass.timeout.async_freeze(integration.domain):
-            await requirements.async_get_integration_with_requirements(
-                hass, integration.domain
-            )
+        with async_record_setup_phase(hass, integration.domain, PHASE_REQUIREMENTS):
+            async with hass.timeout.async_freeze(integration.domain):
+                await requirements.async_get_integration_with_requirements(
+                    hass, integration.domain
+                )
 
     processed.add(integration.domain)
 
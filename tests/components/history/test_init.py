@@ -5,8 +5,16 @@ from datetime import timedelta
 import json
 import unittest
 
+from aiohttp import ClientPayloadError
+import pytest
+
 from homeassistant.components import history, recorder
-from homeassistant.components.recorder.models import process_timestamp
+from homeassistant.components.recorder.models import (
+    StateSnapshots,
+    Statistics,
+    process_timestamp,
+)
+from homeassistant.components.recorder.util import session_scope
 import homeassistant.core as ha
 from homeassistant.helpers.json import JSONEncoder
 from homeassistant.setup import async_setup_component, setup_component
@@ -113,6 +121,65 @@ class TestComponentHistory(unittest.TestCase):
 
         assert history.get_state(self.hass, time_before_recorder_ran, "demo.id") is None
 
+    def test_get_states_from_snapshot(self):
+        """Test getting states at a point in time after a state snapshot."""
+        self.test_setup()
+        now = dt_util.utcnow()
+
+        def set_states(point_in_time, states):
+            with patch(
+                "homeassistant.components.recorder.dt_util.utcnow",
+                return_value=point_in_time,
+            ):
+                for entity_id, state in states.items():
+                    mock_state_change_event(
+                        self.hass, ha.State(entity_id, state, {"attribute_test": 1})
+                    )
+                wait_recording_done(self.hass)
+
+        set_states(now, {"test.one": "on", "test.two": "on", "test.three": "on"})
+        # Commit after the snapshot interval to write a snapshot
+        set_states(now + timedelta(hours=2), {})
+
+        with session_scope(hass=self.hass) as session:
+            snapshots = session.query(StateSnapshots).all()
+            assert {snapshot.entity_id for snapshot in snapshots} == {
+                "test.one",
+                "test.two",
+                "test.three",
+            }
+            assert {
+                process_timestamp(snapshot.checkpoint) for snapshot in snapshots
+            } == {now}
+
+        set_states(now + timedelta(hours=3), {"test.two": "off"})
+
+        def states_at(point_in_time):
+            return {
+                state.entity_id: state.state
+                for state in history.get_states(self.hass, point_in_time)
+            }
+
+        assert states_at(now + timedelta(hours=1)) == {
+            "test.one": "on",
+            "test.two": "on",
+            "test.three": "on",
+        }
+        assert states_at(now + timedelta(hours=4)) == {
+            "test.one": "on",
+            "test.two": "off",
+            "test.three": "on",
+        }
+
+        with session_scope(hass=self.hass) as session:
+            session.query(StateSnapshots).delete()
+
+        assert states_at(now + timedelta(hours=4)) == {
+            "test.one": "on",
+            "test.two": "off",
+            "test.three": "on",
+        }
+
     def test_state_changes_during_period(self):
         """Test state change during period."""
         self.test_setup()
@@ -1008,3 +1075,249 @@ async def test_entity_ids_limit_via_api_with_skip_initial_state(hass, hass_clien
     assert len(response_json) == 2
     assert response_json[0][0]["entity_id"] == "light.kitchen"
     assert response_json[1][0]["entity_id"] == "light.cow"
+
+
+async def test_fetch_period_api_with_resolution(hass, hass_client):
+    """Test the fetch period view returns statistics for a resolution."""
+    await hass.async_add_executor_job(init_recorder_component, hass)
+    await async_setup_component(hass, "history", {})
+    await hass.async_add_executor_job(hass.data[recorder.DATA_INSTANCE].block_till_done)
+    start = dt_util.utcnow().replace(minute=0, second=0, microsecond=0)
+
+    def _add_statistics():
+        with session_scope(hass=hass) as session:
+            for entity_id, hours in (("sensor.one", 2), ("sensor.two", 1)):
+                for hour in range(hours):
+                    session.add(
+                        Statistics(
+                            entity_id=entity_id,
+                            start=start - timedelta(hours=hour + 1),
+                            mean=1.5,
+                            min=1,
+                            max=2,
+                            last=2,
+                        )
+                    )
+
+    await hass.async_add_executor_job(_add_statistics)
+
+    client = await hass_client()
+    period = (start - timedelta(hours=6)).isoformat()
+    response = await client.get(
+        f"/api/history/period/{period}",
+        params={"resolution": "hour", "filter_entity_id": "sensor.one,sensor.two"},
+    )
+    assert response.status == 200
+    response_json = await response.json()
+    assert [len(stats) for stats in response_json] == [2, 1]
+    assert response_json[0][0]["entity_id"] == "sensor.one"
+    assert response_json[0][0]["mean"] == 1.5
+    assert response_json[1][0]["entity_id"] == "sensor.two"
+
+    response = await client.get(
+        f"/api/history/period/{period}", params={"resolution": "day"}
+    )
+    assert response.status == 400
+
+
+async def _async_record_states(hass, states):
+    """Record states and wait for them to be committed."""
+    for entity_id, state in states:
+        hass.states.async_set(entity_id, state)
+    await hass.async_block_till_done()
+    await hass.async_add_executor_job(trigger_db_commit, hass)
+    await hass.async_block_till_done()
+    await hass.async_add_executor_job(hass.data[recorder.DATA_INSTANCE].block_till_done)
+
+
+async def test_fetch_period_api_stream(hass, hass_client):
+    """Test streaming the fetch period view returns the same states."""
+    await hass.async_add_executor_job(init_recorder_component, hass)
+    await async_setup_component(hass, "history", {})
+    await hass.async_add_executor_job(hass.data[recorder.DATA_INSTANCE].block_till_done)
+    await _async_record_states(hass, [("binary_sensor.before", "on")])
+    start = dt_util.utcnow()
+    hass.states.async_set("light.kitchen", "on")
+    hass.states.async_set("sensor.temp", "1")
+    hass.states.async_set("light.kitchen", "off")
+    hass.states.async_set("sensor.temp", "2", {"unit_of_measurement": "°C"})
+    hass.states.async_set("light.kitchen", "on")
+    await hass.async_block_till_done()
+    await hass.async_add_executor_job(trigger_db_commit, hass)
+    await hass.async_block_till_done()
+    await hass.async_add_executor_job(hass.data[recorder.DATA_INSTANCE].block_till_done)
+    await _async_record_states(hass, [("switch.unchanged", "on")])
+
+    client = await hass_client()
+    url = f"/api/history/period/{start.isoformat()}"
+    orders = []
+    for params in (
+        {},
+        {"minimal_response": ""},
+        {"filter_entity_id": "sensor.temp,binary_sensor.before,light.kitchen"},
+    ):
+        response = await client.get(url, params=params)
+        assert response.status == 200
+        expected = await response.json()
+
+        with patch("homeassistant.components.history.STREAM_CHUNK_SIZE", 2):
+            response = await client.get(url, params={**params, "stream": ""})
+            assert response.status == 200
+            assert response.content_type == "application/json"
+            assert await response.json() == expected
+
+        orders.append([states[0]["entity_id"] for states in expected])
+
+    assert orders == [
+        ["binary_sensor.before", "light.kitchen", "sensor.temp", "switch.unchanged"],
+        ["binary_sensor.before", "light.kitchen", "sensor.temp", "switch.unchanged"],
+        ["sensor.temp", "binary_sensor.before", "light.kitchen"],
+    ]
+    assert [len(states) for states in expected] == [2, 1, 3]
+
+
+async def test_fetch_period_api_stream_include_order(hass, hass_client):
+    """Test streaming the fetch period view keeps the include order."""
+    await hass.async_add_executor_job(init_recorder_component, hass)
+    await async_setup_component(
+        hass,
+        "history",
+        {
+            "history": {
+                "use_include_order": True,
+                "include": {
+                    "entities": ["switch.b", "light.kitchen"],
+                    "domains": ["switch", "sensor"],
+                },
+            }
+        },
+    )
+    await hass.async_add_executor_job(hass.data[recorder.DATA_INSTANCE].block_till_done)
+    await _async_record_states(hass, [("sensor.before", "1")])
+    start = dt_util.utcnow()
+    await _async_record_states(
+        hass,
+        [
+            ("switch.a", "on"),
+            ("light.kitchen", "on"),
+            ("switch.b", "on"),
+            ("light.other", "on"),
+        ],
+    )
+
+    client = await hass_client()
+    url = f"/api/history/period/{start.isoformat()}"
+    orders = []
+    for params in ({}, {"filter_entity_id": "switch.a,light.kitchen"}):
+        response = await client.get(url, params=params)
+        expected = await response.json()
+        response = await client.get(url, params={**params, "stream": ""})
+        assert await response.json() == expected
+        orders.append([states[0]["entity_id"] for states in expected])
+
+    assert orders == [
+        ["switch.b", "light.kitchen", "sensor.before", "switch.a"],
+        ["light.kitchen", "switch.a"],
+    ]
+
+
+async def test_fetch_period_api_stream_error(hass, hass_client):
+    """Test the connection is closed when streaming fails."""
+    await hass.async_add_executor_job(init_recorder_component, hass)
+    await async_setup_component(hass, "history", {})
+    await hass.async_add_executor_job(hass.data[recorder.DATA_INSTANCE].block_till_done)
+    start = dt_util.utcnow()
+    await _async_record_states(hass, [("light.kitchen", "on")])
+
+    client = await hass_client()
+    with patch("homeassistant.components.history.STREAM_CHUNK_SIZE", 1), patch(
+        "homeassistant.components.history._entity_states_to_json",
+        side_effect=ValueError,
+    ):
+        response = await client.get(
+            f"/api/history/period/{start.isoformat()}", params={"stream": ""}
+        )
+        assert response.status == 200
+        with pytest.raises(ClientPayloadError):
+            await response.read()
+
+
+async def test_history_stream(hass, hass_ws_client):
+    """Test the history stream sends the history and then live states."""
+    await hass.async_add_executor_job(init_recorder_component, hass)
+    await async_setup_component(hass, "history", {})
+    await hass.async_add_executor_job(hass.data[recorder.DATA_INSTANCE].block_till_done)
+    start = dt_util.utcnow()
+
+    hass.states.async_set("light.kitchen", "on")
+    hass.states.async_set("sensor.temp", "1")
+    hass.states.async_set("light.kitchen", "off")
+    hass.states.async_set("light.other", "on")
+    await hass.async_block_till_done()
+
+    client = await hass_ws_client(hass)
+    await client.send_json(
+        {
+            "id": 5,
+            "type": "history/stream",
+            "start_time": start.isoformat(),
+            "entity_ids": ["light.kitchen", "sensor.temp"],
+            "minimal_response": True,
+        }
+    )
+    msg = await client.receive_json()
+    assert msg["success"]
+
+    # States that had not been committed yet are in the history
+    msg = await client.receive_json()
+    assert msg["type"] == "event"
+    states = msg["event"]["states"]
+    assert [state["state"] for state in states["light.kitchen"]] == ["on", "off"]
+    assert [state["state"] for state in states["sensor.temp"]] == ["1"]
+
+    hass.states.async_set("light.kitchen", "off", {"brightness": 10})
+    hass.states.async_set("light.other", "off")
+    hass.states.async_set("sensor.temp", "2")
+    hass.states.async_set("light.kitchen", "on")
+    await hass.async_block_till_done()
+
+    msg = await client.receive_json()
+    assert msg["id"] == 5
+    assert list(msg["event"]["states"]) == ["sensor.temp"]
+
+    # Attribute changes are not sent with a minimal response
+    msg = await client.receive_json()
+    assert msg["event"]["states"] == {
+        "light.kitchen": [
+            {
+                "state": "on",
+                "last_changed": hass.states.get(
+                    "light.kitchen"
+                ).last_changed.isoformat(),
+            }
+        ]
+    }
+
+    await client.send_json({"id": 6, "type": "unsubscribe_events", "subscription": 5})
+    msg = await client.receive_json()
+    assert msg["id"] == 6
+    assert msg["success"]
+
+
+async def test_history_stream_invalid_time(hass, hass_ws_client):
+    """Test the history stream with an invalid start time."""
+    await hass.async_add_executor_job(init_recorder_component, hass)
+    await async_setup_component(hass, "history", {})
+
+    client = await hass_ws_client(hass)
+    await client.send_json(
+        {
+            "id": 1,
+            "type": "history/stream",
+            "start_time": "invalid",
+            "entity_ids": ["light.kitchen"],
+        }
+    )
+    msg = await client.receive_json()
+    assert not msg["success"]
+    assert msg["error"]["code"] == "invalid_start_time"
@@ -0,0 +1,118 @@
+"""The tests for the InfluxDB backlog."""
+import os
+
+from homeassistant.components.influxdb import backlog
+from homeassistant.components.influxdb.const import (
+    MAX_BATCH_SIZE,
+    MIN_BATCH_SIZE,
+    TARGET_WRITE_TIME,
+)
+
+from tests.async_mock import patch
+
+
+def _points(start, count):
+    """Return points with increasing values."""
+    return [
+        {"measurement": "test", "fields": {"value": value}}
+        for value in range(start, start + count)
+    ]
+
+
+def test_segment_log_peek_and_ack(tmp_path):
+    """Test batches are read in order and dropped once written."""
+    log = backlog.SegmentLog(str(tmp_path))
+    assert not log.pending
+    assert log.peek(10, 2) == ([], None)
+
+    for start in range(0, 30, 5):
+        log.append(_points(start, 5))
+    assert log.pending
+
+    batches, position = log.peek(10, 2)
+    assert batches == [_points(0, 10), _points(10, 10)]
+
+    # Peeking again returns the same points until they are acked
+    assert log.peek(10, 2)[0] == batches
+
+    log.ack(position)
+    batches, position = log.peek(10, 2)
+    assert batches == [_points(20, 10)]
+
+    log.ack(position)
+    assert not log.pending
+    assert os.listdir(tmp_path) == []
+
+
+def test_segment_log_reopen(tmp_path):
+    """Test the points that were not written are kept over a restart."""
+    with patch.object(backlog, "SEGMENT_SIZE", 64):
+        log = backlog.SegmentLog(str(tmp_path))
+        for start in range(0, 4):
+            log.append(_points(start, 1))
+        batches, position = log.peek(1, 2)
+        log.ack(position)
+        assert len(os.listdir(tmp_path)) == 2
+        log.close()
+
+        log = backlog.SegmentLog(str(tmp_path))
+        assert log.pending
+        assert log.peek(10, 1)[0] == [_points(2, 2)]
+
+        # Each record fills a segment, new ones continue the sequence
+        log.append(_points(4, 1))
+        assert log.peek(10, 1)[0] == [_points(2, 3)]
+        log.close()
+
+    assert sorted(os.listdir(tmp_path)) == [
+        "000000000002.seg",
+        "000000000003.seg",
+        "000000000004.seg",
+    ]
+
+
+def test_segment_log_max_size(tmp_path, caplog):
+    """Test the oldest segments are dropped once the log is too large."""
+    with patch.object(backlog, "SEGMENT_SIZE", 64):
+        log = backlog.SegmentLog(str(tmp_path), max_size=128)
+        for start in range(0, 2):
+            log.append(_points(start, 1))
+        _, position = log.peek(1, 1)
+
+        # Each record fills a segment, only the two newest are kept
+        for start in range(2, 4):
+            log.append(_points(start, 1))
+        assert sorted(os.listdir(tmp_path)) == [
+            "000000000002.seg",
+            "000000000003.seg",
+        ]
+        assert "dropped its oldest events in 000000000000.seg" in caplog.text
+        assert "dropped its oldest events in 000000000001.seg" in caplog.text
+
+        # Acknowledging batches of a dropped segment keeps the newer ones
+        log.ack(position)
+        assert log.peek(10, 1)[0] == [_points(2, 2)]
+        log.close()
+
+
+def test_batch_size():
+    """Test the batch size follows the write latency."""
+    batch_size = backlog.BatchSize(100)
+
+    # Batches that are not full do not grow the size
+    batch_size.add_write(50, 0)
+    assert batch_size.size == 100
+
+    batch_size.add_write(100, 0)
+    assert batch_size.size == 200
+
+    batch_size.add_write(200, TARGET_WRITE_TIME * 2)
+    assert batch_size.size == 100
+
+    for _ in range(20):
+        batch_size.add_write(batch_size.size, TARGET_WRITE_TIME * 2)
+    assert batch_size.size == MIN_BATCH_SIZE
+
+    for _ in range(20):
+        batch_size.add_write(batch_size.size, 0)
+    assert batch_size.size == MAX_BATCH_SIZE
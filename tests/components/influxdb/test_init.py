@@ -1,11 +1,15 @@
 """The tests for the InfluxDB component."""
 from dataclasses import dataclass
 import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import os
+import threading
+import time
 
 import pytest
 
 import homeassistant.components.influxdb as influxdb
-from homeassistant.components.influxdb.const import DEFAULT_BUCKET
+from homeassistant.components.influxdb.const import BACKLOG_DIRECTORY, DEFAULT_BUCKET
 from homeassistant.const import (
     EVENT_STATE_CHANGED,
     PERCENTAGE,
@@ -46,6 +50,12 @@ def mock_batch_timeout(hass, monkeypatch):
     )
 
 
+@pytest.fixture(autouse=True)
+def mock_config_dir(hass, tmp_path):
+    """Keep the backlog out of the testing config directory."""
+    hass.config.config_dir = str(tmp_path)
+
+
 @pytest.fixture(name="mock_client")
 def mock_client_fixture(request):
     """Patch the InfluxDBClient object with mock for version under test."""
@@ -86,6 +96,33 @@ def _get_write_api_mock_v2(mock_influx_client):
     return mock_influx_client.return_value.write_api.return_value.write
 
 
+class _InfluxStandIn(BaseHTTPRequestHandler):
+    """Accept writes like InfluxDB while the server is available."""
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Handle a write."""
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.server.available:
+            self.server.lines.extend(line for line in body.decode().split("\n") if line)
+            self.send_response(204)
+        else:
+            self.send_response(503)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        """Do not log the requests."""
+
+
+def _wait_for_backlog(instance):
+    """Block till the backlog has been written."""
+    for _ in range(500):
+        if not instance.backlog.pending:
+            return
+        time.sleep(0.01)
+    assert not instance.backlog.pending
+
+
 @pytest.mark.parametrize(
     "mock_client, config_ext, get_write_api",
     [
@@ -1309,10 +1346,11 @@ async def test_event_listener_ignore_attributes_overlapping_entities(
 async def test_event_listener_scheduled_write(
     hass, mock_client, config_ext, get_write_api, get_mock_call
 ):
-    """Test the event listener retries after a write failure."""
+    """Test the event listener retries a failed write, then uses the backlog."""
     config = {"max_retries": 1}
     config.update(config_ext)
     handler_method = await _setup(hass, mock_client, config, get_write_api)
+    instance = hass.data[influxdb.DOMAIN]
 
     state = MagicMock(
         state=1,
@@ -1323,22 +1361,37 @@ async def test_event_listener_scheduled_write(
     )
     event = MagicMock(data={"new_state": state}, time_fired=12345)
     write_api = get_write_api(mock_client)
-    write_api.side_effect = IOError("foo")
-
-    # Write fails
-    with patch.object(influxdb.time, "sleep") as mock_sleep:
+    written = []
+    failing = True
+
+    def write(*args, **kwargs):
+        """Fail or record the written points."""
+        if failing:
+            raise IOError("foo")
+        written.extend(args[0] if args else kwargs["record"])
+
+    write_api.side_effect = write
+
+    # Write fails, the event goes to the backlog after retrying
+    with patch.object(influxdb, "RETRY_DELAY", 0.01):
+        with patch.object(influxdb.time, "sleep") as mock_sleep:
+            handler_method(event)
+            instance.block_till_done()
+            assert mock_sleep.called
+        assert write_api.call_count >= 2
+        assert instance.backlog.pending
+
+        # While the backlog is written, new events are added to it
         handler_method(event)
-        hass.data[influxdb.DOMAIN].block_till_done()
-        assert mock_sleep.called
-    assert write_api.call_count == 2
+        instance.block_till_done()
+        assert written == []
 
-    # Write works again
-    write_api.side_effect = None
-    with patch.object(influxdb.time, "sleep") as mock_sleep:
-        handler_method(event)
-        hass.data[influxdb.DOMAIN].block_till_done()
-        assert not mock_sleep.called
-    assert write_api.call_count == 3
+        # Write works again
+        failing = False
+        _wait_for_backlog(instance)
+
+    assert len(written) == 2
+    assert not os.listdir(hass.config.path(BACKLOG_DIRECTORY))
 
 
 @pytest.mark.parametrize(
@@ -1362,7 +1415,7 @@ async def test_event_listener_scheduled_write(
 async def test_event_listener_backlog_full(
     hass, mock_client, config_ext, get_write_api, get_mock_call
 ):
-    """Test the event listener drops old events when backlog gets full."""
+    """Test the event listener moves old events to the backlog."""
     handler_method = await _setup(hass, mock_client, config_ext, get_write_api)
 
     state = MagicMock(
@@ -1385,8 +1438,10 @@ async def test_event_listener_backlog_full(
     with patch("homeassistant.components.influxdb.time.monotonic", new=fast_monotonic):
         handler_method(event)
         hass.data[influxdb.DOMAIN].block_till_done()
+        _wait_for_backlog(hass.data[influxdb.DOMAIN])
 
-        assert get_write_api(mock_client).call_count == 0
+    # Old events are written from the backlog
+    assert get_write_api(mock_client).call_count == 1
 
 
 @pytest.mark.parametrize(
@@ -1657,3 +1712,99 @@ async def test_precision(
     assert write_api.call_count == 1
     assert write_api.call_args == get_mock_call(body, precision)
     write_api.reset_mock()
+
+
+@pytest.fixture(name="influx_server")
+def influx_server_fixture():
+    """Run a stand-in for the InfluxDB server."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _InfluxStandIn)
+    server.available = True
+    server.lines = []
+    server_thread = threading.Thread(target=server.serve_forever)
+    server_thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    server_thread.join()
+
+
+async def _async_setup_influx_server(hass, server):
+    """Set up influxdb writing to the stand-in server."""
+    config = {
+        "influxdb": {
+            "host": "127.0.0.1",
+            "port": server.server_address[1],
+            "max_retries": 0,
+        }
+    }
+    assert await async_setup_component(hass, influxdb.DOMAIN, config)
+    await hass.async_block_till_done()
+    return hass.data[influxdb.DOMAIN]
+
+
+def _write_to_backlog(hass, instance, server):
+    """Write events while the server is unavailable."""
+    handler_method = hass.bus.listen.call_args_list[0][0][1]
+    server.available = False
+    for index in range(3):
+        state = MagicMock(
+            state=index,
+            domain="fake",
+            entity_id=f"fake.entity{index}",
+            object_id=f"entity{index}",
+            attributes={},
+        )
+        handler_method(MagicMock(data={"new_state": state}, time_fired=12345 + index))
+    instance.block_till_done()
+    assert instance.backlog.pending
+    assert server.lines == []
+
+
+EXPECTED_LINES = [
+    f"fake.entity{index},domain=fake,entity_id=entity{index} "
+    f"value={index}.0 {12345 + index}"
+    for index in range(3)
+]
+
+
+async def test_backlog_replayed_to_server(hass, influx_server):
+    """Test events written to the backlog while InfluxDB is down reach it later."""
+    with patch.object(influxdb, "RETRY_DELAY", 0.01):
+        instance = await _async_setup_influx_server(hass, influx_server)
+        _write_to_backlog(hass, instance, influx_server)
+        influx_server.available = True
+        _wait_for_backlog(instance)
+
+    assert sorted(influx_server.lines) == EXPECTED_LINES
+
+
+async def test_backlog_replay_survives_errors(hass, influx_server, caplog):
+    """Test the backlog is still replayed after unexpected errors."""
+    with patch.object(influxdb, "RETRY_DELAY", 0.01):
+        instance = await _async_setup_influx_server(hass, influx_server)
+        peek = instance.backlog.peek
+        write = instance.influx.write
+        failures = [RuntimeError("peek failed"), RuntimeError("write failed")]
+
+        def failing_peek(*args):
+            if len(failures) == 2:
+                raise failures.pop(0)
+            return peek(*args)
+
+        def failing_write(json):
+            # Only fail the writes of the replay, after peeking failed
+            if len(failures) == 1:
+                raise failures.pop(0)
+            return write(json)
+
+        with patch.object(instance.backlog, "peek", failing_peek), patch.object(
+            instance.influx, "write", failing_write
+        ):
+            _write_to_backlog(hass, instance, influx_server)
+            influx_server.available = True
+            _wait_for_backlog(instance)
+
+    assert failures == []
+    assert "peek failed" in caplog.text
+    assert "write failed" in caplog.text
+    assert sorted(influx_server.lines) == EXPECTED_LINES
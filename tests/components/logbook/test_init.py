@@ -1693,3 +1693,207 @@ class MockLazyEventPartialState(ha.Event):
     def time_fired_isoformat(self):
         """Time event was fired in utc isoformat."""
         return process_timestamp_to_utc_isoformat(self.time_fired)
+
+
+async def test_logbook_view_pagination(hass, hass_client):
+    """Test paging through the logbook with a continuation token."""
+    await hass.async_add_executor_job(init_recorder_component, hass)
+    await async_setup_component(hass, "logbook", {})
+    await hass.async_add_executor_job(hass.data[recorder.DATA_INSTANCE].block_till_done)
+
+    start = dt_util.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(
+        hours=2
+    )
+    context = ha.Context(id="ac5bd62de45711eaaeb351041eec8dd9")
+
+    def at_minute(minute):
+        return patch(
+            "homeassistant.util.dt.utcnow",
+            return_value=start + timedelta(minutes=minute),
+        )
+
+    with at_minute(1):
+        hass.bus.async_fire(
+            EVENT_CALL_SERVICE,
+            {ATTR_DOMAIN: "switch", ATTR_SERVICE: "turn_on"},
+            context=context,
+        )
+        hass.states.async_set("switch.test", STATE_OFF)
+    with at_minute(2):
+        hass.states.async_set("switch.other", STATE_OFF)
+    for minute, state in ((3, STATE_ON), (16, STATE_OFF), (17, STATE_ON)):
+        with at_minute(minute):
+            hass.states.async_set("switch.other", state)
+    with at_minute(31):
+        hass.states.async_set("switch.test", STATE_ON, context=context)
+    await hass.async_block_till_done()
+    await hass.async_add_executor_job(trigger_db_commit, hass)
+    await hass.async_block_till_done()
+    await hass.async_add_executor_job(hass.data[recorder.DATA_INSTANCE].block_till_done)
+
+    client = await hass_client()
+    url = f"/api/logbook/{start.isoformat()}"
+    end_time = (start + timedelta(hours=1)).isoformat()
+
+    page_sizes = []
+    for entity in (None, "switch.test"):
+        params = {"end_time": end_time}
+        if entity:
+            params["entity"] = entity
+        response = await client.get(url, params=params)
+        assert response.status == 200
+        expected = await response.json()
+
+        pages = []
+        params["limit"] = "1"
+        while True:
+            response = await client.get(url, params=params)
+            assert response.status == 200
+            page = await response.json()
+            pages.append(page["entries"])
+            if page["continuation_token"] is None:
+                break
+            params["continuation_token"] = page["continuation_token"]
+
+        assert [entry for page in pages for entry in page] == expected
+        assert expected[-1]["entity_id"] == "switch.test"
+        assert expected[-1]["context_domain"] == "switch"
+        assert expected[-1]["context_service"] == "turn_on"
+        page_sizes.append([len(page) for page in pages])
+
+    # The events in the same GROUP_BY_MINUTES window are on the same page
+    assert page_sizes == [[1, 2, 1], [1]]
+
+    response = await client.get(url, params={"limit": "0"})
+    assert response.status == 400
+    response = await client.get(url, params={"continuation_token": "invalid"})
+    assert response.status == 400
+
+
+async def test_logbook_view_lookup_own_context(hass, hass_client):
+    """Test events that started their own context are not their own context."""
+    await hass.async_add_executor_job(init_recorder_component, hass)
+    await async_setup_component(hass, "logbook", {})
+    await hass.async_add_executor_job(hass.data[recorder.DATA_INSTANCE].block_till_done)
+
+    start = dt_util.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(
+        hours=2
+    )
+
+    def at_minute(minute):
+        return patch(
+            "homeassistant.util.dt.utcnow",
+            return_value=start + timedelta(minutes=minute),
+        )
+
+    with at_minute(1):
+        hass.states.async_set("switch.test", STATE_OFF)
+    with at_minute(16):
+        hass.states.async_set("switch.test", STATE_ON)
+    with at_minute(31):
+        hass.bus.async_fire(
+            logbook.EVENT_LOGBOOK_ENTRY,
+            {
+                logbook.ATTR_NAME: "Switch",
+                logbook.ATTR_MESSAGE: "was checked",
+                logbook.ATTR_ENTITY_ID: "switch.test",
+            },
+        )
+    await hass.async_block_till_done()
+    await hass.async_add_executor_job(trigger_db_commit, hass)
+    await hass.async_block_till_done()
+    await hass.async_add_executor_job(hass.data[recorder.DATA_INSTANCE].block_till_done)
+
+    client = await hass_client()
+    url = f"/api/logbook/{start.isoformat()}"
+    params = {"end_time": (start + timedelta(hours=1)).isoformat()}
+
+    response = await client.get(url, params=params)
+    expected = await response.json()
+    assert len(expected) == 2
+    assert not any("context_event_type" in entry for entry in expected)
+
+    response = await client.get(url, params={**params, "entity": "switch.test"})
+    assert await response.json() == expected
+
+    entries = []
+    params["limit"] = "1"
+    while True:
+        response = await client.get(url, params=params)
+        page = await response.json()
+        entries.extend(page["entries"])
+        if page["continuation_token"] is None:
+            break
+        params["continuation_token"] = page["continuation_token"]
+    assert entries == expected
+
+
+async def test_logbook_event_stream(hass, hass_ws_client):
+    """Test the logbook event stream sends history and then live entries."""
+    await hass.async_add_executor_job(init_recorder_component, hass)
+    await async_setup_component(hass, "logbook", {})
+    await hass.async_add_executor_job(hass.data[recorder.DATA_INSTANCE].block_till_done)
+    start = dt_util.utcnow()
+
+    hass.states.async_set("switch.test", STATE_OFF)
+    hass.states.async_set("switch.test", STATE_ON)
+    hass.states.async_set("switch.other", STATE_OFF)
+    await hass.async_block_till_done()
+
+    client = await hass_ws_client(hass)
+    await client.send_json(
+        {
+            "id": 7,
+            "type": "logbook/event_stream",
+            "start_time": start.isoformat(),
+            "entity_ids": ["switch.test"],
+        }
+    )
+    msg = await client.receive_json()
+    assert msg["success"]
+
+    # Events that had not been committed yet are in the history
+    msg = await client.receive_json()
+    assert msg["type"] == "event"
+    assert [
+        (entry["entity_id"], entry["state"]) for entry in msg["event"]["events"]
+    ] == [("switch.test", STATE_ON)]
+
+    context = ha.Context(id="ac5bd62de45711eaaeb351041eec8dd9")
+    hass.bus.async_fire(
+        EVENT_CALL_SERVICE,
+        {ATTR_DOMAIN: "switch", ATTR_SERVICE: "turn_off"},
+        context=context,
+    )
+    hass.states.async_set("switch.other", STATE_ON, context=context)
+    hass.states.async_set("switch.test", STATE_ON, {"changed": True}, context=context)
+    hass.states.async_set("switch.test", STATE_OFF, context=context)
+    await hass.async_block_till_done()
+
+    msg = await client.receive_json()
+    assert msg["id"] == 7
+    entries = msg["event"]["events"]
+    assert len(entries) == 1
+    assert entries[0]["entity_id"] == "switch.test"
+    assert entries[0]["state"] == STATE_OFF
+    assert entries[0]["context_domain"] == "switch"
+    assert entries[0]["context_service"] == "turn_off"
+
+    await client.send_json({"id": 8, "type": "unsubscribe_events", "subscription": 7})
+    msg = await client.receive_json()
+    assert msg["id"] == 8
+    assert msg["success"]
+
+
+async def test_logbook_event_stream_invalid_time(hass, hass_ws_client):
+    """Test the logbook event stream with an invalid start time."""
+    await hass.async_add_executor_job(init_recorder_component, hass)
+    await async_setup_component(hass, "logbook", {})
+
+    client = await hass_ws_client(hass)
+    await client.send_json(
+        {"id": 1, "type": "logbook/event_stream", "start_time": "invalid"}
+    )
+    msg = await client.receive_json()
+    assert not msg["success"]
+    assert msg["error"]["code"] == "invalid_start_time"
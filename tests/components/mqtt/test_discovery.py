@@ -12,6 +12,7 @@ from homeassistant.components.mqtt.abbreviations import (
 )
 from homeassistant.components.mqtt.discovery import ALREADY_DISCOVERED, async_start
 from homeassistant.const import STATE_OFF, STATE_ON
+from homeassistant.helpers.entity_platform import EntityPlatform
 
 from tests.async_mock import AsyncMock, patch
 from tests.common import (
@@ -206,7 +207,70 @@ async def test_non_duplicate_discovery(hass, mqtt_mock, caplog):
     assert state is not None
     assert state.name == "Beer"
     assert state_duplicate is None
+    assert "Ignoring unchanged discovery payload for binary_sensor bla" in caplog.text
+    assert "Component has already been discovered: binary_sensor bla" not in caplog.text
+
+
+async def test_changed_payload_sends_update(hass, mqtt_mock, caplog):
+    """Test only a changed payload of a discovered component is dispatched."""
+    async_fire_mqtt_message(
+        hass,
+        "homeassistant/binary_sensor/bla/config",
+        '{ "name": "Beer", "state_topic": "test-topic" }',
+    )
+    await hass.async_block_till_done()
+
+    async_fire_mqtt_message(
+        hass,
+        "homeassistant/binary_sensor/bla/config",
+        '{ "name": "Milk", "state_topic": "test-topic" }',
+    )
+    await hass.async_block_till_done()
+
     assert "Component has already been discovered: binary_sensor bla" in caplog.text
+    state = hass.states.get("binary_sensor.beer")
+    assert state is not None
+    assert state.name == "Milk"
+
+
+async def test_undelivered_update_is_not_remembered(hass, mqtt_mock, caplog):
+    """Test a resent payload is dispatched if the update reached no listener."""
+    hass.data[ALREADY_DISCOVERED] = {("binary_sensor", "bla"): None}
+
+    for _ in range(2):
+        async_fire_mqtt_message(
+            hass,
+            "homeassistant/binary_sensor/bla/config",
+            '{ "name": "Beer", "state_topic": "test-topic" }',
+        )
+        await hass.async_block_till_done()
+
+    assert "Ignoring unchanged discovery payload" not in caplog.text
+    assert (
+        caplog.text.count("Component has already been discovered: binary_sensor bla")
+        == 2
+    )
+
+
+async def test_entities_discovered_together_added_at_once(hass, mqtt_mock):
+    """Test the entities discovered together are added with one call."""
+    schedule_add_entities = EntityPlatform._async_schedule_add_entities
+    with patch.object(
+        EntityPlatform,
+        "_async_schedule_add_entities",
+        autospec=True,
+        side_effect=schedule_add_entities,
+    ) as mock_add_entities:
+        for index in range(10):
+            async_fire_mqtt_message(
+                hass,
+                f"homeassistant/sensor/bla{index}/config",
+                f'{{ "name": "Beer {index}", "state_topic": "test-topic" }}',
+            )
+        await hass.async_block_till_done()
+
+    assert mock_add_entities.call_count == 1
+    assert len(hass.states.async_entity_ids("sensor")) == 10
 
 
 async def test_removal(hass, mqtt_mock, caplog):
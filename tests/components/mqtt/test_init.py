@@ -9,6 +9,7 @@ import voluptuous as vol
 
 from homeassistant.components import mqtt, websocket_api
 from homeassistant.components.mqtt import debug_info
+from homeassistant.components.mqtt.models import Message
 from homeassistant.const import (
     ATTR_DOMAIN,
     ATTR_SERVICE,
@@ -532,6 +533,36 @@ async def test_subscribe_topic_sys_root(hass, mqtt_mock, calls, record_calls):
     assert calls[0][0].payload == "test-payload"
 
 
+async def test_messages_handed_to_loop_in_batches(hass, mqtt_mock, calls, record_calls):
+    """Test messages from the paho thread are batched and coalesced."""
+    await mqtt.async_subscribe(hass, "test-topic/+", record_calls)
+    client = mqtt_mock()
+
+    with patch.object(hass.loop, "call_soon_threadsafe") as mock_call_soon:
+        for payload in (b"first", b"second", b"third"):
+            mqtt_mock._mqtt_on_message(
+                None, None, Message("test-topic/retained", payload, 0, True)
+            )
+        mqtt_mock._mqtt_on_message(
+            None, None, Message("test-topic/live", b"live", 0, False)
+        )
+        with patch("homeassistant.components.mqtt.MAX_PENDING_MESSAGES", 2):
+            mqtt_mock._mqtt_on_message(
+                None, None, Message("test-topic/dropped", b"dropped", 0, False)
+            )
+
+    assert len(mock_call_soon.mock_calls) == 1
+    assert client.coalesced_messages == 2
+    assert client.dropped_messages == 1
+
+    client._async_drain_messages()
+    await hass.async_block_till_done()
+    assert [(call[0].topic, call[0].payload) for call in calls] == [
+        ("test-topic/retained", "third"),
+        ("test-topic/live", "live"),
+    ]
+
+
 async def test_subscribe_topic_sys_root_and_wildcard_topic(
     hass, mqtt_mock, calls, record_calls
 ):
@@ -0,0 +1,41 @@
+"""The tests for the MQTT topic trie."""
+import pytest
+
+from homeassistant.components.mqtt.trie import TopicTrie
+
+
+def test_match_wildcards():
+    """Test topics match the filters with wildcards."""
+    trie = TopicTrie()
+    for topic_filter in ("a/b/c", "a/+/c", "a/#", "#", "+/b/+", "$SYS/#", "a/b"):
+        trie.add(topic_filter, topic_filter)
+
+    assert sorted(trie.match("a/b/c")) == ["#", "+/b/+", "a/#", "a/+/c", "a/b/c"]
+    assert sorted(trie.match("a")) == ["#", "a/#"]
+    assert sorted(trie.match("a/b")) == ["#", "a/#", "a/b"]
+    assert trie.match("$SYS/broker") == ["$SYS/#"]
+    assert trie.match("b/c") == ["#"]
+
+
+def test_remove():
+    """Test removing values prunes the levels that are no longer used."""
+    trie = TopicTrie()
+    first = object()
+    second = object()
+    trie.add("a/+/c", first)
+    trie.add("a/+/c", second)
+
+    trie.remove("a/+/c", first)
+    assert trie.has_filter("a/+/c")
+    assert trie.match("a/b/c") == [second]
+
+    with pytest.raises(KeyError):
+        trie.remove("a/+/c", first)
+
+    trie.remove("a/+/c", second)
+    assert not trie.has_filter("a/+/c")
+    assert trie.match("a/b/c") == []
+    assert trie._root.children == {}
+
+    with pytest.raises(KeyError):
+        trie.remove("a/b", first)
@@ -10,10 +10,14 @@ from homeassistant.components.profiler import (
     SERVICE_DUMP_LOG_OBJECTS,
     SERVICE_MEMORY,
     SERVICE_START,
+    SERVICE_START_LISTENER_PROFILE,
     SERVICE_START_LOG_OBJECTS,
+    SERVICE_STOP_LISTENER_PROFILE,
     SERVICE_STOP_LOG_OBJECTS,
 )
 from homeassistant.components.profiler.const import DOMAIN
+from homeassistant.const import STATE_UNAVAILABLE
+from homeassistant.core import callback
 import homeassistant.util.dt as dt_util
 
 from tests.async_mock import patch
@@ -147,3 +151,86 @@ async def test_dump_log_object(hass, caplog):
 
     assert await hass.config_entries.async_unload(entry.entry_id)
     await hass.async_block_till_done()
+
+
+async def test_listener_profiling(hass, hass_ws_client):
+    """Test the listeners of the event bus are timed while profiling runs."""
+    await setup.async_setup_component(hass, "persistent_notification", {})
+    entry = MockConfigEntry(domain=DOMAIN)
+    entry.add_to_hass(hass)
+
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    assert hass.services.has_service(DOMAIN, SERVICE_START_LISTENER_PROFILE)
+    assert hass.states.get("sensor.profiler_busiest_listener").state == (
+        STATE_UNAVAILABLE
+    )
+
+    client = await hass_ws_client(hass)
+    await client.send_json({"id": 1, "type": "profiler/listener_stats"})
+    msg = await client.receive_json()
+    assert not msg["success"]
+    assert msg["error"]["code"] == "not_found"
+
+    calls = []
+
+    @callback
+    def _fast_listener(event):
+        calls.append(event)
+
+    async def _slow_listener(event):
+        calls.append(event)
+
+    hass.bus.async_listen("test_event", _fast_listener)
+    hass.bus.async_listen("test_event", _slow_listener)
+
+    await hass.services.async_call(DOMAIN, SERVICE_START_LISTENER_PROFILE, {})
+    await hass.async_block_till_done()
+
+    hass.bus.async_fire("test_event")
+    hass.bus.async_fire("test_event")
+    hass.bus.async_fire("unheard_event")
+    await hass.async_block_till_done()
+    assert len(calls) == 4
+
+    await client.send_json({"id": 2, "type": "profiler/listener_stats"})
+    msg = await client.receive_json()
+    assert msg["success"]
+    result = msg["result"]
+    assert result["outstanding_jobs"] == 0
+    listeners = {stats["listener"]: stats for stats in result["listeners"]}
+    fast = listeners[f"{__name__}.test_listener_profiling.<locals>._fast_listener"]
+    assert fast["calls"] == 2
+    assert fast["integration"] == "tests"
+    event_types = {stats["event_type"]: stats for stats in result["event_types"]}
+    assert event_types["test_event"]["events"] == 2
+    assert event_types["test_event"]["fan_out"] == 2
+    assert event_types["unheard_event"]["listener_jobs"] == 0
+    assert result["timer_wheel"]["pending"] >= 0
+    assert set(result["timer_wheel"]) == {
+        "pending",
+        "scheduled",
+        "fired",
+        "late",
+        "cancelled",
+    }
+
+    await hass.helpers.entity_component.async_update_entity(
+        "sensor.profiler_outstanding_listener_jobs"
+    )
+    assert hass.states.get("sensor.profiler_outstanding_listener_jobs").state == "0"
+
+    await hass.services.async_call(DOMAIN, SERVICE_STOP_LISTENER_PROFILE, {})
+    await hass.async_block_till_done()
+
+    hass.bus.async_fire("test_event")
+    await hass.async_block_till_done()
+    assert len(calls) == 6
+
+    await client.send_json({"id": 3, "type": "profiler/listener_stats"})
+    msg = await client.receive_json()
+    assert not msg["success"]
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
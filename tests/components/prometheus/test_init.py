@@ -1,6 +1,7 @@
 """The tests for the Prometheus exporter."""
 from dataclasses import dataclass
 import datetime
+import gzip
 
 import pytest
 
@@ -202,6 +203,42 @@ async def test_view(hass, hass_client):
     )
 
 
+async def test_view_cached_exposition(hass, hass_client):
+    """Test the exposition is cached, re-rendered once outdated and gzipped."""
+    client = await prometheus_client(hass, hass_client)
+    temperature = (
+        'temperature_c{domain="sensor",'
+        'entity="sensor.outside_temperature",'
+        'friendly_name="Outside Temperature"}'
+    )
+
+    resp = await client.get(
+        prometheus.API_ENDPOINT, headers={"Accept-Encoding": "gzip"}
+    )
+    assert resp.status == 200
+    assert resp.headers["content-encoding"] == "gzip"
+    assert f"{temperature} 15.6" in (await resp.text()).split("\n")
+
+    hass.states.async_set(
+        "sensor.outside_temperature",
+        "16.2",
+        hass.states.get("sensor.outside_temperature").attributes,
+    )
+    await hass.async_block_till_done()
+
+    resp = await client.get(prometheus.API_ENDPOINT)
+    assert f"{temperature} 15.6" in (await resp.text()).split("\n")
+
+    with mock.patch(f"{PROMETHEUS_PATH}.EXPOSITION_CACHE_TIME", 0):
+        resp = await client.get(
+            prometheus.API_ENDPOINT, headers={"Accept-Encoding": "identity"}
+        )
+    assert "content-encoding" not in resp.headers
+    body = (await resp.text()).split("\n")
+    assert f"{temperature} 16.2" in body
+    assert "# HELP python_info Python platform information" in body
+
+
 @pytest.fixture(name="mock_client")
 def mock_client_fixture():
     """Mock the prometheus client."""
@@ -365,3 +402,27 @@ async def test_filtered_denylist(hass, mock_client):
         was_called = mock_client.labels.call_count == 1
         assert test.should_pass == was_called
         mock_client.labels.reset_mock()
+
+
+async def test_view_gzip_on_request(hass, hass_client):
+    """Test the exposition is compressed once, only for scrapes asking for it."""
+    client = await prometheus_client(hass, hass_client)
+
+    with mock.patch(
+        f"{PROMETHEUS_PATH}.gzip.compress", wraps=gzip.compress
+    ) as mock_compress:
+        resp = await client.get(
+            prometheus.API_ENDPOINT, headers={"Accept-Encoding": "identity"}
+        )
+        assert "content-encoding" not in resp.headers
+        assert not mock_compress.called
+
+        for _ in range(2):
+            resp = await client.get(
+                prometheus.API_ENDPOINT, headers={"Accept-Encoding": "gzip"}
+            )
+            assert resp.headers["content-encoding"] == "gzip"
+            assert "# HELP python_info" in await resp.text()
+
+    assert mock_compress.call_count == 1
+    assert mock_compress.call_args[0][1] == prometheus.GZIP_COMPRESS_LEVEL
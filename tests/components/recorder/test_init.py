@@ -2,6 +2,7 @@
 # pylint: disable=protected-access
 from datetime import datetime, timedelta
 
+import pytest
 from sqlalchemy.exc import OperationalError
 
 from homeassistant.components.recorder import (
@@ -13,7 +14,13 @@ from homeassistant.components.recorder import (
     run_information_with_session,
 )
 from homeassistant.components.recorder.const import DATA_INSTANCE
-from homeassistant.components.recorder.models import Events, RecorderRuns, States
+from homeassistant.components.recorder.models import (
+    Events,
+    RecorderRuns,
+    StateAttributes,
+    States,
+    StateSnapshots,
+)
 from homeassistant.components.recorder.util import session_scope
 from homeassistant.const import MATCH_ALL, STATE_LOCKED, STATE_UNLOCKED
 from homeassistant.core import Context, callback
@@ -457,5 +464,188 @@ def test_run_information(hass_recorder):
     assert run_info.closed_incorrect is False
 
 
+@pytest.mark.parametrize("batch_insert", [False, True])
+def test_saving_state_deduplicates_attributes(hass_recorder, batch_insert):
+    """Test identical attributes are only stored once."""
+    hass = hass_recorder({"batch_insert": batch_insert})
+
+    hass.states.set("test.one", "on", {"shared": True})
+    hass.states.set("test.two", "on", {"shared": True})
+    hass.states.set("test.three", "on", {"shared": False})
+    wait_recording_done(hass)
+    # Force the state_attributes to be looked up in the database
+    hass.data[DATA_INSTANCE]._state_attributes_ids.clear()
+    hass.states.set("test.one", "off", {"shared": True})
+    wait_recording_done(hass)
+
+    with session_scope(hass=hass) as session:
+        states = list(session.query(States))
+        assert len(states) == 4
+        assert all(state.attributes is None for state in states)
+        assert states[0].attributes_id == states[1].attributes_id
+        assert states[0].attributes_id == states[3].attributes_id
+        assert states[0].attributes_id != states[2].attributes_id
+        assert states[3].to_native().attributes == {"shared": True}
+        assert states[2].to_native().attributes == {"shared": False}
+
+        assert session.query(StateAttributes).count() == 2
+
+
+@pytest.mark.parametrize("batch_insert", [False, True])
+def test_saving_state_snapshot(hass_recorder, batch_insert):
+    """Test the latest state of every entity is written at a checkpoint."""
+    hass = hass_recorder({"batch_insert": batch_insert})
+
+    hass.states.set("test.one", "on")
+    hass.states.set("test.two", "on")
+    hass.states.set("test.one", "off")
+    hass.states.remove("test.two")
+    wait_recording_done(hass)
+
+    with session_scope(hass=hass) as session:
+        assert session.query(StateSnapshots).count() == 0
+
+    with patch(
+        "homeassistant.components.recorder.dt_util.utcnow",
+        return_value=dt_util.utcnow() + timedelta(hours=2),
+    ):
+        wait_recording_done(hass)
+        # Nothing changed, so no new snapshot is written
+        hass.data[DATA_INSTANCE]._next_snapshot = dt_util.utcnow()
+        wait_recording_done(hass)
+
+    with session_scope(hass=hass) as session:
+        states = {
+            (state.entity_id, state.state): state.state_id
+            for state in session.query(States)
+        }
+        snapshots = {
+            snapshot.entity_id: snapshot.state_id
+            for snapshot in session.query(StateSnapshots)
+        }
+        assert session.query(StateSnapshots).count() == 2
+
+    assert snapshots == {
+        "test.one": states[("test.one", "off")],
+        "test.two": states[("test.two", None)],
+    }
+
+
+def test_batch_insert_saving_state_and_event(hass_recorder):
+    """Test saving states and events with batch inserts."""
+    hass = hass_recorder({"batch_insert": True})
+
+    hass.states.set("test.one", "on", {"test_attr": 5})
+    hass.bus.fire("EVENT_TEST", {"test_attr": 5})
+    hass.states.set("test.two", "on", {})
+    wait_recording_done(hass)
+
+    with session_scope(hass=hass) as session:
+        states = list(session.query(States))
+        assert len(states) == 2
+        assert states[0].to_native() == _state_empty_context(hass, "test.one")
+        assert states[0].event_id > 0
+        assert states[0].event.event_type == "state_changed"
+
+        db_events = list(session.query(Events).filter_by(event_type="EVENT_TEST"))
+        assert len(db_events) == 1
+        assert db_events[0].to_native().data == {"test_attr": 5}
+
+
+def test_batch_insert_keeps_queue_order(hass_recorder):
+    """Test batch inserts write the events in the order they were queued."""
+    hass = hass_recorder({"batch_insert": True})
+
+    hass.states.set("test.one", "on", {"test_attr": 1})
+    hass.bus.fire("EVENT_TEST")
+    hass.states.set("test.two", "on", {"test_attr": 2})
+    hass.states.set("test.one", "off", {"test_attr": 1})
+    wait_recording_done(hass)
+
+    with session_scope(hass=hass) as session:
+        db_events = list(
+            session.query(Events)
+            .filter(Events.event_type.in_(["state_changed", "EVENT_TEST"]))
+            .order_by(Events.event_id)
+        )
+        assert [event.event_type for event in db_events] == [
+            "state_changed",
+            "EVENT_TEST",
+            "state_changed",
+            "state_changed",
+        ]
+        states = list(session.query(States).order_by(States.state_id))
+        assert [state.event_id for state in states] == [
+            db_events[0].event_id,
+            db_events[2].event_id,
+            db_events[3].event_id,
+        ]
+        assert states[0].attributes_id == states[2].attributes_id
+        assert states[0].attributes_id != states[1].attributes_id
+        assert states[2].old_state_id == states[0].state_id
+
+
+def test_batch_insert_saving_sets_old_state(hass_recorder):
+    """Test batch inserts set old state within and across batches."""
+    hass = hass_recorder({"batch_insert": True})
+
+    hass.states.set("test.one", "on", {})
+    hass.states.set("test.one", "off", {})
+    wait_recording_done(hass)
+    hass.states.set("test.one", "on", {})
+    hass.states.async_remove("test.one")
+    wait_recording_done(hass)
+    hass.states.set("test.one", "off", {})
+    wait_recording_done(hass)
+
+    with session_scope(hass=hass) as session:
+        states = list(session.query(States))
+        assert len(states) == 5
+
+        assert states[0].old_state_id is None
+        assert states[1].old_state_id == states[0].state_id
+        assert states[2].old_state_id == states[1].state_id
+        assert states[3].old_state_id == states[2].state_id
+        assert states[3].state is None
+        assert states[4].old_state_id is None
+
+
+def test_block_till_committed(hass_recorder):
+    """Test waiting for the queued events to be committed."""
+    hass = hass_recorder()
+    instance = hass.data[DATA_INSTANCE]
+
+    hass.states.set("test.one", "on", {})
+    hass.block_till_done()
+    assert instance.block_till_committed()
+    with session_scope(hass=hass) as session:
+        assert session.query(States).count() == 1
+
+    # The stop item is taken before the commit task
+    instance.queue.put(None)
+    instance.join()
+    with patch("homeassistant.components.recorder.COMMIT_WAIT_INTERVAL", 0.01):
+        assert not instance.block_till_committed()
+
+
+def test_batch_insert_saving_state_with_serializable_data(hass_recorder, caplog):
+    """Test batch inserts skip data that cannot be serialized."""
+    hass = hass_recorder({"batch_insert": True})
+
+    hass.states.set("test.one", "on", {"fail": CannotSerializeMe()})
+    hass.bus.fire("EVENT_TEST", {"fail": CannotSerializeMe()})
+    hass.states.set("test.two", "on", {})
+    wait_recording_done(hass)
+
+    with session_scope(hass=hass) as session:
+        states = list(session.query(States))
+        assert len(states) == 1
+        assert states[0].entity_id == "test.two"
+        assert not list(session.query(Events).filter_by(event_type="EVENT_TEST"))
+
+    assert "State is not JSON serializable" in caplog.text
+    assert "Event is not JSON serializable" in caplog.text
+
+
 class CannotSerializeMe:
     """A class that the JSONEncoder cannot serialize."""
@@ -2,9 +2,17 @@
 from datetime import datetime, timedelta
 import json
 
+import pytest
+
 from homeassistant.components import recorder
 from homeassistant.components.recorder.const import DATA_INSTANCE
-from homeassistant.components.recorder.models import Events, RecorderRuns, States
+from homeassistant.components.recorder.models import (
+    Events,
+    RecorderRuns,
+    StateAttributes,
+    States,
+    StateSnapshots,
+)
 from homeassistant.components.recorder.purge import purge_old_data
 from homeassistant.components.recorder.util import session_scope
 from homeassistant.util import dt as dt_util
@@ -20,7 +28,9 @@ def test_purge_old_states(hass, hass_recorder):
     _add_test_states(hass)
 
     # make sure we start with 6 states
-    with session_scope(hass=hass) as session:
+    with session_scope(hass=hass) as session, patch(
+        "homeassistant.components.recorder.purge.MAX_ROWS_TO_PURGE", 2
+    ):
         states = session.query(States)
         assert states.count() == 6
 
@@ -43,7 +53,9 @@ def test_purge_old_events(hass, hass_recorder):
     hass = hass_recorder()
     _add_test_events(hass)
 
-    with session_scope(hass=hass) as session:
+    with session_scope(hass=hass) as session, patch(
+        "homeassistant.components.recorder.purge.MAX_ROWS_TO_PURGE", 2
+    ):
         events = session.query(Events).filter(Events.event_type.like("EVENT_TEST%"))
         assert events.count() == 6
 
@@ -62,6 +74,119 @@ def test_purge_old_events(hass, hass_recorder):
         assert events.count() == 2
 
 
+def test_purge_old_state_attributes(hass, hass_recorder):
+    """Test deleting state attributes no longer used by any state."""
+    hass = hass_recorder()
+    _add_test_states(hass)
+
+    with session_scope(hass=hass) as session:
+        kept = StateAttributes(shared_attrs='{"kept": true}')
+        purged = StateAttributes(shared_attrs='{"purged": true}')
+        session.add_all((kept, purged))
+        session.flush()
+        session.query(States).filter(
+            States.state.in_(["autopurgeme", "dontpurgeme"])
+        ).update({"attributes_id": kept.attributes_id}, synchronize_session=False)
+        session.query(States).filter(States.state == "purgeme").update(
+            {"attributes_id": purged.attributes_id}, synchronize_session=False
+        )
+
+    with session_scope(hass=hass) as session:
+        state_attributes = session.query(StateAttributes).filter(
+            StateAttributes.shared_attrs.in_(['{"kept": true}', '{"purged": true}'])
+        )
+        assert state_attributes.count() == 2
+
+        instance = hass.data[DATA_INSTANCE]
+        # pylint: disable=protected-access
+        instance._state_attributes_ids.update(
+            {row.shared_attrs: row.attributes_id for row in state_attributes}
+        )
+
+        while not purge_old_data(instance, 4, repack=False):
+            pass
+
+        assert [row.shared_attrs for row in state_attributes] == ['{"kept": true}']
+        assert '{"kept": true}' in instance._state_attributes_ids
+        assert '{"purged": true}' not in instance._state_attributes_ids
+
+
+def test_purge_disconnects_old_state(hass, hass_recorder):
+    """Test purging a state removes references to it from newer states."""
+    hass = hass_recorder()
+    _add_test_states(hass)
+
+    with session_scope(hass=hass) as session:
+        states = list(session.query(States).order_by(States.state_id))
+        for old_state, state in zip(states, states[1:]):
+            state.old_state_id = old_state.state_id
+
+    with session_scope(hass=hass) as session:
+        assert purge_old_data(hass.data[DATA_INSTANCE], 4, repack=False)
+
+        states = list(session.query(States).order_by(States.state_id))
+        assert [state.state for state in states] == ["dontpurgeme", "dontpurgeme"]
+        assert states[0].old_state_id is None
+        assert states[1].old_state_id == states[0].state_id
+
+
+@pytest.mark.parametrize("batch_insert", [False, True])
+def test_purge_latest_state_is_not_used_as_old_state(hass_recorder, batch_insert):
+    """Test the next state does not reference the purged latest state."""
+    hass = hass_recorder({"batch_insert": batch_insert})
+    hass.states.set("test.unchanged", "on")
+    wait_recording_done(hass)
+
+    eleven_days_ago = dt_util.utcnow() - timedelta(days=11)
+    with session_scope(hass=hass) as session:
+        session.query(States).filter(States.entity_id == "test.unchanged").update(
+            {"last_updated": eleven_days_ago}, synchronize_session=False
+        )
+
+    assert purge_old_data(hass.data[DATA_INSTANCE], 4, repack=False)
+
+    hass.states.set("test.unchanged", "off")
+    wait_recording_done(hass)
+
+    with session_scope(hass=hass) as session:
+        states = list(
+            session.query(States).filter(States.entity_id == "test.unchanged")
+        )
+        assert [state.state for state in states] == ["off"]
+        assert states[0].old_state_id is None
+
+
+def test_purge_old_state_snapshots(hass, hass_recorder):
+    """Test deleting old snapshots and snapshots of purged states."""
+    hass = hass_recorder()
+    _add_test_states(hass)
+    now = dt_util.utcnow()
+
+    with session_scope(hass=hass) as session:
+        for checkpoint in (now - timedelta(days=11), now):
+            session.add_all(
+                StateSnapshots(
+                    checkpoint=checkpoint,
+                    entity_id=state.state,
+                    state_id=state.state_id,
+                )
+                for state in session.query(States).filter(
+                    States.state.in_(["autopurgeme", "dontpurgeme"])
+                )
+            )
+
+    with session_scope(hass=hass) as session:
+        snapshots = session.query(StateSnapshots)
+        assert snapshots.count() == 8
+
+        assert purge_old_data(hass.data[DATA_INSTANCE], 4, repack=False)
+
+        assert [snapshot.entity_id for snapshot in snapshots] == [
+            "dontpurgeme",
+            "dontpurgeme",
+        ]
+
+
 def test_purge_method(hass, hass_recorder):
     """Test purge method."""
     hass = hass_recorder()
@@ -122,10 +247,7 @@ def test_purge_method(hass, hass_recorder):
             hass.block_till_done()
             hass.data[DATA_INSTANCE].block_till_done()
             wait_recording_done(hass)
-            assert (
-                mock_logger.debug.mock_calls[5][1][0]
-                == "Vacuuming SQL DB to free space"
-            )
+            mock_logger.debug.assert_any_call("Vacuuming SQL DB to free space")
 
 
 def _add_test_states(hass):
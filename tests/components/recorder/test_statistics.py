@@ -0,0 +1,207 @@
+"""The tests for the recorder statistics."""
+from datetime import datetime, timedelta
+
+from homeassistant.components.recorder.models import Statistics, StatisticsShortTerm
+from homeassistant.components.recorder.statistics import (
+    HOUR_PERIOD,
+    PERIOD_5MINUTE,
+    PERIOD_HOUR,
+    SHORT_TERM_PERIOD,
+    StatisticsCompiler,
+    period_start,
+    statistics_during_period,
+)
+from homeassistant.components.recorder.util import session_scope
+from homeassistant.const import ATTR_UNIT_OF_MEASUREMENT
+from homeassistant.core import State
+from homeassistant.util import dt as dt_util
+
+from .common import wait_recording_done
+
+from tests.async_mock import patch
+
+START = datetime(2020, 11, 1, 10, 0, tzinfo=dt_util.UTC)
+ATTRIBUTES = {ATTR_UNIT_OF_MEASUREMENT: "°C"}
+
+
+def _state(entity_id, state, last_updated, attributes=ATTRIBUTES):
+    """Return a state updated at a point in time."""
+    return State(entity_id, state, attributes, last_updated, last_updated)
+
+
+def test_compile_short_term_and_hourly():
+    """Test numeric states are aggregated per period weighted by time."""
+    compiler = StatisticsCompiler()
+    compiler.add_state(_state("sensor.temp", "10", START))
+    compiler.add_state(_state("sensor.temp", "20", START + timedelta(minutes=1)))
+    compiler.add_state(_state("sensor.temp", "12", START + timedelta(minutes=6)))
+
+    assert compiler.pending[PERIOD_5MINUTE] == [
+        {
+            "entity_id": "sensor.temp",
+            "start": START,
+            "mean": 18,
+            "min": 10,
+            "max": 20,
+            "last": 20,
+        }
+    ]
+
+    compiler.compile(START + timedelta(hours=1, minutes=1))
+
+    # The last value is carried over to the periods without states
+    rows = compiler.pending[PERIOD_5MINUTE]
+    assert [row["start"] for row in rows] == [
+        START + timedelta(minutes=minutes) for minutes in range(0, 60, 5)
+    ]
+    assert rows[1] == {
+        "entity_id": "sensor.temp",
+        "start": START + timedelta(minutes=5),
+        "mean": 13.6,
+        "min": 12,
+        "max": 20,
+        "last": 12,
+    }
+    assert {(row["mean"], row["min"], row["max"]) for row in rows[2:]} == {(12, 12, 12)}
+    assert compiler.pending[PERIOD_HOUR] == [
+        {
+            "entity_id": "sensor.temp",
+            "start": START,
+            "mean": (10 * 60 + 20 * 300 + 12 * 3240) / 3600,
+            "min": 10,
+            "max": 20,
+            "last": 12,
+        }
+    ]
+
+    compiler.clear_pending()
+    assert compiler.pending == {PERIOD_5MINUTE: [], PERIOD_HOUR: []}
+
+
+def test_compile_stops_carrying_over_gaps():
+    """Test no value is held while the state is not numeric or removed."""
+    compiler = StatisticsCompiler()
+    compiler.add_state(_state("sensor.temp", "10", START))
+    compiler.add_state(
+        _state("sensor.temp", "unavailable", START + timedelta(minutes=1))
+    )
+    compiler.add_state(_state("sensor.temp", "20", START + timedelta(minutes=3)))
+    compiler.remove_entity("sensor.temp", START + timedelta(minutes=4))
+
+    compiler.compile(START + timedelta(hours=1))
+
+    assert compiler.pending[PERIOD_5MINUTE] == [
+        {
+            "entity_id": "sensor.temp",
+            "start": START,
+            "mean": 15,
+            "min": 10,
+            "max": 20,
+            "last": 20,
+        }
+    ]
+    assert compiler.pending[PERIOD_HOUR][0]["mean"] == 15
+
+
+def test_compile_ignores_non_numeric_states():
+    """Test states that are not numeric measurements are ignored."""
+    compiler = StatisticsCompiler()
+    compiler.add_state(_state("sensor.text", "on", START))
+    compiler.add_state(_state("sensor.nan", "nan", START))
+    compiler.add_state(_state("sensor.no_unit", "10", START, {}))
+    compiler.add_state(_state("sensor.temp", "10", START + timedelta(minutes=6)))
+    compiler.add_state(_state("sensor.temp", "20", START))
+
+    compiler.compile(START + timedelta(hours=1))
+
+    rows = compiler.pending[PERIOD_5MINUTE]
+    assert {row["entity_id"] for row in rows} == {"sensor.temp"}
+    assert {row["max"] for row in rows} == {10}
+
+
+def test_compile_applies_changes_recorded_late():
+    """Test changes recorded after their period was compiled are not lost."""
+    compiler = StatisticsCompiler()
+    compiler.add_state(_state("sensor.power", "10", START + timedelta(minutes=1)))
+    compiler.add_state(_state("sensor.gone", "10", START + timedelta(minutes=1)))
+    compiler.compile(START + timedelta(minutes=5, seconds=1))
+    compiler.clear_pending()
+
+    late = START + timedelta(minutes=4, seconds=59)
+    compiler.add_state(_state("sensor.power", "1000", late))
+    compiler.remove_entity("sensor.gone", late + timedelta(milliseconds=500))
+    compiler.compile(START + timedelta(minutes=25, seconds=1))
+
+    rows = compiler.pending[PERIOD_5MINUTE]
+    assert {row["entity_id"] for row in rows} == {"sensor.power"}
+    assert [row["start"] for row in rows] == [
+        START + timedelta(minutes=minutes) for minutes in (5, 10, 15, 20)
+    ]
+    assert {(row["mean"], row["min"], row["max"]) for row in rows} == {
+        (1000, 1000, 1000)
+    }
+
+
+def test_compile_skips_until_period_passed():
+    """Test compiling only scans the open periods once a period has passed."""
+    compiler = StatisticsCompiler()
+    compiler.compile(START)
+    compiler.add_state(_state("sensor.temp", "10", START))
+
+    compiler.compile(START + timedelta(minutes=4))
+    assert compiler.pending[PERIOD_5MINUTE] == []
+
+    compiler.compile(START + timedelta(minutes=5))
+    assert len(compiler.pending[PERIOD_5MINUTE]) == 1
+
+
+def test_recorder_writes_statistics(hass_recorder):
+    """Test the recorder writes the statistics of recorded states."""
+    hass = hass_recorder()
+    now = dt_util.utcnow()
+
+    hass.states.set("sensor.temp", "10", ATTRIBUTES)
+    hass.states.set("sensor.temp", "20", ATTRIBUTES)
+    hass.states.set("sensor.other", "5", ATTRIBUTES)
+    hass.states.set("sensor.text", "on", ATTRIBUTES)
+    wait_recording_done(hass)
+    recorded = hass.states.get("sensor.temp").last_updated
+
+    with session_scope(hass=hass) as session:
+        assert session.query(StatisticsShortTerm).count() == 0
+
+    with patch(
+        "homeassistant.components.recorder.dt_util.utcnow",
+        return_value=now + timedelta(hours=2),
+    ):
+        wait_recording_done(hass)
+
+    # The values are carried over to every period until now
+    periods = (
+        period_start(now + timedelta(hours=2), SHORT_TERM_PERIOD)
+        - period_start(recorded, SHORT_TERM_PERIOD)
+    ) // SHORT_TERM_PERIOD
+    hours = (
+        period_start(now + timedelta(hours=2), HOUR_PERIOD)
+        - period_start(recorded, HOUR_PERIOD)
+    ) // HOUR_PERIOD
+
+    with session_scope(hass=hass) as session:
+        assert session.query(StatisticsShortTerm).count() == 2 * periods
+        assert session.query(Statistics).count() == 2 * hours
+
+        stats = [
+            stat.as_dict()
+            for stat in statistics_during_period(
+                session, now - timedelta(hours=1), None, ["sensor.temp"], PERIOD_HOUR
+            )
+        ]
+
+    assert len(stats) == hours
+    assert stats[0]["entity_id"] == "sensor.temp"
+    # 10 was only held for an instant
+    assert 19.9 < stats[0]["mean"] <= 20
+    assert stats[0]["min"] == 10
+    assert stats[0]["max"] == 20
+    assert stats[0]["last"] == 20
+    assert [stat["mean"] for stat in stats[1:]] == [20] * (hours - 1)
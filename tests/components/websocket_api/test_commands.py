@@ -14,7 +14,13 @@ from homeassistant.helpers import entity
 from homeassistant.loader import async_get_integration
 from homeassistant.setup import async_setup_component
 
-from tests.common import MockEntity, MockEntityPlatform, async_mock_service
+from tests.common import (
+    MockEntity,
+    MockEntityPlatform,
+    MockModule,
+    async_mock_service,
+    mock_integration,
+)
 
 
 async def test_call_service(hass, websocket_client):
@@ -187,6 +193,87 @@ async def test_subscribe_unsubscribe_events(hass, websocket_client):
     assert sum(hass.bus.async_listeners().values()) == init_count
 
 
+async def test_subscribe_entities(hass, websocket_client):
+    """Test subscribe entities sends the states and then only the changes."""
+    hass.states.async_set("light.permitted", "off", {"color": "red"})
+    hass.states.async_set("light.other", "off")
+
+    await websocket_client.send_json(
+        {"id": 5, "type": "subscribe_entities", "entity_ids": ["light.permitted"]}
+    )
+
+    msg = await websocket_client.receive_json()
+    assert msg["id"] == 5
+    assert msg["type"] == const.TYPE_RESULT
+    assert msg["success"]
+
+    state = hass.states.get("light.permitted")
+    msg = await websocket_client.receive_json()
+    assert msg["id"] == 5
+    assert msg["type"] == "event"
+    assert msg["event"] == {
+        "a": {
+            "light.permitted": {
+                "s": "off",
+                "a": {"color": "red"},
+                "c": state.context.id,
+                "lc": state.last_changed.timestamp(),
+            }
+        }
+    }
+
+    hass.states.async_set("light.other", "on")
+    hass.states.async_set("light.permitted", "on", {"brightness": 10})
+    await hass.async_block_till_done()
+
+    state = hass.states.get("light.permitted")
+    msg = await websocket_client.receive_json()
+    assert msg["event"] == {
+        "c": {
+            "light.permitted": {
+                "+": {
+                    "s": "on",
+                    "a": {"brightness": 10},
+                    "c": state.context.id,
+                    "lc": state.last_changed.timestamp(),
+                },
+                "-": {"a": ["color"]},
+            }
+        }
+    }
+
+    hass.states.async_remove("light.permitted")
+    await hass.async_block_till_done()
+
+    msg = await websocket_client.receive_json()
+    assert msg["event"] == {"r": ["light.permitted"]}
+
+
+async def test_subscribe_entities_filters_visible(
+    hass, hass_admin_user, websocket_client
+):
+    """Test subscribe entities only sends entities the user can read."""
+    hass_admin_user.mock_policy({"entities": {"entity_ids": {"test.entity": True}}})
+    hass.states.async_set("test.entity", "hello")
+    hass.states.async_set("test.not_visible_entity", "invisible")
+
+    await websocket_client.send_json({"id": 5, "type": "subscribe_entities"})
+
+    msg = await websocket_client.receive_json()
+    assert msg["success"]
+
+    msg = await websocket_client.receive_json()
+    assert list(msg["event"]["a"]) == ["test.entity"]
+
+    hass.states.async_set("test.not_visible_entity", "still invisible")
+    hass.states.async_set("test.entity", "world")
+    await hass.async_block_till_done()
+
+    msg = await websocket_client.receive_json()
+    assert list(msg["event"]["c"]) == ["test.entity"]
+    assert msg["event"]["c"]["test.entity"]["+"]["s"] == "world"
+
+
 async def test_get_states(hass, websocket_client):
     """Test get_states command."""
     hass.states.async_set("greeting.hello", "world")
@@ -648,6 +735,21 @@ async def test_manifest_list(hass, websocket_client):
     ]
 
 
+async def test_integration_setup_timeline(hass, websocket_client):
+    """Test getting the setup timeline of the integrations."""
+    mock_integration(hass, MockModule("test_timeline"))
+    assert await async_setup_component(hass, "test_timeline", {})
+
+    await websocket_client.send_json({"id": 6, "type": "integration/setup_timeline"})
+
+    msg = await websocket_client.receive_json()
+    assert msg["id"] == 6
+    assert msg["type"] == const.TYPE_RESULT
+    assert msg["success"]
+    assert set(msg["result"]["test_timeline"]) == {"setup"}
+    assert msg["result"]["test_timeline"]["setup"]["duration"] >= 0
+
+
 async def test_manifest_get(hass, websocket_client):
     """Test getting a manifest."""
     hue = await async_get_integration(hass, "hue")
@@ -4,7 +4,7 @@ from datetime import timedelta
 from aiohttp import WSMsgType
 import pytest
 
-from homeassistant.components.websocket_api import const, http
+from homeassistant.components.websocket_api import auth, const, http
 from homeassistant.util.dt import utcnow
 
 from tests.async_mock import patch
@@ -80,3 +80,34 @@ async def test_non_json_message(hass, websocket_client, caplog):
         f"Unable to serialize to JSON. Bad data found at $.result[0](state: test_domain.entity).attributes.bad={bad_data}(<class 'object'>"
         in caplog.text
     )
+
+
+async def test_coalesce_messages(hass, no_auth_websocket_client, hass_access_token):
+    """Test messages queued together are sent as one frame when opted in."""
+    await no_auth_websocket_client.send_json(
+        {
+            "type": auth.TYPE_AUTH,
+            "access_token": hass_access_token,
+            auth.COALESCE_MESSAGES: True,
+        }
+    )
+    msg = await no_auth_websocket_client.receive_json()
+    assert msg["type"] == auth.TYPE_AUTH_OK
+
+    await no_auth_websocket_client.send_json(
+        {"id": 5, "type": "subscribe_events", "event_type": "test_event"}
+    )
+    msg = await no_auth_websocket_client.receive_json()
+    assert msg["success"]
+
+    for idx in range(3):
+        hass.bus.async_fire("test_event", {"idx": idx})
+    await hass.async_block_till_done()
+
+    msg = await no_auth_websocket_client.receive_json()
+    assert [event["event"]["data"]["idx"] for event in msg] == [0, 1, 2]
+    assert all(event["id"] == 5 for event in msg)
+
+    await no_auth_websocket_client.send_json({"id": 6, "type": "ping"})
+    msg = await no_auth_websocket_client.receive_json()
+    assert msg == {"id": 6, "type": "pong"}
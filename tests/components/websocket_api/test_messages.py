@@ -1,8 +1,12 @@
 """Test Websocket API messages module."""
 
+import json
+
 from homeassistant.components.websocket_api.messages import (
     _cached_event_message as lru_event_cache,
+    _cached_state_diff_message as lru_state_diff_cache,
     cached_event_message,
+    cached_state_diff_message,
     message_to_json,
 )
 from homeassistant.const import EVENT_STATE_CHANGED
@@ -78,6 +82,51 @@ async def test_cached_event_message_with_different_idens(hass):
     assert cache_info.currsize == 1
 
 
+async def test_cached_state_diff_message(hass):
+    """Test state diff messages only contain the changes and are cached."""
+
+    events = []
+
+    @callback
+    def _event_listener(event):
+        events.append(event)
+
+    hass.bus.async_listen(EVENT_STATE_CHANGED, _event_listener)
+
+    hass.states.async_set("light.window", "on", {"color": "red", "brightness": 1})
+    hass.states.async_set("light.window", "on", {"color": "blue"})
+    await hass.async_block_till_done()
+
+    assert len(events) == 2
+    lru_state_diff_cache.cache_clear()
+
+    msg0 = cached_state_diff_message(2, events[1])
+    msg1 = cached_state_diff_message(3, events[1])
+
+    new_state = events[1].data["new_state"]
+    assert json.loads(msg0) == {
+        "id": 2,
+        "type": "event",
+        "event": {
+            "c": {
+                "light.window": {
+                    "+": {
+                        "a": {"color": "blue"},
+                        "c": new_state.context.id,
+                        "lu": new_state.last_updated.timestamp(),
+                    },
+                    "-": {"a": ["brightness"]},
+                }
+            }
+        },
+    }
+    assert json.loads(msg1)["id"] == 3
+
+    cache_info = lru_state_diff_cache.cache_info()
+    assert cache_info.hits == 1
+    assert cache_info.misses == 1
+
+
 async def test_message_to_json(caplog):
     """Test we can serialize websocket messages."""
 
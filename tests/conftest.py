@@ -395,9 +395,7 @@ async def mqtt_mock(hass, mqtt_client_mock, mqtt_config):
     assert result
     await hass.async_block_till_done()
 
-    # Workaround: asynctest==0.13 fails on @functools.lru_cache
     spec = dir(hass.data["mqtt"])
-    spec.remove("_matching_subscriptions")
 
     mqtt_component_mock = MagicMock(
         return_value=hass.data["mqtt"],
@@ -18,6 +18,7 @@ from homeassistant.helpers.event import (
     TrackTemplate,
     TrackTemplateResult,
     async_call_later,
+    async_get_timer_wheel,
     async_track_point_in_time,
     async_track_point_in_utc_time,
     async_track_same_state,
@@ -125,6 +126,97 @@ async def test_track_point_in_time_drift_rearm(hass):
     assert len(specific_runs) == 1
 
 
+async def test_timer_wheel_buckets_per_second(hass):
+    """Test callbacks due in the same second share one loop timer."""
+    runs = []
+    now = dt_util.utcnow()
+    point_in_time = datetime(now.year + 1, 5, 24, 21, 59, 55, tzinfo=dt_util.UTC)
+    timer_wheel = async_get_timer_wheel(hass)
+    timers = len(hass.loop._scheduled)
+
+    unsubs = [
+        async_track_point_in_utc_time(
+            hass,
+            callback(lambda x, idx=idx: runs.append(idx)),
+            point_in_time + timedelta(milliseconds=idx * 100),
+        )
+        for idx in range(5)
+    ]
+    assert len(hass.loop._scheduled) == timers + 1
+    assert timer_wheel.pending == 5
+
+    unsubs[2]()
+    unsubs[2]()
+    assert timer_wheel.cancelled == 1
+
+    async_fire_time_changed(hass, point_in_time + timedelta(milliseconds=100))
+    await hass.async_block_till_done()
+    assert runs == [0, 1]
+
+    async_fire_time_changed(hass, point_in_time + timedelta(seconds=5))
+    await hass.async_block_till_done()
+    assert runs == [0, 1, 3, 4]
+    assert timer_wheel.pending == 0
+    assert timer_wheel.fired == 4
+    assert timer_wheel.late == 2
+
+    for unsub in unsubs:
+        unsub()
+    assert timer_wheel.cancelled == 1
+
+
+async def test_timer_wheel_cancel_by_callback_due_in_same_second(hass):
+    """Test a callback can cancel another callback due in the same second."""
+    runs = []
+    now = dt_util.utcnow()
+    point_in_time = datetime(now.year + 1, 5, 24, 21, 59, 55, tzinfo=dt_util.UTC)
+    timer_wheel = async_get_timer_wheel(hass)
+
+    @callback
+    def cancelling_action(now):
+        runs.append("first")
+        unsub_second()
+
+    async_track_point_in_utc_time(hass, cancelling_action, point_in_time)
+    unsub_second = async_track_point_in_utc_time(
+        hass,
+        callback(lambda x: runs.append("second")),
+        point_in_time + timedelta(milliseconds=100),
+    )
+
+    async_fire_time_changed(hass, point_in_time + timedelta(seconds=1))
+    await hass.async_block_till_done()
+    assert runs == ["first"]
+    assert timer_wheel.pending == 0
+    assert timer_wheel.fired == 1
+    assert timer_wheel.cancelled == 1
+
+
+async def test_timer_wheel_callback_error(hass, caplog):
+    """Test a failing callback does not stop the others due in the same second."""
+    runs = []
+    now = dt_util.utcnow()
+    point_in_time = datetime(now.year + 1, 5, 24, 21, 59, 55, tzinfo=dt_util.UTC)
+
+    @callback
+    def failing_action(now):
+        raise ValueError("boom")
+
+    async_track_point_in_utc_time(hass, failing_action, point_in_time)
+    async_track_point_in_utc_time(
+        hass,
+        callback(lambda x: runs.append(x)),
+        point_in_time + timedelta(milliseconds=100),
+    )
+
+    async_fire_time_changed(hass, point_in_time + timedelta(seconds=1))
+    await hass.async_block_till_done()
+    assert runs == [point_in_time + timedelta(milliseconds=100)]
+    assert async_get_timer_wheel(hass).pending == 0
+    assert "Error running timer callback" in caplog.text
+    assert "boom" in caplog.text
+
+
 async def test_track_state_change_from_to_state_match(hass):
     """Test track_state_change with from and to state matchers."""
     from_and_to_state_runs = []
@@ -994,6 +1086,44 @@ async def test_track_template_result(hass):
     assert len(wildercard_runs) == 4
 
 
+async def test_track_template_result_shares_renders_per_event(hass):
+    """Test trackers of the same template render it once per state change."""
+    results = []
+    template_str = "{{ states('sensor.test') }}"
+
+    @ha.callback
+    def track_callback(event, updates):
+        results.append(updates.pop().result)
+
+    infos = [
+        async_track_template_result(
+            hass, [TrackTemplate(Template(template_str, hass), None)], track_callback
+        )
+        for _ in range(3)
+    ]
+    other_variables = async_track_template_result(
+        hass,
+        [TrackTemplate(Template(template_str, hass), {"other": 1})],
+        track_callback,
+    )
+    await hass.async_block_till_done()
+
+    with patch.object(
+        Template,
+        "async_render_to_info",
+        autospec=True,
+        side_effect=Template.async_render_to_info,
+    ) as mock_render:
+        hass.states.async_set("sensor.test", "on")
+        await hass.async_block_till_done()
+
+    assert results == ["on", "on", "on", "on"]
+    assert mock_render.call_count == 2
+
+    for info in (*infos, other_variables):
+        info.async_remove()
+
+
 async def test_track_template_result_complex(hass):
     """Test tracking template."""
     specific_runs = []
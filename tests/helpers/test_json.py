@@ -1,8 +1,10 @@
 """Test Home Assistant remote methods and classes."""
+import json
+
 import pytest
 
 from homeassistant import core
-from homeassistant.helpers.json import JSONEncoder
+from homeassistant.helpers.json import JSONEncoder, json_dumps
 from homeassistant.util import dt as dt_util
 
 
@@ -19,3 +21,37 @@ def test_json_encoder(hass):
 
     now = dt_util.utcnow()
     assert ha_json_enc.default(now) == now.isoformat()
+
+
+def test_json_dumps():
+    """Test encoding to JSON matches the JSON Encoder."""
+    now = dt_util.utcnow()
+    data = {
+        "string": "héllo",
+        "int": 1,
+        "float": 1.5,
+        "bool": True,
+        "none": None,
+        "list": [1, "two"],
+        "nested": {"time": now, "set": {3}},
+    }
+
+    assert json.loads(json_dumps(data)) == json.loads(JSONEncoder().encode(data))
+    for value in ("héllo", 1, 1.5, False, None, now):
+        assert json_dumps(value) == JSONEncoder().encode(value)
+
+
+@pytest.mark.parametrize("value", [float("nan"), {"value": float("inf")}])
+def test_json_dumps_invalid_float(value):
+    """Test encoding NaN or infinity raises ValueError."""
+    with pytest.raises(ValueError):
+        json_dumps(value)
+
+
+def test_json_dumps_circular_reference():
+    """Test encoding a circular reference raises ValueError."""
+    data = {}
+    data["self"] = data
+
+    with pytest.raises(ValueError):
+        json_dumps(data)
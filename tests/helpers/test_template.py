@@ -1,5 +1,6 @@
 """Test Home Assistant template helper methods."""
-from datetime import datetime
+import base64
+from datetime import datetime, timedelta
 import math
 import random
 
@@ -24,6 +25,7 @@ import homeassistant.util.dt as dt_util
 from homeassistant.util.unit_system import UnitSystem
 
 from tests.async_mock import patch
+from tests.common import async_fire_time_changed
 
 
 def _set_up_units(hass):
@@ -152,6 +154,111 @@ def test_iterating_all_states(hass):
     assert_result_info(info, "10happy", entities=[], all_states=True)
 
 
+def test_iterating_domain_states_incrementally(hass):
+    """Test only the changed states are wrapped again between renders."""
+    tmpl = template.Template(
+        "{{ states.sensor | map(attribute='state') | join(',') }}", hass
+    )
+    hass.states.async_set("sensor.b", "1")
+    hass.states.async_set("sensor.a", "2")
+    hass.states.async_set("sensor.c", "3")
+
+    assert tmpl.async_render(parse_result=False) == "2,1,3"
+    first = list(template._state_generator(hass, "sensor"))
+
+    hass.states.async_set("sensor.b", "4")
+    assert tmpl.async_render(parse_result=False) == "2,4,3"
+    second = list(template._state_generator(hass, "sensor"))
+    assert first[0] is second[0]
+    assert first[1] is not second[1]
+    assert first[2] is second[2]
+
+    hass.states.async_remove("sensor.a")
+    hass.states.async_set("sensor.d", "5")
+    assert tmpl.async_render(parse_result=False) == "4,3,5"
+
+
+def test_iterating_domain_states_memoizes_filters(hass):
+    """Test attribute filters are only applied again to the changed states."""
+    tested = []
+
+    def is_high(value):
+        tested.append(value)
+        return float(value) > 2
+
+    template._template_environment(hass).tests["high"] = is_high
+    tmpl = template.Template(
+        "{{ states.sensor | selectattr('state', 'high') | map(attribute='entity_id')"
+        " | join(',') }}"
+        "|{{ states.sensor | rejectattr('state', 'high') | list | count }}",
+        hass,
+    )
+    hass.states.async_set("sensor.a", "1")
+    hass.states.async_set("sensor.b", "3")
+    hass.states.async_set("sensor.c", "5")
+
+    assert tmpl.async_render(parse_result=False) == "sensor.b,sensor.c|1"
+    assert sorted(tested) == ["1", "3", "5"]
+
+    tested.clear()
+    hass.states.async_set("sensor.c", "0")
+    assert tmpl.async_render(parse_result=False) == "sensor.b|2"
+    assert tested == ["0"]
+
+    # States that are collected are tested on every render
+    tmpl = template.Template(
+        "{{ [states.sensor.a, states.sensor.b] | selectattr('state', 'high')"
+        " | list | count }}",
+        hass,
+    )
+    tested.clear()
+    info = tmpl.async_render_to_info()
+    assert info.result() == 1
+    assert tested == ["1", "3"]
+    assert info.entities == {"sensor.a", "sensor.b"}
+
+
+def test_iterating_domain_states_memoizes_filter_arguments(hass):
+    """Test the results of different filter arguments are kept apart."""
+    tested = []
+
+    def is_value(value, other):
+        tested.append(value)
+        return value == other
+
+    template._template_environment(hass).tests["value"] = is_value
+    tmpl = template.Template(
+        "{{ states.sensor | selectattr('state', 'value', 'on') | list | count }}"
+        "|{{ states.sensor | selectattr('state', 'value', 'off') | list | count }}",
+        hass,
+    )
+    hass.states.async_set("sensor.a", "on")
+    hass.states.async_set("sensor.b", "off")
+
+    assert tmpl.async_render(parse_result=False) == "1|1"
+    assert len(tested) == 4
+
+    tested.clear()
+    assert tmpl.async_render(parse_result=False) == "1|1"
+    assert tested == []
+
+
+def test_iterating_domain_states_bounds_filter_results(hass):
+    """Test the filter results kept per template state are bounded."""
+    tmpl = template.Template(
+        "{{ states.sensor | selectattr('state', 'eq', value) | list | count }}", hass
+    )
+    hass.states.async_set("sensor.a", "1")
+    hass.states.async_set("sensor.b", "3")
+
+    for value in range(50):
+        assert tmpl.async_render({"value": str(value)}) == int(value in (1, 3))
+
+    # pylint: disable=protected-access
+    for state in template._sorted_template_states(hass, "sensor").template_states:
+        assert len(state._filter_results) == template.FILTER_RESULTS_SIZE
+
+
 def test_iterating_all_states_unavailable(hass):
     """Test iterating all states unavailable."""
     hass.states.async_set("test.object", "on")
@@ -2056,35 +2163,124 @@ def test_urlencode(hass):
     assert tpl.async_render() == "the%20quick%20brown%20fox%20%3D%20true"
 
 
-async def test_cache_garbage_collection():
-    """Test caching a template."""
+async def test_compiled_cache_is_shared():
+    """Test templates with the same source share their compiled code."""
     template_string = (
         "{% set dict = {'foo': 'x&y', 'bar': 42} %} {{ dict | urlencode }}"
     )
-    tpl = template.Template(
-        (template_string),
-    )
+    template._COMPILED_CACHE.clear()  # pylint: disable=protected-access
+
+    tpl = template.Template(template_string)
     tpl.ensure_valid()
-    assert template._NO_HASS_ENV.template_cache.get(
-        template_string
-    )  # pylint: disable=protected-access
+    tpl2 = template.Template(template_string)
+    tpl2.ensure_valid()
 
-    tpl2 = template.Template(
-        (template_string),
+    assert tpl._compiled_code is tpl2._compiled_code
+    assert template._COMPILED_CACHE.cache_info() == {
+        "hits": 1,
+        "misses": 1,
+        "maxsize": template.COMPILED_CACHE_SIZE,
+        "currsize": 1,
+    }  # pylint: disable=protected-access
+
+
+def test_compiled_cache_evicts_least_recently_used():
+    """Test the compiled cache is bounded."""
+    cache = template.CompiledCodeCache(2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.cache_info() == {"hits": 3, "misses": 1, "maxsize": 2, "currsize": 2}
+
+
+async def test_bytecode_cache(hass, hass_storage):
+    """Test the bytecode of compiled templates is persisted."""
+    template_string = "{{ states('sensor.bytecode') }}"
+    template._COMPILED_CACHE.clear()  # pylint: disable=protected-access
+
+    await template.async_load_bytecode_cache(hass)
+    template.Template(template_string, hass).ensure_valid()
+    await hass.async_block_till_done()
+    async_fire_time_changed(
+        hass, dt_util.utcnow() + timedelta(seconds=template.BYTECODE_SAVE_DELAY)
     )
-    tpl2.ensure_valid()
-    assert template._NO_HASS_ENV.template_cache.get(
-        template_string
-    )  # pylint: disable=protected-access
-
-    del tpl
-    assert template._NO_HASS_ENV.template_cache.get(
-        template_string
-    )  # pylint: disable=protected-access
-    del tpl2
-    assert not template._NO_HASS_ENV.template_cache.get(
-        template_string
-    )  # pylint: disable=protected-access
+    await hass.async_block_till_done()
+
+    bytecode = hass_storage[template.BYTECODE_STORAGE_KEY]["data"]["bytecode"]
+    assert len(bytecode) == 1
+
+    # Load the bytecode like a restart does
+    template._COMPILED_CACHE.clear()  # pylint: disable=protected-access
+    hass.data.pop(template._ENVIRONMENT)  # pylint: disable=protected-access
+    await template.async_load_bytecode_cache(hass)
+    with patch(
+        "homeassistant.helpers.template.ImmutableSandboxedEnvironment.compile"
+    ) as mock_compile:
+        tpl = template.Template(template_string, hass)
+        hass.states.async_set("sensor.bytecode", "restored")
+        assert tpl.async_render() == "restored"
+
+    assert not mock_compile.called
+
+
+@pytest.mark.parametrize(
+    "corrupt",
+    [
+        lambda encoded: "not base64!",
+        lambda encoded: base64.b64encode(
+            base64.b64decode(encoded)[: len(base64.b64decode(encoded)) // 2]
+        ).decode(),
+    ],
+)
+async def test_bytecode_cache_ignores_invalid_bytecode(hass, hass_storage, corrupt):
+    """Test templates with invalid saved bytecode are compiled again."""
+    template_string = "{{ states('sensor.bytecode') }}"
+    template._COMPILED_CACHE.clear()  # pylint: disable=protected-access
+    hass.data.pop(template._ENVIRONMENT, None)  # pylint: disable=protected-access
+
+    await template.async_load_bytecode_cache(hass)
+    template.Template(template_string, hass).ensure_valid()
+    await hass.async_block_till_done()
+    async_fire_time_changed(
+        hass, dt_util.utcnow() + timedelta(seconds=template.BYTECODE_SAVE_DELAY)
+    )
+    await hass.async_block_till_done()
+
+    bytecode = hass_storage[template.BYTECODE_STORAGE_KEY]["data"]["bytecode"]
+    assert bytecode
+    for key, encoded in bytecode.items():
+        bytecode[key] = corrupt(encoded)
+
+    template._COMPILED_CACHE.clear()  # pylint: disable=protected-access
+    hass.data.pop(template._ENVIRONMENT)  # pylint: disable=protected-access
+    await template.async_load_bytecode_cache(hass)
+    tpl = template.Template(template_string, hass)
+    hass.states.async_set("sensor.bytecode", "compiled")
+    assert tpl.async_render() == "compiled"
+
+
+async def test_bytecode_cache_keeps_most_recently_used(hass, hass_storage):
+    """Test only the bytecode of the most recently used templates is saved."""
+    template._COMPILED_CACHE.clear()  # pylint: disable=protected-access
+    hass.data.pop(template._ENVIRONMENT, None)  # pylint: disable=protected-access
+
+    with patch("homeassistant.helpers.template.COMPILED_CACHE_SIZE", 2):
+        await template.async_load_bytecode_cache(hass)
+    for idx in range(5):
+        template.Template(f"{{{{ {idx} }}}}", hass).ensure_valid()
+    await hass.async_block_till_done()
+    async_fire_time_changed(
+        hass, dt_util.utcnow() + timedelta(seconds=template.BYTECODE_SAVE_DELAY)
+    )
+    await hass.async_block_till_done()
+
+    bytecode = hass_storage[template.BYTECODE_STORAGE_KEY]["data"]["bytecode"]
+    assert len(bytecode) == 2
 
 
 def test_is_template_string():
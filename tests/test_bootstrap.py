@@ -6,7 +6,7 @@ from unittest.mock import Mock
 
 import pytest
 
-from homeassistant import bootstrap, core, runner
+from homeassistant import bootstrap, core, runner, setup
 import homeassistant.config as config_util
 from homeassistant.exceptions import HomeAssistantError
 import homeassistant.util.dt as dt_util
@@ -191,6 +191,123 @@ async def test_setup_after_deps_in_stage_1_ignored(hass):
     assert order == ["cloud", "an_after_dep", "normal_integration"]
 
 
+async def test_setup_does_not_wait_for_unrelated_integrations(hass):
+    """Test stage 2 integrations only wait for stage 1 and their dependencies."""
+    order = []
+    slow_event = asyncio.Event()
+
+    def gen_domain_setup(domain):
+        async def async_setup(hass, config):
+            if domain == "slow":
+                await slow_event.wait()
+            order.append(domain)
+            if domain == "unrelated":
+                slow_event.set()
+            return True
+
+        return async_setup
+
+    mock_integration(
+        hass, MockModule(domain="slow", async_setup=gen_domain_setup("slow"))
+    )
+    mock_integration(
+        hass, MockModule(domain="unrelated", async_setup=gen_domain_setup("unrelated"))
+    )
+    mock_integration(
+        hass,
+        MockModule(
+            domain="after_slow",
+            async_setup=gen_domain_setup("after_slow"),
+            partial_manifest={"after_dependencies": ["slow"]},
+        ),
+    )
+
+    await bootstrap._async_set_up_integrations(
+        hass, {"slow": {}, "unrelated": {}, "after_slow": {}}
+    )
+
+    assert order == ["unrelated", "slow", "after_slow"]
+    timeline = setup.async_get_setup_timeline(hass)
+    assert set(timeline["after_slow"]) == {"wait_dependencies", "setup"}
+    assert set(timeline["unrelated"]) == {"setup"}
+
+
+async def test_setup_stage_2_waits_for_stage_1(hass):
+    """Test stage 2 integrations are set up once stage 1 is done."""
+    order = []
+
+    def gen_domain_setup(domain):
+        async def async_setup(hass, config):
+            if domain == "cloud":
+                await asyncio.sleep(0.05)
+            order.append(domain)
+            return True
+
+        return async_setup
+
+    mock_integration(
+        hass, MockModule(domain="cloud", async_setup=gen_domain_setup("cloud"))
+    )
+    mock_integration(
+        hass, MockModule(domain="normal", async_setup=gen_domain_setup("normal"))
+    )
+
+    await bootstrap._async_set_up_integrations(hass, {"cloud": {}, "normal": {}})
+
+    assert order == ["cloud", "normal"]
+    timeline = setup.async_get_setup_timeline(hass)
+    assert set(timeline["normal"]) == {"wait_dependencies", "setup"}
+
+
+async def test_setup_dependency_cycle_fails(hass, caplog):
+    """Test integrations whose dependencies depend on each other are not set up."""
+    mock_integration(hass, MockModule(domain="first", dependencies=["second"]))
+    mock_integration(hass, MockModule(domain="second", dependencies=["first"]))
+    mock_integration(hass, MockModule(domain="normal"))
+
+    await bootstrap._async_set_up_integrations(
+        hass, {"first": {}, "second": {}, "normal": {}}
+    )
+
+    assert "normal" in hass.config.components
+    assert "first" not in hass.config.components
+    assert "second" not in hass.config.components
+
+
+def test_setup_prerequisites_dependency_cycle(hass, caplog):
+    """Test domains with dependencies that depend on each other are left out."""
+    integrations = {
+        "first": Mock(dependencies=["second"], after_dependencies=[]),
+        "second": Mock(dependencies=["first"], after_dependencies=["base"]),
+        "uses_first": Mock(dependencies=["first"], after_dependencies=[]),
+        "base": Mock(dependencies=[], after_dependencies=[]),
+    }
+
+    assert bootstrap._setup_prerequisites(set(integrations), set(), integrations) == {
+        "base": set()
+    }
+    assert caplog.text.count("Ignoring after dependencies") == 0
+    assert (
+        "Unable to set up first, second, uses_first, their dependencies depend on "
+        "each other" in caplog.text
+    )
+
+
+def test_setup_prerequisites_ignore_after_dependency_cycles(hass):
+    """Test after dependencies that depend on each other are ignored."""
+    integrations = {
+        "first": Mock(dependencies=[], after_dependencies=["second"]),
+        "second": Mock(dependencies=["base"], after_dependencies=["first"]),
+        "base": Mock(dependencies=[], after_dependencies=[]),
+    }
+
+    assert bootstrap._setup_prerequisites(set(integrations), set(), integrations) == {
+        "first": set(),
+        "second": {"base"},
+        "base": set(),
+    }
+
+
 async def test_setup_after_deps_via_platform(hass):
     """Test after_dependencies set up via platform."""
     order = []
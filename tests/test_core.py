@@ -1,8 +1,10 @@
 """Test to verify that Home Assistant core works."""
 # pylint: disable=protected-access
 import asyncio
+import copy
 from datetime import datetime, timedelta
 import functools
+import json
 import logging
 import os
 from tempfile import TemporaryDirectory
@@ -11,6 +13,7 @@ import pytest
 import pytz
 import voluptuous as vol
 
+from homeassistant.components.websocket_api.const import JSON_DUMP
 from homeassistant.const import (
     ATTR_FRIENDLY_NAME,
     ATTR_NOW,
@@ -336,6 +339,25 @@ def test_state_as_dict():
     assert state.as_dict() is state.as_dict()
 
 
+def test_state_and_event_as_json():
+    """Test States and Events are serialized to JSON once."""
+    state = ha.State("happy.happy", "on", {"pig": "dog", "count": 3})
+    assert state.as_json() == JSON_DUMP(state.as_dict())
+    assert state.as_json() is state.as_json()
+    assert state.attributes_json == JSON_DUMP({"pig": "dog", "count": 3})
+
+    event = ha.Event("state_changed", {"entity_id": "happy.happy", "new_state": state})
+    assert json.loads(event.as_json()) == json.loads(JSON_DUMP(event.as_dict()))
+    assert event.as_json() is event.as_json()
+    assert event.data_json == JSON_DUMP(event.data)
+
+    event = ha.Event("some_type", {1: "one"})
+    assert event.data_json == JSON_DUMP({1: "one"})
+
+    with pytest.raises(ValueError):
+        ha.State("happy.happy", "on", {"nan": float("nan")}).as_json()
+
+
 async def test_eventbus_add_remove_listener(hass):
     """Test remove_listener method."""
     old_count = len(hass.bus.async_listeners())
@@ -379,6 +401,69 @@ async def test_eventbus_unsubscribe_listener(hass):
     assert len(calls) == 1
 
 
+async def test_eventbus_filtered_listener(hass):
+    """Test a filtered event listener."""
+    calls = []
+
+    @ha.callback
+    def listener(event):
+        """Mock listener."""
+        calls.append(event)
+
+    @ha.callback
+    def filter(event):
+        """Mock filter."""
+        return not event.data["filtered"]
+
+    unsub = hass.bus.async_listen("test", listener, event_filter=filter)
+
+    hass.bus.async_fire("test", {"filtered": True})
+    await hass.async_block_till_done()
+
+    assert len(calls) == 0
+
+    hass.bus.async_fire("test", {"filtered": False})
+    await hass.async_block_till_done()
+
+    assert len(calls) == 1
+
+    unsub()
+
+
+async def test_eventbus_filter_must_be_callback(hass):
+    """Test an event filter that is not a callback is rejected."""
+
+    def filter(event):
+        """Mock filter."""
+        return True
+
+    with pytest.raises(ha.HomeAssistantError):
+        hass.bus.async_listen("test", lambda event: None, event_filter=filter)
+
+
+async def test_eventbus_filter_exception(hass, caplog):
+    """Test an exception in an event filter skips the listener."""
+    calls = []
+
+    @ha.callback
+    def listener(event):
+        """Mock listener."""
+        calls.append(event)
+
+    @ha.callback
+    def filter(event):
+        """Mock filter."""
+        raise ValueError("mock filter error")
+
+    hass.bus.async_listen("test", listener, event_filter=filter)
+
+    hass.bus.async_fire("test")
+    await hass.async_block_till_done()
+
+    assert len(calls) == 0
+    assert "Error in event filter" in caplog.text
+
+
 async def test_eventbus_listen_once_event_with_callback(hass):
     """Test listen_once_event method."""
     runs = []
@@ -1178,6 +1263,36 @@ def test_context():
     assert c.id is not None
 
 
+def test_context_lazy_id():
+    """Test the context id is generated once when it is first accessed."""
+    c = ha.Context()
+    assert c._id is ha._LAZY_CONTEXT_ID  # pylint: disable=protected-access
+    assert c.id == c.id
+    assert ha.Context(id=None).id is None
+
+    copied = copy.deepcopy(c)
+    assert copied == c
+    assert hash(copied) == hash(c)
+    assert copied != ha.Context()
+
+    with pytest.raises(AttributeError):
+        c.user_id = "abc"
+
+
+async def test_statemachine_shares_attributes(hass):
+    """Test states only changing the state share the attributes."""
+    hass.states.async_set("light.bowl", "on", {"brightness": 100})
+    old_attributes = hass.states.get("light.bowl").attributes
+
+    hass.states.async_set("light.bowl", "off", {"brightness": 100})
+    assert hass.states.get("light.bowl").attributes is old_attributes
+
+    attributes = {"brightness": 50}
+    hass.states.async_set("light.bowl", "off", attributes)
+    attributes["brightness"] = 10
+    assert hass.states.get("light.bowl").attributes == {"brightness": 50}
+
+
 async def test_async_functions_with_callback(hass):
     """Test we deal with async functions accidentally marked as callback."""
     runs = []